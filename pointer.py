@@ -1,5 +1,21 @@
-from source.main import App
+import sys
 
 if __name__ == '__main__':
-    app = App()
+    # Perfil de inicialização: tempo de cada import e das fases até o primeiro quadro
+    from source import startup
+    if '--profile-startup' in sys.argv:
+        sys.argv.remove('--profile-startup')
+        startup.enable()
+
+    # Com argumentos roda em modo headless, sem importar o tkinter
+    if len(sys.argv) > 1:
+        from source import cli
+        code = cli.main()
+        if startup.enabled: startup.print_report()
+        sys.exit(code)
+
+    with startup.phase('import source.main'):
+        from source.main import App
+    with startup.phase('App.__init__'):
+        app = App()
     app.mainloop()
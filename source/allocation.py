@@ -0,0 +1,285 @@
+""" Divisão do orçamento entre os ativos para maximizar os proventos anuais.
+
+    Problema da mochila limitada (inteira): escolher quantas cotas q_i comprar
+    de cada ativo, com soma(q_i * preço_i) <= orçamento, maximizando
+    soma(q_i * dividendos_ano_i). Limites opcionais:
+     - max_asset: fração máxima do orçamento em um único ativo
+     - max_sector: fração máxima do orçamento em um mesmo setor
+
+    `solve_exact` resolve por programação dinâmica (NumPy) em centavos inteiros:
+    com preços em centavos a solução é ótima, mas memória e tempo crescem com
+    orçamento x cotas. `solve_dp` usa a exata quando ela cabe em EXACT_WORK;
+    acima disso resolve uma aproximação (orçamento em no máximo MAX_CELLS
+    células, preços arredondados para cima) e marca `exact = False`.
+    `solve_greedy` compra pelo maior yield primeiro; é a referência rápida.
+"""
+# Imports
+import math
+import numpy as np
+
+MAX_CELLS = 20_000  # células da programação dinâmica aproximada (resolução = orçamento / MAX_CELLS)
+EXACT_WORK = 300_000_000  # limite de células x partes da solução exata (~EXACT_WORK / 8 bytes de escolhas)
+CENT = 0.01  # resolução da solução exata
+CORE_PRICES = 10  # janela resolvida pela programação dinâmica, em múltiplos do maior preço
+
+
+class Allocation:
+    """ Cotas de cada ativo (na ordem da entrada), custo e proventos anuais.
+        `exact` indica solução ótima garantida (mochila em centavos).
+    """
+    __slots__ = ('quotas', 'cost', 'income', 'exact')
+
+    def __init__(self, quotas: np.ndarray, prices: np.ndarray, dividends: np.ndarray, exact: bool = False):
+        self.quotas = quotas
+        self.cost = float(quotas @ prices)
+        self.income = float(quotas @ dividends)
+        self.exact = exact
+
+
+def _limits(prices: np.ndarray, budget: float, max_asset: float | None) -> np.ndarray:
+    """Máximo de cotas de cada ativo pelo orçamento e pelo limite por ativo."""
+    cap = budget if max_asset is None else budget * max_asset
+    with np.errstate(divide='ignore', invalid='ignore'):
+        limit = np.where(prices > 0, np.floor(cap / prices + 1e-9), 0)
+    return np.nan_to_num(limit).astype(np.int64)
+
+
+def _cells(value: float, resolution: float) -> int:
+    """Células inteiras que cabem em `value` (tolerante ao erro de ponto flutuante)."""
+    return int(math.floor(value / resolution + 1e-6))
+
+
+def _weights(prices: np.ndarray, resolution: float, capacity: int) -> np.ndarray:
+    """ Preço em células: exato quando é múltiplo da resolução (ex: centavos),
+        senão arredondado para cima, para a solução nunca passar do orçamento.
+    """
+    valid = prices > 0
+    cells = np.where(valid, prices, 1) / resolution
+    rounded = np.round(cells)
+    cells = np.where(np.abs(cells - rounded) < 1e-6, rounded, np.ceil(cells))
+    return np.where(valid, cells, capacity + 1).astype(np.int64)
+
+
+def _sector_groups(n: int, max_sector: float | None, sectors) -> tuple[list[int], dict]:
+    """(ativos sem limite de setor, {setor: [ativos]})."""
+    free, groups = [], {}
+    for i in range(n):
+        sector = sectors[i] if sectors is not None and max_sector is not None else None
+        if sector is None: free.append(i)
+        else: groups.setdefault(sector, []).append(i)
+    return free, groups
+
+
+#------------------------------------------#
+# ------------ Programação dinâmica ------ #
+#------------------------------------------#
+def _knapsack(weights: np.ndarray, values: np.ndarray, limits: np.ndarray, capacity: int):
+    """ Mochila limitada por divisão binária das quantidades (1, 2, 4, ..., resto)
+        em itens 0/1. Retorna (melhor valor por capacidade, partes, escolhas),
+        onde best[c] é o maior valor com peso <= c.
+    """
+    best = np.zeros(capacity + 1)
+    parts, takes = [], []
+    for i, (weight, value, limit) in enumerate(zip(weights.tolist(), values.tolist(), limits.tolist())):
+        if value <= 0 or weight > capacity: continue
+        limit = min(limit, capacity // weight)
+        size = 1
+        while limit > 0:
+            count = min(size, limit)
+            limit -= count
+            size *= 2
+            w, v = weight * count, value * count
+            candidate = best[:capacity + 1 - w] + v
+            take = np.zeros(capacity + 1, dtype=bool)
+            take[w:] = candidate > best[w:]
+            best[w:] = np.maximum(best[w:], candidate)
+            parts.append((i, count, w))
+            takes.append(np.packbits(take))
+    return best, parts, takes
+
+
+def _rebuild(parts, takes, capacity: int, quotas: np.ndarray):
+    """Refaz as escolhas da mochila na capacidade `capacity`."""
+    for (i, count, weight), take in zip(reversed(parts), reversed(takes)):
+        if (take[capacity >> 3] >> (7 - (capacity & 7))) & 1:
+            quotas[i] += count
+            capacity -= weight
+
+
+def _solve_core(prices, dividends, limits, budget: float, free: list[int],
+                capped: list[tuple[list[int], float]], resolution: float | None) -> np.ndarray:
+    """ Programação dinâmica sobre o orçamento discretizado.
+        - free: ativos sem limite de setor, resolvidos em uma mochila só
+        - capped: [(ativos, verba máxima do setor)], cada setor na sua capacidade;
+          as curvas são combinadas pelos pontos em que o valor do setor melhora
+    """
+    quotas = np.zeros(len(prices), dtype=np.int64)
+    resolution = resolution or max(CENT, budget / MAX_CELLS)
+    capacity = _cells(budget, resolution)
+    weights = _weights(prices, resolution, capacity)
+
+    free = np.array(free, dtype=np.int64)
+    best, parts, takes = _knapsack(weights[free], dividends[free], limits[free], capacity)
+    merges = []
+    for members, room in capped:
+        members = np.array(members, dtype=np.int64)
+        curve, g_parts, g_takes = _knapsack(
+            weights[members], dividends[members], limits[members], min(capacity, _cells(room, resolution))
+        )
+        # Pontos em que a curva do setor melhora (c=0 é não investir no setor)
+        steps = np.flatnonzero(np.diff(curve) > 0) + 1
+        merged, choice = best.copy(), np.full(capacity + 1, -1, dtype=np.int32)
+        for k, cells in enumerate(steps.tolist()):
+            candidate = best[:capacity + 1 - cells] + curve[cells]
+            better = candidate > merged[cells:]
+            merged[cells:][better] = candidate[better]
+            choice[cells:][better] = k
+        best = merged
+        merges.append((members, steps, g_parts, g_takes, choice))
+
+    # Reconstrução: dos setores combinados por último até a mochila livre
+    cell = capacity
+    for members, steps, g_parts, g_takes, choice in reversed(merges):
+        k = int(choice[cell])
+        if k < 0: continue
+        group = np.zeros(len(members), dtype=np.int64)
+        _rebuild(g_parts, g_takes, int(steps[k]), group)
+        quotas[members] += group
+        cell -= int(steps[k])
+    group = np.zeros(len(free), dtype=np.int64)
+    _rebuild(parts, takes, cell, group)
+    quotas[free] += group
+    return quotas
+
+
+def exact_work(prices, dividends, budget: float, max_asset: float | None = None,
+               max_sector: float | None = None, sectors=None) -> int:
+    """ Custo estimado de `solve_exact` (células x partes da mochila, mais a
+        combinação das curvas dos setores limitados), comparado a EXACT_WORK.
+    """
+    prices = np.asarray(prices, dtype=float)
+    dividends = np.asarray(dividends, dtype=float)
+    capacity = _cells(budget, CENT)
+    limits = _limits(prices, budget, max_asset)
+    parts = sum(int(limit).bit_length() for limit, value in zip(limits.tolist(), dividends.tolist()) if value > 0)
+    work = parts * (capacity + 1)
+    _, groups = _sector_groups(len(prices), max_sector, sectors)
+    room = _cells(budget * max_sector, CENT) if max_sector is not None else capacity
+    if room < capacity: work += len(groups) * (room + 1) * (capacity + 1)
+    return work
+
+
+def solve_exact(prices, dividends, budget: float, max_asset: float | None = None,
+                max_sector: float | None = None, sectors=None) -> Allocation:
+    """ Ótimo por programação dinâmica em centavos inteiros (preços em centavos).
+        Sem limite de tamanho: confira `exact_work` antes de chamar com orçamentos grandes.
+    """
+    prices = np.asarray(prices, dtype=float)
+    dividends = np.asarray(dividends, dtype=float)
+    if budget <= 0 or not len(prices): return Allocation(np.zeros(len(prices), dtype=np.int64), prices, dividends, True)
+    limits = _limits(prices, budget, max_asset)
+    free, groups = _sector_groups(len(prices), max_sector, sectors)
+    capped = []
+    for members in groups.values():
+        if max_sector >= 1: free.extend(members)
+        else: capped.append((members, budget * max_sector))
+    quotas = _solve_core(prices, dividends, limits, budget, sorted(free), capped, CENT)
+    # Preços fora do grid de centavos são arredondados para cima: aí só é ótima no grid
+    exact = bool(np.all(np.abs(prices * 100 - np.round(prices * 100)) < 1e-6))
+    return Allocation(quotas, prices, dividends, exact)
+
+
+def solve_dp(prices, dividends, budget: float, max_asset: float | None = None,
+             max_sector: float | None = None, sectors=None, resolution: float | None = None
+             ) -> Allocation:
+    """ Mochila limitada por programação dinâmica.
+        Quando cabe (`exact_work` <= EXACT_WORK), devolve a solução exata em centavos.
+        Senão é aproximada (`exact = False`): com orçamento de até CORE_PRICES vezes
+        o maior preço, resolve o problema inteiro com o orçamento discretizado;
+        acima disso, a compra por yield (`solve_greedy`) fixa o grosso da carteira
+        e libera as cotas de menor yield até sobrar essa janela. A sobra do
+        arredondamento é completada pelo maior yield, e o resultado nunca fica
+        abaixo do `solve_greedy`.
+    """
+    prices = np.asarray(prices, dtype=float)
+    dividends = np.asarray(dividends, dtype=float)
+    if budget <= 0 or not len(prices): return Allocation(np.zeros(len(prices), dtype=np.int64), prices, dividends, True)
+    if resolution is None and exact_work(prices, dividends, budget, max_asset, max_sector, sectors) <= EXACT_WORK:
+        return solve_exact(prices, dividends, budget, max_asset, max_sector, sectors)
+    limits = _limits(prices, budget, max_asset)
+
+    # Núcleo: libera as cotas do guloso, da de menor yield para a de maior, até sobrar a janela
+    window = CORE_PRICES * float(prices.max())
+    greedy = solve_greedy(prices, dividends, budget, max_asset, max_sector, sectors)
+    fixed = np.zeros(len(prices), dtype=np.int64)
+    if budget > window:
+        fixed = greedy.quotas.copy()
+        left = budget - float(fixed @ prices)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dy = np.where(prices > 0, dividends / prices, 0.0)
+        for i in np.argsort(dy, kind='stable').tolist():
+            if left >= window: break
+            if not fixed[i]: continue
+            count = min(int(fixed[i]), math.ceil((window - left) / prices[i]))
+            fixed[i] -= count
+            left += count * prices[i]
+    core_budget = budget - float(fixed @ prices)
+
+    # Setores cuja verba restante não cabe no núcleo viram mochilas próprias
+    free, groups = _sector_groups(len(prices), max_sector, sectors)
+    capped = []
+    for members in groups.values():
+        room = budget * max_sector - float(fixed[members] @ prices[members])
+        if room >= core_budget: free.extend(members)
+        else: capped.append((members, room))
+
+    quotas = fixed + _solve_core(prices, dividends, limits - fixed, core_budget, sorted(free), capped, resolution)
+
+    # O arredondamento dos preços pode deixar sobra: completa pelo maior yield
+    quotas = _fill(prices, dividends, quotas, budget - float(quotas @ prices), limits, budget, max_sector, sectors)
+    result = Allocation(quotas, prices, dividends)
+    return result if result.income >= greedy.income else greedy
+
+
+#------------------------------------------#
+# ----------------- Guloso --------------- #
+#------------------------------------------#
+def _fill(prices, dividends, quotas, left: float, limits, budget: float,
+          max_sector: float | None, sectors) -> np.ndarray:
+    """ Completa `quotas` com a verba `left`, comprando o máximo possível do
+        ativo de maior yield, depois o seguinte, respeitando os limites.
+    """
+    quotas = quotas.copy()
+    sector_room = {}
+    if sectors is not None and max_sector is not None:
+        for i, sector in enumerate(sectors):
+            if sector is None: continue
+            sector_room[sector] = sector_room.get(sector, budget * max_sector) - quotas[i] * prices[i]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dy = np.where(prices > 0, dividends / prices, 0.0)
+    for i in np.argsort(-dy, kind='stable').tolist():
+        if dy[i] <= 0: break
+        sector = sectors[i] if sectors is not None and max_sector is not None else None
+        room = sector_room.get(sector, math.inf)
+        count = int(min(limits[i] - quotas[i], math.floor(min(left, room) / prices[i])))
+        if count <= 0: continue
+        quotas[i] += count
+        left -= count * prices[i]
+        if sector is not None: sector_room[sector] = room - count * prices[i]
+    return quotas
+
+
+def solve_greedy(prices, dividends, budget: float, max_asset: float | None = None,
+                 max_sector: float | None = None, sectors=None) -> Allocation:
+    """ Compra o máximo possível do ativo de maior yield, depois o seguinte,
+        respeitando os limites. Rápido, mas pode deixar sobra mal aproveitada.
+    """
+    prices = np.asarray(prices, dtype=float)
+    dividends = np.asarray(dividends, dtype=float)
+    quotas = np.zeros(len(prices), dtype=np.int64)
+    limits = _limits(prices, budget, max_asset)
+    return Allocation(_fill(prices, dividends, quotas, budget, limits, budget, max_sector, sectors), prices, dividends)
+
+
+SOLVERS = {'dp': solve_dp, 'greedy': solve_greedy}
@@ -0,0 +1,132 @@
+""" Ranking vetorizado dos resultados (pandas/NumPy).
+
+    As threads só buscam preço e dividendos; as regras de cálculo rodam
+    aqui, sobre colunas de todos os tickers de uma vez.
+"""
+# Imports
+import numpy as np
+import pandas as pd
+
+# Limites de yield para a tag de cor
+GREEN_YIELD = 0.15   # Yield > 15% do preço
+YELLOW_YIELD = 0.10  # Yield > 10% do preço
+
+# Horizontes (anos completos) das métricas de histórico
+HORIZONS = (3, 5, 10)
+HORIZON_FIELDS = tuple(
+    f'{name}_{n}y' for n in HORIZONS for name in ('avg', 'cagr', 'consistency', 'yoc')
+)
+
+# Quantidade de bits ligados em cada bitmask de 12 meses
+_POPCOUNT = np.array([bin(i).count('1') for i in range(1 << 12)], dtype=np.int64)
+
+
+def dividend_frame(dividends: dict[str, list[tuple[str, float]]]) -> pd.DataFrame:
+    """Frame longo (ticker, date, value) com os eventos de todos os tickers."""
+    tickers = list(dividends)
+    sizes = [len(dividends[t]) for t in tickers]
+    events = [event for t in tickers for event in dividends[t]]
+    return pd.DataFrame({
+        'ticker': np.repeat(np.array(tickers, dtype=object), sizes),
+        'date': np.array([day for day, _ in events], dtype=object),
+        'value': np.array([value for _, value in events], dtype=float),
+    })
+
+
+def trailing_dividends(frame: pd.DataFrame, since: str, last: int = 12) -> pd.Series:
+    """Soma dos últimos `last` dividendos desde `since`, por ticker."""
+    window = frame[frame['date'] >= since].sort_values(['ticker', 'date'])
+    return window.groupby('ticker').tail(last).groupby('ticker')['value'].sum()
+
+
+def evaluate(price: np.ndarray, divs_year: np.ndarray, budget_value: float
+             ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Retorna os arrays (cotas, proventos, tag de cor) de todos os tickers."""
+    price = np.asarray(price, dtype=float)
+    divs_year = np.asarray(divs_year, dtype=float)
+
+    # Quantas cotas consegue comprar com o valor de orçãmento
+    valid = price > 0
+    quotas = np.zeros(len(price), dtype=np.int64)
+    if budget_value > 0:
+        quotas[valid] = np.floor(budget_value / price[valid])
+    # Quantos dividendos recebera com a quantidade de cotas compradas
+    earnings = np.round(quotas * divs_year, 2)
+
+    # Tag color categorize
+    tag = np.select(
+        [divs_year > price * GREEN_YIELD, divs_year > price * YELLOW_YIELD],
+        ['verde', 'amarelo'], default='',
+    ).astype(object)
+    return quotas, earnings, tag
+
+
+def rank(quotes: dict[str, tuple[float, list[tuple[str, float]]]], since: str,
+         budget_value: float) -> pd.DataFrame:
+    """ Monta o frame de resultados a partir de {ticker: (preço, [(data, valor), ...])}.
+        Colunas: price, divs_year, dy, quotas, earnings, tag (índice = ticker).
+    """
+    tickers = list(quotes)
+    price = np.array([quotes[t][0] for t in tickers], dtype=float)
+    divs = trailing_dividends(dividend_frame({t: quotes[t][1] for t in tickers}), since)
+    divs_year = divs.reindex(tickers, fill_value=0.0).to_numpy(dtype=float)
+
+    quotas, earnings, tag = evaluate(price, divs_year, budget_value)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dy = np.where(price > 0, divs_year / price, 0.0)
+
+    return pd.DataFrame({
+        'price': price,
+        'divs_year': divs_year,
+        'dy': dy,
+        'quotas': quotas,
+        'earnings': earnings,
+        'tag': tag,
+    }, index=pd.Index(tickers, name='ticker'))
+
+
+def rank_results(results: list[tuple[str, dict]], since: str, budget_value: float) -> pd.DataFrame:
+    """`rank` dos resultados 'ok' de `market.search`."""
+    quotes = {data['ticker']: (data['price'], data['dividends']) for status, data in results if status == 'ok'}
+    return rank(quotes, since, budget_value)
+
+
+def horizon_metrics(years: list[tuple[str, int, float, int]], prices: dict[str, float],
+                    current_year: int) -> pd.DataFrame:
+    """ Métricas de histórico a partir do agregado anual (db.load_dividend_years),
+        considerando só anos completos (antes de `current_year`). Para cada horizonte N:
+         - avg_Ny: média anual de dividendos
+         - cagr_Ny: crescimento anual composto entre o primeiro e o último ano
+         - consistency_Ny: fração dos meses com pagamento
+         - yoc_Ny: média anual / preço atual
+        O histórico de um ticker começa no seu primeiro ano com dividendos: um ano sem
+        pagamento depois dele conta como zero, mas um horizonte que começa antes dele
+        fica NaN (histórico insuficiente), assim como os tickers sem nenhum dividendo.
+    """
+    tickers = list(prices)
+    price = np.array([prices[t] for t in tickers], dtype=float)
+    span = list(range(current_year - max(HORIZONS), current_year))
+
+    frame = pd.DataFrame(years, columns=['ticker', 'year', 'total', 'months'])
+    totals = (frame.pivot(index='ticker', columns='year', values='total')
+              .reindex(index=tickers, columns=span).fillna(0.0).to_numpy(dtype=float))
+    months = (frame.pivot(index='ticker', columns='year', values='months')
+              .reindex(index=tickers, columns=span).fillna(0).to_numpy(dtype=np.int64))
+    paid = _POPCOUNT[months & 0xFFF]
+    # Anos cobertos pelo histórico de cada ticker (NaN, sem histórico, não cobre nenhum)
+    first_year = frame.groupby('ticker')['year'].min().reindex(tickers).to_numpy(dtype=float)
+    covered = np.array(span, dtype=float)[None, :] >= first_year[:, None]
+
+    metrics = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for n in HORIZONS:
+            window = slice(len(span) - n, len(span))
+            full = covered[:, window].all(axis=1)
+            avg = np.where(full, totals[:, window].sum(axis=1) / n, np.nan)
+            first, last = totals[:, len(span) - n], totals[:, -1]
+            metrics[f'avg_{n}y'] = avg
+            metrics[f'cagr_{n}y'] = np.where(full & (first > 0) & (last > 0), (last / first) ** (1 / (n - 1)) - 1, np.nan)
+            metrics[f'consistency_{n}y'] = np.where(full, paid[:, window].sum(axis=1) / (12 * n), np.nan)
+            metrics[f'yoc_{n}y'] = np.where(full & (price > 0), avg / price, np.nan)
+
+    return pd.DataFrame(metrics, index=pd.Index(tickers, name='ticker'))[list(HORIZON_FIELDS)]
@@ -0,0 +1,486 @@
+""" Benchmarks do Pointer.
+
+    Os comandos offline usam a FakeProvider e um banco temporário:
+        python -m source.benchmark all
+        python -m source.benchmark scan [--sizes 10 100 1000 10000] [--latency S] [--failure-rate P]
+        python -m source.benchmark snapshot [--rows N] [--latency S] [--dividends N]
+        python -m source.benchmark db [--rows N]
+        python -m source.benchmark metrics [--rows N] [--dividends N]
+        python -m source.benchmark table [--rows N]
+        python -m source.benchmark filter [--rows N]
+        python -m source.benchmark export [--rows N]
+        python -m source.benchmark allocation [--sizes 50 300 1000] [--budgets 1000 100000]
+        python -m source.benchmark scheduler [--tickers N] [--latency S] [--failure-rate P]
+        python -m source.benchmark ui [--tickers N]
+        python -m source.benchmark startup [--runs N]
+
+    Com rede (Yahoo Finance):
+        python -m source.benchmark fetch [--batch-size N] [TICKER ...]
+"""
+# Imports
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import date
+from functools import partial
+from time import perf_counter, time
+# Modulos
+from source import analytics, data_base as db, market
+from source.providers import FakeProvider, Provider, YahooProvider
+from source.scheduler import Scheduler
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    if not values: return 0.0
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+@contextmanager
+def temp_db():
+    """Aponta o data_base para um banco vazio em uma pasta temporária."""
+    folder, path = db.DB_FOLDER, db.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_FOLDER = tmp
+        db.DB_PATH = os.path.join(tmp, f'{db.DB_NAME}.db')
+        db.db_init()
+        try:
+            yield
+        finally:
+            db.close()
+            db.DB_FOLDER, db.DB_PATH = folder, path
+
+
+def fake_tickers(n: int) -> list[str]:
+    return [f'FAKE{i}.SA' for i in range(n)]
+
+
+#------------------------------------------#
+# ------------- Consulta (rede) ---------- #
+#------------------------------------------#
+def bench_per_ticker(provider: YahooProvider, tickers: list[str]) -> float:
+    """Caminho antigo: um yf.Ticker().info + dividends por ativo."""
+    start = perf_counter()
+    for ticker in tickers:
+        try: provider.fetch_one(ticker)
+        except Exception: pass
+    return perf_counter() - start
+
+
+def bench_batch(provider: YahooProvider, tickers: list[str], batch_size: int) -> float:
+    """Caminho em lote: uma requisição yf.download por bloco de tickers."""
+    start = perf_counter()
+    for chunk in market.chunks(tickers, batch_size):
+        try: provider.fetch(chunk, market.start_date())
+        except Exception: pass
+    return perf_counter() - start
+
+
+def run_fetch(args):
+    tickers = args.tickers or db.load_tickers()
+    if not tickers:
+        print('Nenhum ticker cadastrado.')
+        return
+
+    provider = YahooProvider()
+    print(f'{len(tickers)} tickers')
+    for name, elapsed in (
+        ('por ticker', bench_per_ticker(provider, tickers)),
+        (f'lote ({args.batch_size})', bench_batch(provider, tickers, args.batch_size)),
+    ):
+        print(f'{name:>15}: {elapsed:8.2f}s  {len(tickers) / elapsed:8.2f} tickers/s')
+
+
+#------------------------------------------#
+# ------------- Scan completo ------------ #
+#------------------------------------------#
+def bench_scan(n: int, provider: Provider, batch_size: int, workers: int) -> tuple[float, list[float]]:
+    """ Scan completo (agendador + cache SQLite + fonte falsa) de `n` tickers.
+        Retorna (segundos, latência de cada ticker em ms).
+    """
+    latencies = []
+    lock = threading.Lock()
+
+    def timed_search(chunk):
+        # Latência do lote, atribuída a cada ticker dele
+        start = perf_counter()
+        results = market.search(chunk, 0, provider)
+        elapsed = (perf_counter() - start) * 1000
+        with lock: latencies.extend([elapsed] * len(chunk))
+        return results
+
+    scheduler = Scheduler(timed_search, max_concurrency=workers, rate=1e6, burst=1e6, base_delay=0.01)
+    start = perf_counter()
+    scheduler.run_sync(market.chunks(fake_tickers(n), batch_size), lambda results: None)
+    return perf_counter() - start, latencies
+
+
+def run_scan(args):
+    provider = FakeProvider(args.latency, args.failure_rate, args.dividends, cacheable=True)
+    print(f'{"tickers":>8} {"tempo (s)":>10} {"tickers/s":>10} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8}')
+    for n in args.sizes:
+        with temp_db():
+            elapsed, latencies = bench_scan(n, provider, args.batch_size, args.workers)
+        print(f'{n:>8} {elapsed:>10.3f} {n / elapsed:>10.1f} {percentile(latencies, 50):>8.1f} '
+              f'{percentile(latencies, 95):>8.1f} {percentile(latencies, 99):>8.1f}')
+
+
+def run_snapshot(args):
+    """Scan offline de um snapshot (mmap) x scan pela fonte com o cache SQLite frio e quente."""
+    from source import snapshot
+    provider = FakeProvider(args.latency, dividends=args.dividends, cacheable=True)
+    tickers = fake_tickers(args.rows)
+    with tempfile.TemporaryDirectory() as folder:
+        quotes = provider.fetch(tickers, date.min)
+        now = time()
+        start = perf_counter()
+        snapshot.export(folder, {t: (q[0], now) for t, q in quotes.items()}, {t: q[1] for t, q in quotes.items()})
+        print(f'{"exportação":>28}: {(perf_counter() - start) * 1000:10.1f} ms ({args.rows} tickers)')
+
+        start = perf_counter()
+        offline = snapshot.SnapshotProvider(folder)
+        print(f'{"abertura do snapshot":>28}: {(perf_counter() - start) * 1000:10.1f} ms')
+        with temp_db():
+            elapsed, _ = bench_scan(args.rows, offline, args.batch_size, args.workers)
+        print(f'{"scan do snapshot":>28}: {elapsed * 1000:10.1f} ms')
+
+    with temp_db():
+        cold, _ = bench_scan(args.rows, provider, args.batch_size, args.workers)
+        warm, _ = bench_scan(args.rows, provider, args.batch_size, args.workers)
+    print(f'{"scan com cache frio":>28}: {cold * 1000:10.1f} ms')
+    print(f'{"scan com cache quente":>28}: {warm * 1000:10.1f} ms')
+
+
+#------------------------------------------#
+# ---------------- SQLite ---------------- #
+#------------------------------------------#
+def timeit(fn, repeat: int = 1) -> float:
+    start = perf_counter()
+    for _ in range(repeat): fn()
+    return (perf_counter() - start) / repeat
+
+
+def run_db(args):
+    tickers = fake_tickers(args.rows)
+    provider = FakeProvider(dividends=args.dividends)
+    fetched = provider.fetch(tickers, market.start_date())
+    quotes = [(t, price, 0.0) for t, (price, _) in fetched.items()]
+    divs = [(t, day, value) for t, (_, events) in fetched.items() for day, value in events]
+    batch = tickers[:market.BATCH_SIZE]
+
+    with temp_db():
+        cases = (
+            (f'save_ticket x{args.rows}', lambda: [db.save_ticket(t) for t in tickers], 1),
+            ('load_tickers', db.load_tickers, 10),
+            ('ticker_exists', partial(db.ticker_exists, tickers[-1]), 1000),
+            ('edit_ticker x100', lambda: [db.edit_ticker(t, f'{t}X') for t in tickers[:100]], 1),
+            ('remove_ticker x100', lambda: [db.remove_ticker(f'{t}X') for t in tickers[:100]], 1),
+            (f'remove_tickers ({args.rows})', partial(db.remove_tickers, tickers), 1),
+            (f'save_tickers ({args.rows})', partial(db.save_tickers, tickers), 1),
+            (f'rename_tickers ({args.rows})', partial(db.rename_tickers, [(t, f'{t}X') for t in tickers]), 1),
+            (f'save_quotes ({len(quotes)})', partial(db.save_quotes, quotes), 1),
+            (f'load_quotes ({len(batch)})', partial(db.load_quotes, batch), 100),
+            (f'save_dividends ({len(divs)})', partial(db.save_dividends, divs), 1),
+            (f'load_dividends ({len(batch)})', partial(db.load_dividends, batch, str(market.start_date())), 100),
+        )
+        for name, fn, repeat in cases:
+            print(f'{name:>28}: {timeit(fn, repeat) * 1000:10.2f} ms')
+
+
+def run_metrics(args):
+    """Custo das métricas de 3/5/10 anos sobre o agregado anual mantido pelos triggers."""
+    tickers = fake_tickers(args.rows)
+    fetched = FakeProvider(dividends=args.dividends).fetch(tickers, market.history_start())
+    prices = {t: price for t, (price, _) in fetched.items()}
+    divs = [(t, day, value) for t, (_, events) in fetched.items() for day, value in events]
+
+    with temp_db():
+        print(f'{"save_dividends (" + str(len(divs)) + ")":>28}: {timeit(partial(db.save_dividends, divs)) * 1000:10.2f} ms')
+        new_event = [(tickers[0], date.today().isoformat(), 1.0)]
+        print(f'{"novo evento (incremental)":>28}: {timeit(partial(db.save_dividends, new_event)) * 1000:10.2f} ms')
+        years = db.load_dividend_years(tickers)
+        print(f'{"load_dividend_years":>28}: {timeit(partial(db.load_dividend_years, tickers), 10) * 1000:10.2f} ms')
+        compute = partial(analytics.horizon_metrics, years, prices, date.today().year)
+        print(f'{"horizon_metrics":>28}: {timeit(compute, 10) * 1000:10.2f} ms')
+
+
+#------------------------------------------#
+# --------------- Interface -------------- #
+#------------------------------------------#
+def fake_results(tickers: list[str]) -> list[tuple[str, dict]]:
+    provider = FakeProvider()
+    now = time()
+    return [('ok', {'ticker': t, 'price': price, 'dividends': events, 'updated': now})
+            for t, (price, events) in provider.fetch(tickers, market.start_date()).items()]
+
+
+def run_filter(args):
+    """Tempo do índice da barra de filtros: montagem e consultas por faixa e prefixo."""
+    from source.filters import ResultIndex
+    from source.model import ResultModel
+    model = ResultModel()
+    model.set_results(fake_results(fake_tickers(args.rows)), 1000)
+    index = ResultIndex(model)
+
+    start = perf_counter()
+    index.build()
+    print(f'{"índice (" + str(args.rows) + " linhas)":>28}: {(perf_counter() - start) * 1000:10.2f} ms')
+    queries = {
+        'DY >= 10% e preço <= 100': ('', {'dy': (0.10, None), 'price': (None, 100)}),
+        'preço entre 20 e 30': ('', {'price': (20, 30)}),
+        "prefixo 'FAKE12'": ('FAKE12', {}),
+    }
+    for name, query in queries.items():
+        count = len(index.query(*query))
+        print(f'{name:>28}: {timeit(lambda: index.query(*query), 50) * 1000:10.3f} ms ({count} linhas)')
+
+
+def run_export(args):
+    """ Exportação em blocos para CSV e XLSX: tempo, tamanho do arquivo e pico de
+        memória (medido em uma segunda escrita, pois o tracemalloc deixa tudo mais lento).
+    """
+    import tracemalloc
+    from source import export
+    from source.model import ResultModel
+    model = ResultModel()
+    model.set_results(fake_results(fake_tickers(args.rows)), 1000)
+    rows = list(model.rows.values())
+    with tempfile.TemporaryDirectory() as folder:
+        for fmt in export.FORMATS:
+            path = os.path.join(folder, f'export.{fmt}')
+            try:
+                elapsed = timeit(lambda: export.write(path, rows))
+            except RuntimeError as ex:
+                print(f'{fmt:>6}: {ex}')
+                continue
+            tracemalloc.start()
+            export.write(path, rows)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f'{fmt:>6}: {elapsed * 1000:10.1f} ms  {os.path.getsize(path) / 1e6:6.1f} MB  '
+                  f'pico de memória {peak / 1e6:6.1f} MB ({args.rows} linhas)')
+
+
+def run_allocation(args):
+    """ Programação dinâmica x guloso na divisão do orçamento: tempo, proventos e a
+        diferença para o ótimo exato em centavos (quando ele cabe em --max-work).
+    """
+    from source import allocation
+    provider = FakeProvider()
+    limits = {'sem limites': (None, None), 'ativo 10%': (0.10, None), 'ativo 10%, setor 30%': (0.10, 0.30)}
+    for n in args.sizes:
+        tickers = fake_tickers(n)
+        quotes = provider.fetch(tickers, market.start_date())
+        frame = analytics.rank(quotes, str(market.start_date()), 0)
+        prices, dividends = frame['price'].to_numpy(), frame['divs_year'].to_numpy()
+        sectors = [f'setor{i % 10}' for i in range(n)]
+        for budget in args.budgets:
+            for name, (max_asset, max_sector) in limits.items():
+                line = f'{n:>6} tickers  R$ {budget:>10,.0f}  {name:<22}'
+                optimum = None
+                if allocation.exact_work(prices, dividends, budget, max_asset, max_sector, sectors) <= args.max_work:
+                    start = perf_counter()
+                    optimum = allocation.solve_exact(prices, dividends, budget, max_asset, max_sector, sectors).income
+                    line += f' | ótimo: {(perf_counter() - start) * 1000:8.1f} ms, {optimum:10.2f}/ano'
+                else:
+                    line += f' | ótimo: {"-":>8}    {"-":>10}     '
+                for solver in ('dp', 'greedy'):
+                    solve = allocation.SOLVERS[solver]
+                    start = perf_counter()
+                    result = solve(prices, dividends, budget, max_asset, max_sector, sectors)
+                    elapsed = perf_counter() - start
+                    gap = '' if optimum is None else f' (-{optimum - result.income:.2f})'
+                    kind = '' if solver != 'dp' else (' exato' if result.exact else ' aprox.')
+                    line += f' | {solver}{kind}: {elapsed * 1000:8.1f} ms, {result.income:10.2f}/ano{gap}'
+                print(line)
+
+
+def new_app():
+    """Cria a janela escondida, ou None se não houver display."""
+    import tkinter as tk
+    from source.main import App
+    try:
+        app = App()
+    except tk.TclError as exc:
+        print(f'Sem display para a interface: {exc}')
+        return None
+    app.withdraw()
+    return app
+
+
+def run_table(args):
+    """ Tempo para popular a tabela com `rows` resultados e para reabrir
+        a janela a partir do último scan salvo (partida rápida).
+    """
+    with temp_db():
+        app = new_app()
+        if app is None: return
+        results = fake_results(fake_tickers(args.rows))
+
+        start = perf_counter()
+        for chunk in market.chunks(results, app.PUMP_CHUNK): app._insert_results(chunk)
+        app.update_idletasks()
+        elapsed = perf_counter() - start
+        app.on_closing()
+        print(f'{args.rows} linhas em {elapsed * 1000:.1f} ms ({args.rows / elapsed:.0f} linhas/s)')
+
+        start = perf_counter()
+        app = new_app()
+        app.update_idletasks()
+        elapsed = perf_counter() - start
+        app.on_closing()
+        print(f'partida com {args.rows} linhas salvas: {elapsed * 1000:.1f} ms')
+
+
+def run_ui(args):
+    """ Mede a latência dos quadros da janela enquanto um scan grande
+        (resultados falsos, enviados por uma thread) é inserido na tabela.
+    """
+    with temp_db(): _run_ui(args)
+
+
+def _run_ui(args):
+    app = new_app()
+    if app is None: return
+    app.total_tickers = args.tickers
+    app.progress['maximum'] = args.tickers
+    delays = []
+    last = perf_counter()
+
+    def probe():
+        # Atraso de cada quadro em relação ao intervalo esperado
+        nonlocal last
+        now = perf_counter()
+        delays.append(max(0.0, (now - last) * 1000 - app.FRAME_MS))
+        last = now
+        if app.processed_tickers >= args.tickers: app.quit()
+        else: app.after(app.FRAME_MS, probe)
+
+    def feed():
+        for chunk in market.chunks(fake_tickers(args.tickers), args.batch_size):
+            app._on_search_done(app.generation, fake_results(chunk))
+
+    start = perf_counter()
+    app.after(app.FRAME_MS, probe)
+    threading.Thread(target=feed, daemon=True).start()
+    app.mainloop()
+    elapsed = perf_counter() - start
+    app.on_closing()
+
+    print(f'{args.tickers} linhas em {elapsed:.2f}s')
+    print(f'atraso por quadro (ms): p50={percentile(delays, 50):.1f} '
+          f'p95={percentile(delays, 95):.1f} max={max(delays, default=0):.1f}')
+
+
+#------------------------------------------#
+# -------------- Inicialização ----------- #
+#------------------------------------------#
+STARTUP_PROBE = '''
+import sys
+from time import perf_counter
+start = perf_counter()
+import source.main
+heavy = [m for m in ('pandas', 'numpy', 'yfinance', 'dateutil') if m in sys.modules]
+print(perf_counter() - start, ','.join(heavy))
+'''
+
+
+def run_startup(args):
+    """Tempo de `import source.main` em um processo novo (sem cache de módulos)."""
+    times, heavy = [], ''
+    for _ in range(args.runs):
+        out = subprocess.run([sys.executable, '-c', STARTUP_PROBE], capture_output=True, text=True, check=True)
+        seconds, heavy = out.stdout.split()[0], out.stdout.strip().partition(' ')[2]
+        times.append(float(seconds) * 1000)
+    print(f'import source.main: p50={percentile(times, 50):.1f} ms max={max(times):.1f} ms ({args.runs} execuções)')
+    print(f'dependências pesadas carregadas: {heavy or "nenhuma"}')
+
+
+#------------------------------------------#
+# --------------- Agendador -------------- #
+#------------------------------------------#
+def run_scheduler(args):
+    """Novas tentativas e concorrência adaptativa contra uma fonte que devolve 429."""
+    provider = FakeProvider(args.latency, args.failure_rate, cacheable=True)
+    with temp_db():
+        scheduler = Scheduler(
+            partial(market.search, ttl=0, provider=provider),
+            max_concurrency=args.workers, rate=args.rate, base_delay=0.05,
+        )
+        start = perf_counter()
+        report = scheduler.run_sync(market.chunks(fake_tickers(args.tickers), args.batch_size), lambda results: None)
+        elapsed = perf_counter() - start
+
+    print(f'{args.tickers} tickers em {elapsed:.2f}s ({args.tickers / elapsed:.1f} tickers/s)')
+    print(report.summary())
+
+
+def run_all(args):
+    print('# Scan'); run_scan(args)
+    print('\n# SQLite'); run_db(args)
+    print('\n# Tabela'); run_table(args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m source.benchmark')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add(name, func, help):
+        cmd = commands.add_parser(name, help=help)
+        cmd.add_argument('--batch-size', type=int, default=market.BATCH_SIZE)
+        cmd.set_defaults(func=func)
+        return cmd
+
+    def add_offline_args(cmd):
+        cmd.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000])
+        cmd.add_argument('--latency', type=float, default=0.02, help='Latência por lote (s)')
+        cmd.add_argument('--failure-rate', type=float, default=0.0, help='Probabilidade de 429 por lote')
+        cmd.add_argument('--dividends', type=int, default=24, help='Eventos de dividendo por ticker')
+        cmd.add_argument('--workers', type=int, default=6)
+        cmd.add_argument('--rows', type=int, default=1000)
+
+    fetch = add('fetch', run_fetch, 'Consulta por ticker x consulta em lote (rede)')
+    fetch.add_argument('tickers', nargs='*')
+
+    add_offline_args(add('all', run_all, 'Scan, SQLite e tabela (offline)'))
+    add_offline_args(add('scan', run_scan, 'Vazão e latência p50/p95/p99 do scan completo'))
+    snap = add('snapshot', run_snapshot, 'Scan offline de um snapshot x scan com o cache SQLite')
+    snap.add_argument('--rows', type=int, default=10000)
+    snap.add_argument('--latency', type=float, default=0.02, help='Latência por lote (s)')
+    snap.add_argument('--dividends', type=int, default=120, help='Eventos de dividendo por ticker')
+    snap.add_argument('--workers', type=int, default=6)
+    add_offline_args(add('db', run_db, 'Custo das operações do data_base'))
+    metrics = add('metrics', run_metrics, 'Métricas de 3/5/10 anos de dividendos')
+    metrics.add_argument('--rows', type=int, default=500)
+    metrics.add_argument('--dividends', type=int, default=120)
+    add('filter', run_filter, 'Consultas do índice da barra de filtros').add_argument('--rows', type=int, default=10000)
+    add('export', run_export, 'Exportação da tabela para CSV e XLSX').add_argument('--rows', type=int, default=100000)
+    alloc = add('allocation', run_allocation, 'Divisão do orçamento: programação dinâmica x guloso')
+    alloc.add_argument('--sizes', type=int, nargs='+', default=[50, 300, 1000])
+    alloc.add_argument('--max-work', type=float, default=4e9, help='Maior custo (exact_work) do ótimo de referência')
+    alloc.add_argument('--budgets', type=float, nargs='+', default=[1000, 100000])
+    add('table', run_table, 'Tempo para popular a tabela').add_argument('--rows', type=int, default=10000)
+
+    sched = add('scheduler', run_scheduler, 'Agendador contra uma fonte local com latência e 429')
+    sched.add_argument('--tickers', type=int, default=1000)
+    sched.add_argument('--latency', type=float, default=0.05)
+    sched.add_argument('--failure-rate', type=float, default=0.1)
+    sched.add_argument('--workers', type=int, default=6)
+    sched.add_argument('--rate', type=float, default=50.0)
+
+    add('startup', run_startup, 'Tempo de import da interface em um processo novo').add_argument(
+        '--runs', type=int, default=5)
+
+    add('ui', run_ui, 'Latência dos quadros da janela durante um scan grande').add_argument(
+        '--tickers', type=int, default=5000)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
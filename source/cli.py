@@ -0,0 +1,412 @@
+""" Modo sem interface gráfica (headless).
+
+    Uso:
+        python pointer.py scan [--file ARQUIVO | --file -] [--budget 1000]
+                               [--workers 6] [--batch-size 50] [--format csv|jsonl]
+                               [--horizons] [--type fii|acao] [--sector SETOR]
+                               [--metrics ARQUIVO.json|ARQUIVO.prom] [--snapshot PASTA]
+                               [--watchlist NOME ...]
+        python pointer.py watchlist [NOME [--budget 5000] [--file ARQUIVO | TICKER ...] [--delete]]
+        python pointer.py export-snapshot PASTA [--file ARQUIVO] [--type fii|acao] [--sector SETOR]
+        python pointer.py import ARQUIVO.csv|ARQUIVO.json
+        python pointer.py allocate [--budget 1000] [--max-asset 0.2] [--max-sector 0.4]
+                                   [--solver dp|greedy] [--type fii|acao] [--sector SETOR]
+
+    Cada ticker vira uma linha na saída assim que o seu lote termina.
+"""
+# Imports
+import argparse
+import csv
+import json
+import sys
+from datetime import date
+from functools import partial
+from typing import Callable
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+# Modulos
+from source import analytics, data_base as db, market
+from source.metrics import Metrics, stage
+from source.providers import FakeProvider, YahooProvider
+from source.scheduler import Scheduler
+
+PROVIDERS = {'yahoo': YahooProvider, 'fake': FakeProvider}
+# Origem das métricas de horizonte: (agregado anual dos ids, ano corrente)
+Horizons = tuple[Callable[[list[str]], list[tuple[str, int, float, int]]], int]
+FIELDS = ('ticker', 'status', 'price', 'divs_year', 'quotas', 'earnings', 'tag', 'error', 'kind')
+
+
+#------------------------------------------#
+# --------------- Entrada ---------------- #
+#------------------------------------------#
+def read_tickers(path: str | None, asset_type: str | None = None, sector: str | None = None):
+    """ Gera os tickers do banco (path=None, filtrados por tipo e setor),
+        de um arquivo ou da stdin ('-').
+    """
+    if path is None:
+        yield from db.load_tickers(asset_type, sector)
+        return
+
+    stream = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    try:
+        for line in stream:
+            line = line.split('#', 1)[0].strip()
+            if line: yield market.normalize(line)
+    finally:
+        if stream is not sys.stdin: stream.close()
+
+
+def provider_for(args):
+    """Fonte de dados dos argumentos: o snapshot de `--snapshot` ou a `--provider`."""
+    if getattr(args, 'snapshot', None):
+        from source.snapshot import SnapshotProvider
+        return SnapshotProvider(args.snapshot)
+    return PROVIDERS[args.provider]()
+
+
+def tickers_for(args, provider):
+    """Tickers dos argumentos; com `--snapshot` e sem `--file`, todos os do snapshot."""
+    if getattr(args, 'snapshot', None) and args.file is None:
+        return iter(provider.tickers)
+    return read_tickers(args.file, args.type, args.sector)
+
+
+def positive(kind):
+    """Tipo do argparse para números maiores que zero (ex: `--rate 0` travaria o token bucket)."""
+    def parse(text: str):
+        value = kind(text)
+        if value <= 0: raise argparse.ArgumentTypeError(f'deve ser maior que zero: {text}')
+        return value
+    parse.__name__ = kind.__name__
+    return parse
+
+
+def batches(tickers, size: int):
+    """Agrupa um iterável de tickers em listas de até `size` itens."""
+    tickers = iter(tickers)
+    while chunk := list(islice(tickers, size)):
+        yield chunk
+
+
+#------------------------------------------#
+# ---------------- Saída ----------------- #
+#------------------------------------------#
+class Writer:
+    """Escreve uma linha por ticker em CSV ou JSON Lines."""
+
+    def __init__(self, stream, fmt: str, fields: tuple = FIELDS):
+        self.stream = stream
+        self.fmt = fmt
+        if fmt == 'csv':
+            self.csv = csv.DictWriter(stream, fieldnames=fields)
+            self.csv.writeheader()
+
+    def write(self, row: dict):
+        if self.fmt == 'csv': self.csv.writerow(row)
+        else: self.stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+    def flush(self):
+        self.stream.flush()
+
+
+def horizon_source(provider) -> Horizons:
+    """ De onde vêm as métricas de 3/5/10 anos: de um snapshot, do histórico e do
+        ano gravados nele (reproduzível); senão, do banco e do ano atual.
+    """
+    if getattr(provider, 'dividend_years', None) is not None:
+        return provider.dividend_years, provider.year
+    return db.load_dividend_years, date.today().year
+
+
+def rank_frame(results: list[tuple[str, dict]], budget: float, horizons: Horizons | None = None):
+    """ Frame de `analytics.rank_results` dos resultados 'ok'.
+        Com `horizons` (`horizon_source`), inclui as métricas de 3/5/10 anos.
+    """
+    frame = analytics.rank_results(results, str(market.start_date()), budget)
+    if horizons:
+        load_years, year = horizons
+        metrics = analytics.horizon_metrics(load_years(list(frame.index)), frame['price'].to_dict(), year)
+        frame = frame.join(metrics.round(4).astype(object).where(metrics.notna(), ''))
+    return frame
+
+
+def frame_rows(frame) -> list[dict]:
+    """Linhas de saída das linhas do frame de `rank_frame`."""
+    return [{
+        'ticker': market.display_name(ticker),
+        'status': 'ok',
+        'price': item['price'],
+        'divs_year': round(item['divs_year'], 4),
+        'quotas': item['quotas'],
+        'earnings': item['earnings'],
+        'tag': item['tag'],
+        **{field: item[field] for field in analytics.HORIZON_FIELDS if field in item},
+    } for ticker, item in zip(frame.index, frame.to_dict('records'))]
+
+
+def to_rows(results: list[tuple[str, dict]], budget: float, horizons: Horizons | None = None) -> list[dict]:
+    """Converte um lote de resultados de `market.search` em linhas de saída."""
+    rows = []
+    if any(status == 'ok' for status, _ in results):
+        rows = frame_rows(rank_frame(results, budget, horizons))
+    rows.extend(dict(data, status=status) for status, data in results if status != 'ok')
+    return rows
+
+
+def to_watchlist_rows(results: list[tuple[str, dict]], lists: list, horizons: Horizons | None = None) -> list[dict]:
+    """ Uma linha por lista que contém o ticker, com a coluna 'watchlist'.
+        Dividendos e horizontes são calculados uma vez por lote; só cotas,
+        proventos e tag são refeitos com o orçamento de cada lista.
+    """
+    from source import watchlists
+    frame = rank_frame(results, 0, horizons) if any(status == 'ok' for status, _ in results) else None
+    rows = []
+    for wl in lists:
+        shared = watchlists.fan_out(results, [wl])[wl.name]
+        ok = [market.normalize(data['ticker']) for status, data in shared if status == 'ok']
+        if ok:
+            sub = frame.loc[ok]
+            quotas, earnings, tag = analytics.evaluate(sub['price'].to_numpy(), sub['divs_year'].to_numpy(), wl.budget)
+            sub = sub.assign(quotas=quotas, earnings=earnings, tag=tag)
+            rows.extend({'watchlist': wl.name, **row} for row in frame_rows(sub))
+        rows.extend({'watchlist': wl.name, **data, 'status': status} for status, data in shared if status != 'ok')
+    return rows
+
+
+#------------------------------------------#
+# ---------------- Scan ------------------ #
+#------------------------------------------#
+def scan(tickers, budget: float, workers: int, batch_size: int, ttl: float,
+         rate: float, retries: int, writer: Writer, provider=None, horizons: Horizons | None = None,
+         metrics: Metrics | None = None, lists: list | None = None) -> int:
+    """ Busca os tickers em lotes e escreve cada resultado assim que fica pronto.
+        Os lotes são lidos sob demanda pelo agendador, então a memória
+        não cresce com o tamanho da lista. Com `lists` (watchlists), cada
+        resultado sai uma vez por lista, com o orçamento dela. Retorna o número de erros.
+    """
+    errors = 0
+
+    def on_result(results):
+        nonlocal errors
+        with stage(metrics, 'compute', [data['ticker'] for _, data in results]):
+            rows = to_watchlist_rows(results, lists, horizons) if lists else to_rows(results, budget, horizons)
+        for row in rows:
+            if row['status'] != 'ok': errors += 1
+            writer.write(row)
+        writer.flush()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        scheduler = Scheduler(
+            partial(market.search, ttl=ttl, provider=provider, metrics=metrics), executor,
+            max_concurrency=workers, rate=rate, retries=retries, metrics=metrics,
+        )
+        report = scheduler.run_sync(batches(tickers, batch_size), on_result)
+
+    print(report.summary(), file=sys.stderr)
+    return errors
+
+
+def run_scan(args) -> int:
+    db.db_init()
+    fields = FIELDS + analytics.HORIZON_FIELDS if args.horizons else FIELDS
+    provider = provider_for(args)
+    lists = None
+    if args.watchlist:
+        from source import watchlists
+        try: lists = watchlists.load(list(dict.fromkeys(args.watchlist)))
+        except ValueError as ex:
+            print(ex, file=sys.stderr)
+            return 2
+        # Cada ticker é consultado uma vez, mesmo presente em várias listas
+        tickers = watchlists.unique_tickers(lists)
+        fields = ('watchlist',) + fields
+    else:
+        tickers = tickers_for(args, provider)
+    writer = Writer(sys.stdout, args.format, fields)
+    metrics = Metrics() if args.metrics else None
+    errors = scan(
+        tickers, args.budget, args.workers, args.batch_size,
+        args.ttl, args.rate, args.retries, writer, provider,
+        horizon_source(provider) if args.horizons else None, metrics, lists,
+    )
+    if metrics is not None: metrics.write(args.metrics)
+    return 1 if errors else 0
+
+
+#------------------------------------------#
+# --------------- Alocação --------------- #
+#------------------------------------------#
+ALLOCATION_FIELDS = ('ticker', 'sector', 'price', 'divs_year', 'quotas', 'cost', 'earnings')
+
+
+def fetch_all(args) -> list[tuple[str, dict]]:
+    """Consulta todos os tickers dos argumentos e devolve a lista de resultados de `market.search`."""
+    results = []
+    provider = provider_for(args)
+    metrics = Metrics() if getattr(args, 'metrics', None) else None
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        scheduler = Scheduler(
+            partial(market.search, ttl=args.ttl, provider=provider, metrics=metrics), executor,
+            max_concurrency=args.workers, rate=args.rate, retries=args.retries, metrics=metrics,
+        )
+        report = scheduler.run_sync(batches(tickers_for(args, provider), args.batch_size), results.extend)
+    print(report.summary(), file=sys.stderr)
+    if metrics is not None: metrics.write(args.metrics)
+    return results
+
+
+def run_allocate(args) -> int:
+    """Divide o orçamento entre os tickers para maximizar os proventos anuais."""
+    from source import allocation
+    db.db_init()
+    results = fetch_all(args)
+    if not any(status == 'ok' for status, _ in results): return 1
+
+    frame = analytics.rank_results(results, str(market.start_date()), args.budget)
+    sectors = db.load_sectors(list(frame.index))
+    frame['sector'] = [sectors.get(ticker) for ticker in frame.index]
+    solve = allocation.SOLVERS[args.solver]
+    result = solve(frame['price'].to_numpy(), frame['divs_year'].to_numpy(), args.budget,
+                   args.max_asset, args.max_sector, frame['sector'].tolist())
+
+    writer = Writer(sys.stdout, args.format, ALLOCATION_FIELDS)
+    for ticker, item, quotas in zip(frame.index, frame.to_dict('records'), result.quotas.tolist()):
+        if not quotas: continue
+        writer.write({
+            'ticker': market.display_name(ticker),
+            'sector': item['sector'] or '',
+            'price': item['price'],
+            'divs_year': round(item['divs_year'], 4),
+            'quotas': quotas,
+            'cost': round(quotas * item['price'], 2),
+            'earnings': round(quotas * item['divs_year'], 2),
+        })
+    note = '' if args.solver != 'dp' or result.exact else ' (aproximado)'
+    print(f'Custo {result.cost:.2f} de {args.budget:.2f}, proventos {result.income:.2f}/ano{note}', file=sys.stderr)
+    return 0
+
+
+#------------------------------------------#
+# --------------- Snapshot --------------- #
+#------------------------------------------#
+def run_export_snapshot(args) -> int:
+    """ Atualiza o cache dos tickers e grava preços e todo o histórico de
+        dividendos armazenado em um snapshot (`source.snapshot`).
+    """
+    from source import snapshot
+    db.db_init()
+    results = fetch_all(args)
+    ok = [data['ticker'] for status, data in results if status == 'ok']
+    provider = provider_for(args)
+    if provider.cacheable:
+        quotes, dividends = db.load_quotes(ok), db.load_dividends(ok, '')
+    else:
+        # Fonte sem cache (fake): o histórico completo vem direto dela
+        fetched = {}
+        for chunk in batches(ok, args.batch_size): fetched.update(provider.fetch(chunk, market.history_start()))
+        fetched = {t: v for t, v in fetched.items() if not isinstance(v, Exception)}
+        quotes = {t: (price, provider.timestamp(t)) for t, (price, _) in fetched.items()}
+        dividends = {t: events for t, (_, events) in fetched.items()}
+    count = snapshot.export(args.path, quotes, dividends)
+    print(f'{count} tickers gravados em {args.path} ({len(results) - len(ok)} com erro)', file=sys.stderr)
+    return 0 if count else 1
+
+
+#------------------------------------------#
+# ------- Listas de acompanhamento ------- #
+#------------------------------------------#
+def run_watchlist(args) -> int:
+    """ Sem nome, mostra as listas. Com nome, cria ou atualiza a lista (os tickers
+        dados substituem os atuais) ou a apaga com `--delete`.
+    """
+    from source import watchlists
+    db.db_init()
+    budgets = db.load_watchlists()
+    if args.name is None:
+        counts = db.load_watchlist_tickers(list(budgets))
+        for name, budget in budgets.items():
+            print(f'{name}\t{budget:.2f}\t{len(counts[name])} tickers')
+        return 0
+
+    if args.delete:
+        if args.name not in budgets:
+            print(f'Lista não encontrada: {args.name}', file=sys.stderr)
+            return 2
+        db.remove_watchlist(args.name)
+        return 0
+
+    tickers = None
+    if args.file is not None: tickers = list(dict.fromkeys(read_tickers(args.file)))
+    elif args.tickers: tickers = watchlists.parse_tickers(' '.join(args.tickers))
+    budget = args.budget if args.budget is not None else budgets.get(args.name, 1000.0)
+    db.save_watchlist(args.name, budget, tickers)
+    count = len(tickers) if tickers is not None else len(db.load_watchlist_tickers([args.name])[args.name])
+    print(f'{args.name}: orçamento {budget:.2f}, {count} tickers', file=sys.stderr)
+    return 0
+
+
+def run_import(args) -> int:
+    from source import universe
+    db.db_init()
+    count = universe.import_file(args.path)
+    print(f'{count} tickers importados ou atualizados', file=sys.stderr)
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='pointer')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_source_args(cmd):
+        cmd.add_argument('--file', help="Arquivo com um ticker por linha ('-' para stdin). Padrão: banco de dados")
+        cmd.add_argument('--workers', type=positive(int), default=6, help='Máximo de lotes consultados em paralelo')
+        cmd.add_argument('--rate', type=positive(float), default=2.0, help='Requisições por segundo')
+        cmd.add_argument('--retries', type=int, default=4, help='Novas tentativas em falhas temporárias')
+        cmd.add_argument('--batch-size', type=positive(int), default=market.BATCH_SIZE)
+        cmd.add_argument('--ttl', type=float, default=market.QUOTE_TTL, help='Validade do cache de preços (s)')
+        cmd.add_argument('--provider', choices=tuple(PROVIDERS), default='yahoo', help='Fonte de dados (fake: local, sem rede)')
+        cmd.add_argument('--type', choices=('fii', 'acao'), help='Só tickers do banco deste tipo')
+        cmd.add_argument('--sector', help='Só tickers do banco deste setor')
+        cmd.add_argument('--metrics', help='Grava tempos por etapa e erros (.prom/.txt: Prometheus; outros: JSON)')
+
+    def add_fetch_args(cmd):
+        add_source_args(cmd)
+        cmd.add_argument('--budget', type=float, default=1000.0, help='Orçamento para o cálculo de cotas')
+        cmd.add_argument('--format', choices=('csv', 'jsonl'), default='csv')
+        cmd.add_argument('--snapshot', help='Pasta de um snapshot (export-snapshot): scan offline e reproduzível')
+
+    scan_cmd = commands.add_parser('scan', help='Busca os tickers sem abrir a interface')
+    add_fetch_args(scan_cmd)
+    scan_cmd.add_argument('--horizons', action='store_true', help='Inclui médias, CAGR, consistência e yield de 3/5/10 anos')
+    scan_cmd.add_argument('--watchlist', action='append', metavar='NOME',
+                          help='Escaneia a lista com o orçamento dela (repetível); tickers comuns são consultados uma vez')
+    scan_cmd.set_defaults(func=run_scan)
+
+    allocate_cmd = commands.add_parser('allocate', help='Divide o orçamento para maximizar os proventos anuais')
+    add_fetch_args(allocate_cmd)
+    allocate_cmd.add_argument('--max-asset', type=float, help='Fração máxima do orçamento em um ativo (ex: 0.2)')
+    allocate_cmd.add_argument('--max-sector', type=float, help='Fração máxima do orçamento em um setor (ex: 0.4)')
+    allocate_cmd.add_argument('--solver', choices=('dp', 'greedy'), default='dp',
+                              help='dp: programação dinâmica (ótima em centavos quando cabe na memória, '
+                                   'senão aproximada); greedy: maior yield primeiro')
+    allocate_cmd.set_defaults(func=run_allocate)
+
+    export_cmd = commands.add_parser('export-snapshot', help='Grava preços e dividendos em um snapshot offline')
+    export_cmd.add_argument('path', help='Pasta do snapshot')
+    add_source_args(export_cmd)
+    export_cmd.set_defaults(func=run_export_snapshot)
+
+    watchlist_cmd = commands.add_parser('watchlist', help='Mostra, cria, atualiza ou apaga listas de acompanhamento')
+    watchlist_cmd.add_argument('name', nargs='?', help='Nome da lista (sem nome: mostra todas)')
+    watchlist_cmd.add_argument('tickers', nargs='*', help='Tickers da lista (substituem os atuais)')
+    watchlist_cmd.add_argument('--budget', type=float, help='Orçamento da lista')
+    watchlist_cmd.add_argument('--file', help="Arquivo com um ticker por linha ('-' para stdin)")
+    watchlist_cmd.add_argument('--delete', action='store_true', help='Apaga a lista')
+    watchlist_cmd.set_defaults(func=run_watchlist)
+
+    import_cmd = commands.add_parser('import', help='Cadastra um universo de tickers (CSV ou JSON) em uma transação')
+    import_cmd.add_argument('path', help='Arquivo com as colunas ticker[, tipo][, setor]')
+    import_cmd.set_defaults(func=run_import)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
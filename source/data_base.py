@@ -1,74 +1,449 @@
 import sqlite3 as sql
 import os
+import threading
+from contextlib import contextmanager
 
 # Caminho e nome do banco
 DB_FOLDER = "database"
 DB_NAME = "tickers"
 DB_PATH = os.path.join(DB_FOLDER, f"{DB_NAME}.db")
 
+# Máximo de parâmetros por consulta `IN (...)`
+MAX_PARAMS = 500
 
-def connect() -> tuple[sql.Connection, sql.Cursor]:
-    # Cria a pasta se não existir
-    os.makedirs(DB_FOLDER, exist_ok=True)
+# Conexão única, compartilhada entre as threads (acesso serializado pelo lock)
+_lock = threading.RLock()
+_connection: sql.Connection | None = None
+_connection_path: str | None = None
 
-    # Cria (ou abre) o banco de dados
-    connection = sql.connect(f'{DB_PATH}')
-    cursor = connection.cursor()
 
-    return connection, cursor
+def connect() -> sql.Connection:
+    "Retorna a conexão compartilhada, abrindo-a na primeira chamada."
+    global _connection, _connection_path
+    with _lock:
+        if _connection is not None and _connection_path == DB_PATH:
+            return _connection
+        close()
+
+        # Cria a pasta se não existir
+        os.makedirs(DB_FOLDER, exist_ok=True)
+
+        # Cria (ou abre) o banco de dados
+        _connection = sql.connect(DB_PATH, check_same_thread=False)
+        _connection.execute('PRAGMA journal_mode=WAL')
+        _connection.execute('PRAGMA synchronous=NORMAL')
+        _connection_path = DB_PATH
+        return _connection
+
+
+def close():
+    "Fecha a conexão compartilhada."
+    global _connection, _connection_path
+    with _lock:
+        if _connection is not None:
+            _connection.close()
+        _connection, _connection_path = None, None
+
+
+@contextmanager
+def transaction():
+    "Cursor exclusivo da conexão; commit ao final ou rollback em erro."
+    with _lock:
+        connection = connect()
+        cursor = connection.cursor()
+        try:
+            yield cursor
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+
+def _placeholders(ids) -> str:
+    return ', '.join('?' * len(ids))
+
+
+def _batches(ids: list):
+    "Divide listas grandes para respeitar o limite de parâmetros do SQLite."
+    ids = list(ids)
+    for i in range(0, len(ids), MAX_PARAMS):
+        yield ids[i:i + MAX_PARAMS]
 
 
 def db_init():
-    connection, cursor = connect()
-    cursor.execute(
+    with transaction() as cursor:
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tickers (
+                id TEXT UNIQUE
+            )
         """
-        CREATE TABLE IF NOT EXISTS tickers (
-            id TEXT UNIQUE
         )
-    """
-    )
-    connection.commit()
-    connection.close()
+        # Metadados do ativo (asset_type: 'fii' ou 'acao'); bancos antigos ganham as colunas
+        cursor.execute('PRAGMA table_info(tickers)')
+        columns = {row[1] for row in cursor.fetchall()}
+        for column in ('asset_type', 'sector'):
+            if column not in columns:
+                cursor.execute(f'ALTER TABLE tickers ADD COLUMN {column} TEXT')
+        # Filtro do scan por tipo (e setor) ou só por setor
+        cursor.execute('CREATE INDEX IF NOT EXISTS tickers_type_sector ON tickers (asset_type, sector)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS tickers_sector ON tickers (sector)')
+        # Cache do último preço consultado (updated = timestamp unix)
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS quotes (
+                id TEXT PRIMARY KEY,
+                price REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+        """
+        )
+        # Histórico de dividendos, um evento por data
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS dividends (
+                id TEXT NOT NULL,
+                date TEXT NOT NULL,
+                value REAL NOT NULL,
+                PRIMARY KEY (id, date)
+            )
+        """
+        )
+        # Agregado anual dos dividendos (months = bitmask dos meses com pagamento),
+        # mantido pelos triggers abaixo a cada evento novo ou corrigido
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS dividend_years (
+                id TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                total REAL NOT NULL,
+                months INTEGER NOT NULL,
+                PRIMARY KEY (id, year)
+            )
+        """
+        )
+        cursor.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS dividends_insert AFTER INSERT ON dividends
+            BEGIN
+                INSERT INTO dividend_years (id, year, total, months)
+                VALUES (
+                    NEW.id,
+                    CAST(substr(NEW.date, 1, 4) AS INTEGER),
+                    NEW.value,
+                    1 << (CAST(substr(NEW.date, 6, 2) AS INTEGER) - 1)
+                )
+                ON CONFLICT (id, year) DO UPDATE SET
+                    total = total + excluded.total,
+                    months = months | excluded.months;
+            END
+        """
+        )
+        cursor.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS dividends_update AFTER UPDATE OF value ON dividends
+            BEGIN
+                UPDATE dividend_years SET total = total - OLD.value + NEW.value
+                WHERE id = NEW.id AND year = CAST(substr(NEW.date, 1, 4) AS INTEGER);
+            END
+        """
+        )
+        # Último resultado de cada ticker, exibido ao abrir o programa
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS scan_results (
+                id TEXT PRIMARY KEY,
+                price REAL,
+                divs_year REAL,
+                quotas INTEGER,
+                earnings REAL,
+                tag TEXT,
+                error INTEGER NOT NULL DEFAULT 0,
+                fetched REAL
+            )
+        """
+        )
+        # Listas de acompanhamento, cada uma com o seu orçamento
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS watchlists (
+                name TEXT PRIMARY KEY,
+                budget REAL NOT NULL
+            )
+        """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS watchlist_tickers (
+                watchlist TEXT NOT NULL,
+                id TEXT NOT NULL,
+                PRIMARY KEY (watchlist, id)
+            )
+        """
+        )
+        # Bancos antigos: monta o agregado a partir dos eventos já gravados
+        cursor.execute('SELECT EXISTS (SELECT 1 FROM dividend_years)')
+        if not cursor.fetchone()[0]:
+            cursor.execute(
+                """
+                INSERT INTO dividend_years (id, year, total, months)
+                SELECT id, year, SUM(total), SUM(bit) FROM (
+                    SELECT id,
+                           CAST(substr(date, 1, 4) AS INTEGER) AS year,
+                           1 << (CAST(substr(date, 6, 2) AS INTEGER) - 1) AS bit,
+                           SUM(value) AS total
+                    FROM dividends GROUP BY id, year, bit
+                ) GROUP BY id, year
+            """
+            )
 
 
+#------------------------------------------#
+# ---------------- Tickers --------------- #
+#------------------------------------------#
 def save_ticket(id):
-    connection, cursor = connect()
     try:
-        cursor.execute('INSERT INTO tickers (id) VALUES (?)', (id,))
-        connection.commit()
+        with transaction() as cursor:
+            cursor.execute('INSERT INTO tickers (id) VALUES (?)', (id,))
     except sql.IntegrityError:
         print('IntegrityError')
-    connection.close()
 
 
-def load_tickers():
-    connection, cursor = connect()
-    cursor.execute('SELECT id FROM tickers')
-    data = [item[0] for item in cursor.fetchall()]
-    connection.close()
+def load_tickers(asset_type: str | None = None, sector: str | None = None):
+    "Retorna os tickers cadastrados, opcionalmente só de um tipo e/ou setor (filtro pelos índices)."
+    where, params = [], []
+    if asset_type is not None:
+        where.append('asset_type = ?')
+        params.append(asset_type)
+    if sector is not None:
+        where.append('sector = ?')
+        params.append(sector)
+    query = 'SELECT id FROM tickers' + (f' WHERE {" AND ".join(where)}' if where else '')
+    with transaction() as cursor:
+        cursor.execute(query, params)
+        return [item[0] for item in cursor.fetchall()]
+
+
+def load_sectors(ids: list[str]) -> dict[str, str | None]:
+    "Retorna {id: setor} dos tickers cadastrados."
+    data = {}
+    with transaction() as cursor:
+        for batch in _batches(ids):
+            cursor.execute(f'SELECT id, sector FROM tickers WHERE id IN ({_placeholders(batch)})', batch)
+            data.update(cursor.fetchall())
     return data
 
 
+def ticker_exists(id) -> bool:
+    "Verifica se o ticker está cadastrado (busca pelo índice UNIQUE)."
+    with transaction() as cursor:
+        cursor.execute('SELECT 1 FROM tickers WHERE id = ? LIMIT 1', (id,))
+        return cursor.fetchone() is not None
+
+
 def remove_ticker(id):
     "Deleta um ticker do banco de dados."
-    connection, cursor = connect()
     try:
-        cursor.execute(f'DELETE FROM tickers WHERE id = (?)', (id,))
-        connection.commit()
+        with transaction() as cursor:
+            cursor.execute('DELETE FROM tickers WHERE id = (?)', (id,))
     except Exception as ex:
         print(f'Erro {ex}')
-    finally:
-        connection.close()
+
 
 def edit_ticker(old_id, new_id):
     "Renomeia um ticker existente no banco de dados."
-    connection, cursor = connect()
     try:
-        cursor.execute('UPDATE tickers SET id = ? WHERE id = ?', (new_id, old_id))
-        connection.commit()
+        with transaction() as cursor:
+            cursor.execute('UPDATE tickers SET id = ? WHERE id = ?', (new_id, old_id))
     except sql.IntegrityError:
         print(f"Já existe um ticker com o nome '{new_id}'.")
     except sql.OperationalError as e:
         print(f"Erro ao editar ticker: {e}")
-    finally:
-        connection.close()
\ No newline at end of file
+
+
+#------------------------------------------#
+# ------------ Operações em lote --------- #
+#------------------------------------------#
+def save_tickers(ids: list[str]) -> int:
+    "Cadastra vários tickers em uma transação. Ignora os já cadastrados; retorna quantos entraram."
+    with transaction() as cursor:
+        cursor.executemany('INSERT OR IGNORE INTO tickers (id) VALUES (?)', ((id,) for id in ids))
+        return cursor.rowcount
+
+
+def import_tickers(rows: list[tuple[str, str | None, str | None]]) -> int:
+    """ Cadastra ou atualiza [(id, tipo, setor), ...] em uma transação.
+        Tipo ou setor vazio (None) mantém o valor já cadastrado; retorna quantas linhas mudaram.
+    """
+    with transaction() as cursor:
+        cursor.executemany(
+            """INSERT INTO tickers (id, asset_type, sector) VALUES (?, ?, ?)
+               ON CONFLICT (id) DO UPDATE SET
+                   asset_type = COALESCE(excluded.asset_type, asset_type),
+                   sector = COALESCE(excluded.sector, sector)""",
+            rows,
+        )
+        return cursor.rowcount
+
+
+def remove_tickers(ids: list[str]) -> int:
+    "Deleta vários tickers em uma transação; retorna quantos saíram."
+    with transaction() as cursor:
+        cursor.executemany('DELETE FROM tickers WHERE id = ?', ((id,) for id in ids))
+        return cursor.rowcount
+
+
+def rename_tickers(pairs: list[tuple[str, str]]) -> int:
+    "Renomeia [(antigo, novo), ...] em uma transação. Ignora nomes já usados; retorna quantos mudaram."
+    with transaction() as cursor:
+        cursor.executemany('UPDATE OR IGNORE tickers SET id = ? WHERE id = ?', ((new, old) for old, new in pairs))
+        return cursor.rowcount
+
+
+#------------------------------------------#
+# --------- Listas de acompanhamento ----- #
+#------------------------------------------#
+def load_watchlists() -> dict[str, float]:
+    "Retorna {nome: orçamento} das listas, em ordem alfabética."
+    with transaction() as cursor:
+        cursor.execute('SELECT name, budget FROM watchlists ORDER BY name')
+        return dict(cursor.fetchall())
+
+
+def load_watchlist_tickers(names: list[str]) -> dict[str, list[str]]:
+    "Retorna {nome: [id, ...]} das listas pedidas."
+    data = {name: [] for name in names}
+    with transaction() as cursor:
+        for batch in _batches(names):
+            cursor.execute(
+                f'SELECT watchlist, id FROM watchlist_tickers WHERE watchlist IN ({_placeholders(batch)}) ORDER BY rowid',
+                batch,
+            )
+            for name, id in cursor.fetchall():
+                data[name].append(id)
+    return data
+
+
+def save_watchlist(name: str, budget: float, ids: list[str] | None = None):
+    "Cria ou atualiza uma lista em uma transação. Com `ids`, substitui os tickers da lista."
+    with transaction() as cursor:
+        cursor.execute(
+            'INSERT INTO watchlists (name, budget) VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET budget = excluded.budget',
+            (name, budget),
+        )
+        if ids is not None:
+            cursor.execute('DELETE FROM watchlist_tickers WHERE watchlist = ?', (name,))
+            cursor.executemany(
+                'INSERT OR IGNORE INTO watchlist_tickers (watchlist, id) VALUES (?, ?)', ((name, id) for id in ids)
+            )
+
+
+def remove_watchlist(name: str):
+    "Deleta uma lista e os seus tickers."
+    with transaction() as cursor:
+        cursor.execute('DELETE FROM watchlist_tickers WHERE watchlist = ?', (name,))
+        cursor.execute('DELETE FROM watchlists WHERE name = ?', (name,))
+
+
+#------------------------------------------#
+# ---------- Cache de cotações ----------- #
+#------------------------------------------#
+def load_quotes(ids: list[str]) -> dict[str, tuple[float, float]]:
+    "Retorna {id: (preço, timestamp)} dos tickers com preço em cache."
+    data = {}
+    with transaction() as cursor:
+        for batch in _batches(ids):
+            cursor.execute(
+                f'SELECT id, price, updated FROM quotes WHERE id IN ({_placeholders(batch)})', batch
+            )
+            data.update((row[0], (row[1], row[2])) for row in cursor.fetchall())
+    return data
+
+
+def save_quotes(rows: list[tuple[str, float, float]]):
+    "Grava (id, preço, timestamp) no cache de cotações."
+    with transaction() as cursor:
+        cursor.executemany('INSERT OR REPLACE INTO quotes (id, price, updated) VALUES (?, ?, ?)', rows)
+
+
+def last_dividend_dates(ids: list[str]) -> dict[str, str]:
+    "Retorna {id: data do último dividendo armazenado}."
+    data = {}
+    with transaction() as cursor:
+        for batch in _batches(ids):
+            cursor.execute(
+                f'SELECT id, MAX(date) FROM dividends WHERE id IN ({_placeholders(batch)}) GROUP BY id', batch
+            )
+            data.update(cursor.fetchall())
+    return data
+
+
+def save_dividends(rows: list[tuple[str, str, float]]):
+    "Grava eventos (id, data, valor) de dividendos, sem duplicar datas."
+    with transaction() as cursor:
+        # Upsert (e não REPLACE) para os triggers do agregado anual contarem só a diferença
+        cursor.executemany(
+            """INSERT INTO dividends (id, date, value) VALUES (?, ?, ?)
+               ON CONFLICT (id, date) DO UPDATE SET value = excluded.value
+               WHERE value != excluded.value""",
+            rows,
+        )
+
+
+def load_dividends(ids: list[str], since: str) -> dict[str, list[tuple[str, float]]]:
+    "Retorna {id: [(data, valor), ...]} em ordem de data, a partir de `since`."
+    data = {}
+    with transaction() as cursor:
+        for batch in _batches(ids):
+            cursor.execute(
+                f"""SELECT id, date, value FROM dividends
+                    WHERE id IN ({_placeholders(batch)}) AND date >= ?
+                    ORDER BY id, date""",
+                (*batch, since),
+            )
+            for id, day, value in cursor.fetchall():
+                data.setdefault(id, []).append((day, value))
+    return data
+
+
+def load_dividend_years(ids: list[str]) -> list[tuple[str, int, float, int]]:
+    "Retorna [(id, ano, total, bitmask dos meses com pagamento), ...]."
+    data = []
+    with transaction() as cursor:
+        for batch in _batches(ids):
+            cursor.execute(
+                f'SELECT id, year, total, months FROM dividend_years WHERE id IN ({_placeholders(batch)})', batch
+            )
+            data.extend(cursor.fetchall())
+    return data
+
+
+#------------------------------------------#
+# ---------- Snapshot do último scan ----- #
+#------------------------------------------#
+def save_scan_results(rows: list[tuple]):
+    "Grava (id, preço, div. ano, cotas, proventos, tag, erro, timestamp) do último scan."
+    with transaction() as cursor:
+        cursor.executemany(
+            """INSERT OR REPLACE INTO scan_results
+               (id, price, divs_year, quotas, earnings, tag, error, fetched)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            rows,
+        )
+
+
+def load_scan_results() -> list[tuple]:
+    "Retorna as linhas do último scan, na mesma ordem de `save_scan_results`."
+    with transaction() as cursor:
+        cursor.execute(
+            'SELECT id, price, divs_year, quotas, earnings, tag, error, fetched FROM scan_results'
+        )
+        return cursor.fetchall()
+
+
+def remove_scan_results(ids: list[str]):
+    "Remove do snapshot os tickers que não estão mais cadastrados."
+    with transaction() as cursor:
+        cursor.executemany('DELETE FROM scan_results WHERE id = ?', ((id,) for id in ids))
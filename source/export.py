@@ -0,0 +1,73 @@
+""" Exportação dos resultados da tabela para CSV ou XLSX.
+
+    Roda fora da main thread e escreve as linhas em blocos de CHUNK, sem
+    montar o documento inteiro na memória: o CSV vai direto para o arquivo
+    e o XLSX usa o modo `write_only` do openpyxl, que grava cada linha ao
+    ser adicionada.
+"""
+# Imports
+import csv
+import threading
+from datetime import datetime
+from typing import Callable, Sequence
+# Modulos
+from source.model import COLUMNS, Row
+
+CHUNK = 5_000  # linhas escritas entre dois avisos de progresso
+FORMATS = ('csv', 'xlsx')
+
+
+def record(row: Row) -> tuple:
+    """ Linha exportada, na ordem de COLUMNS: valores numéricos (não o texto da
+        tabela) e a data da consulta em vez da idade. Erros ficam com células vazias.
+    """
+    updated = datetime.fromtimestamp(row.fetched).isoformat(sep=' ', timespec='seconds')
+    if row.error: return (row.ticker, None, None, None, None, updated)
+    return (row.ticker, row.price, round(row.divs_year, 4), row.quotas, row.earnings, updated)
+
+
+def file_format(path: str) -> str:
+    """Formato pela extensão do arquivo; qualquer outra extensão vira CSV."""
+    return 'xlsx' if path.lower().endswith('.xlsx') else 'csv'
+
+
+def _openpyxl():
+    """O openpyxl é opcional e só é importado ao exportar XLSX."""
+    try:
+        import openpyxl
+    except ImportError:
+        raise RuntimeError('Exportar XLSX requer o pacote openpyxl (pip install openpyxl)') from None
+    return openpyxl
+
+
+def write(path: str, rows: Sequence[Row], on_progress: Callable[[int, int], None] | None = None,
+          cancel: threading.Event | None = None, chunk: int = CHUNK) -> int:
+    """ Escreve as linhas em `path` (CSV ou XLSX pela extensão), bloco a bloco,
+        chamando `on_progress(escritas, total)` após cada bloco.
+        Com `cancel` setado, para no próximo bloco. Retorna quantas linhas escreveu.
+    """
+    total = len(rows)
+    written = 0
+
+    def chunks():
+        nonlocal written
+        for start in range(0, total, chunk):
+            if cancel is not None and cancel.is_set(): return
+            block = [record(row) for row in rows[start:start + chunk]]
+            yield block
+            written += len(block)
+            if on_progress is not None: on_progress(written, total)
+
+    if file_format(path) == 'xlsx':
+        workbook = _openpyxl().Workbook(write_only=True)
+        sheet = workbook.create_sheet('Pointer')
+        sheet.append(COLUMNS)
+        for block in chunks():
+            for values in block: sheet.append(values)
+        workbook.save(path)
+    else:
+        with open(path, 'w', newline='', encoding='utf-8') as stream:
+            writer = csv.writer(stream)
+            writer.writerow(COLUMNS)
+            for block in chunks(): writer.writerows(block)
+    return written
@@ -0,0 +1,80 @@
+""" Índice em memória dos resultados, para a barra de filtros.
+
+    Cada coluna numérica vira um array ordenado (valores + posições das
+    linhas), então uma faixa [mín, máx] é resolvida com duas buscas binárias.
+    O ticker usa uma lista ordenada, e um prefixo também vira uma faixa.
+"""
+# Imports
+from bisect import bisect_left
+import numpy as np
+
+# Campos numéricos filtráveis (dy = dividendos no ano / preço)
+FIELDS = ('price', 'divs_year', 'dy', 'quotas', 'earnings')
+
+
+class ResultIndex:
+    """ Índice das linhas de um `ResultModel`. Refeito só quando o modelo muda
+        (`model.version`). Linhas de erro não entram nas faixas numéricas.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.version = None
+        self.iids = np.empty(0, dtype=object)
+        self.sorted: dict[str, tuple[np.ndarray, np.ndarray]] = {}  # campo -> (valores, posições)
+        self.names: list[str] = []  # tickers ordenados
+        self.name_pos = np.empty(0, dtype=np.int64)
+
+    def build(self):
+        """Refaz os arrays ordenados a partir do modelo, se ele mudou."""
+        if self.version == self.model.version: return
+        rows = list(self.model.rows.values())
+        self.iids = np.array([row.ticker for row in rows], dtype=object)
+
+        nan = float('nan')
+        columns = {
+            'price': [nan if row.error else row.price for row in rows],
+            'divs_year': [nan if row.error else row.divs_year for row in rows],
+            'quotas': [nan if row.error else row.quotas for row in rows],
+            'earnings': [nan if row.error else row.earnings for row in rows],
+        }
+        with np.errstate(divide='ignore', invalid='ignore'):
+            price = np.array(columns['price'], dtype=float)
+            columns['dy'] = np.where(price > 0, np.array(columns['divs_year'], dtype=float) / price, nan)
+
+        # NaN fica no fim da ordenação e nunca cai dentro de uma faixa
+        for field in FIELDS:
+            values = np.asarray(columns[field], dtype=float)
+            order = np.argsort(values, kind='stable')
+            self.sorted[field] = (values[order], order)
+
+        order = np.argsort(self.iids, kind='stable')
+        self.names = self.iids[order].tolist()
+        self.name_pos = order
+        self.version = self.model.version
+
+    def query(self, prefix: str = '', ranges: dict[str, tuple[float | None, float | None]] | None = None
+              ) -> set[str]:
+        """ iids das linhas cujo ticker começa com `prefix` e cujos campos estão
+            dentro de {campo: (mín, máx)} (limites inclusivos; None = sem limite).
+        """
+        self.build()
+        mask = np.ones(len(self.iids), dtype=bool)
+
+        prefix = prefix.strip().upper()
+        if prefix:
+            lo = bisect_left(self.names, prefix)
+            hi = bisect_left(self.names, prefix + '\uffff', lo)
+            mask[:] = False
+            mask[self.name_pos[lo:hi]] = True
+
+        for field, (low, high) in (ranges or {}).items():
+            if low is None and high is None: continue
+            values, order = self.sorted[field]
+            lo = 0 if low is None else np.searchsorted(values, low, side='left')
+            hi = np.searchsorted(values, np.inf if high is None else high, side='right')
+            inside = np.zeros(len(self.iids), dtype=bool)
+            inside[order[lo:hi]] = True
+            mask &= inside
+
+        return set(self.iids[mask].tolist())
@@ -3,20 +3,23 @@
 # Tkinter UI
 import tkinter as tk
 from tkinter import ttk, messagebox
-# Data manager
-from datetime import date
-from dateutil.relativedelta import relativedelta
 # Functions
-import yfinance as yf
+import queue
+import threading
 from functools import partial
-from math import floor
 from concurrent.futures import ThreadPoolExecutor
 # Modulos 
 from source import (
     icons,
     data_base as db,
+    market,
+    refresh,
+    startup,
     ui_frame
 )
+from source.metrics import Metrics, stage
+from source.model import COLUMNS, ResultModel
+from source.scheduler import InFlight, Scheduler
 
 # String para a moeda Real br
 class RealString(tk.StringVar):
@@ -47,9 +50,20 @@ class RealString(tk.StringVar):
 
 # ----------------- Main ----------------- #
 class App(tk.Tk):
-    WINDOW_WIDTH = 600 # Largura da janela principal
+    WINDOW_WIDTH = 760 # Largura da janela principal
     WINDOW_HEIGHT = 600 # Autura da janela principal
     MAX_WORKERS = 6  # limite de threads para consultas
+    REQUEST_RATE = 2.0  # requisições por segundo
+    BATCH_SIZE = market.BATCH_SIZE  # tickers por requisição em lote
+    QUOTE_TTL = market.QUOTE_TTL  # validade do preço em cache (segundos)
+    FRAME_MS = 16  # intervalo da bomba de resultados (~60 quadros/s)
+    PUMP_CHUNK = 500  # máximo de linhas inseridas por quadro
+    FILTER_MS = 250  # intervalo mínimo para refiltrar a tabela durante um scan
+    AGE_MS = 60_000  # intervalo de atualização da coluna 'Atualizado'
+    REFRESH_MS = 5_000  # intervalo do ciclo de atualização automática
+    REFRESH_PER_MINUTE = 6  # orçamento de requisições por minuto da atualização automática
+    REFRESH_OFF_HOURS_TTL = 6 * 3600  # validade de uma linha fora do pregão (segundos)
+    ALL_TICKERS = 'Todos'  # opção da lista de acompanhamento com todos os tickers do DB
 
     def __init__(self):
         super().__init__()
@@ -59,32 +73,127 @@ class App(tk.Tk):
 
         # Definindo variaveis
         self.budget = RealString(self, 1000)
+        # Lista de acompanhamento exibida; 'Todos' usa o orçamento da tela, as listas o seu próprio
+        self.watchlist = tk.StringVar(self, self.ALL_TICKERS)
+        self.active_watchlist = self.ALL_TICKERS
+        self.all_budget = self.budget._get()
 
         # Controle de Execução
         self.executor = ThreadPoolExecutor(max_workers=self.MAX_WORKERS)
+        # Gravações do último scan no DB, fora da main thread e na ordem em que foram pedidas
+        self.db_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db')
         self.total_tickers = 0
         self.processed_tickers = 0
-
-
-        db.db_init() # Carrega o Banco de dados
-        self.create_ui() # Carrega a Interfase grafica
+        # Resultados das threads, drenados pela main thread em `_pump`
+        self.result_queue = queue.SimpleQueue()
+        # Cada scan tem um id de geração; resultados de scans antigos são descartados
+        self.generation = 0
+        self.scan_cancel = threading.Event()
+        # Tickers em consulta, compartilhados entre scans sobrepostos
+        self.in_flight = InFlight()
+        # Fonte de dados de mercado
+        self.provider = market.default_provider
+        # Tempos por etapa e erros do scan atual (painel de diagnóstico)
+        self.metrics = Metrics()
+        # Atualização automática: um lote de tickers vencidos por ciclo, fora dos scans
+        self.auto_refresh = tk.BooleanVar(self, True)
+        self.refresh = refresh.RefreshPlanner(
+            self.QUOTE_TTL, self.REFRESH_OFF_HOURS_TTL, self.REFRESH_PER_MINUTE, self.BATCH_SIZE
+        )
+        self.scanning = False
+        self.refreshing = False
+        # Com o último scan na tabela, atualiza em segundo plano quando os imports estiverem prontos
+        self.refresh_on_warm = False
+        # Exportação em segundo plano (progresso pela fila de resultados)
+        self.exporting = False
+        self.export_cancel = threading.Event()
+
+        # Modelo de resultados, indexado pelo iid da tabela
+        self.model = ResultModel()
+        # Barra de filtros: índice do modelo (criado no primeiro filtro) e ordenação atual
+        self.index = None
+        self.sort_state = None  # (coluna, crescente)
+        self.order_cache = (None, [])  # ((sort_state, model.version), iids na ordem atual)
+        self.filter_pending = False  # refiltragem agendada pelos lotes do scan
+        self.filter_vars = {name: tk.StringVar(self) for name in ('ticker', 'dy_min', 'dy_max', 'price_min', 'price_max')}
+
+
+        with startup.phase('db_init'): db.db_init() # Carrega o Banco de dados
+        with startup.phase('create_ui'): self.create_ui() # Carrega a Interfase grafica
+        with startup.phase('load_last_scan'): self.load_last_scan() # Exibe o último scan salvo, sem consultar a rede
+        self.after_idle(self._on_first_paint)
+        self.after(self.FRAME_MS, self._pump)
+        self.after(self.AGE_MS, self._refresh_ages)
+        self.after(self.REFRESH_MS, self._auto_refresh)
 
     def sort_column(self, col: str):
-        """ Ordena a coluna do Treeview.
-            Tenta ordenar numericamente quando possivel.
+        """ Ordena a coluna do Treeview pelas chaves numéricas do modelo.
+            Linhas de erro ficam no fim. Reordena com um único set_children,
+            mantendo de fora as linhas escondidas pelo filtro.
         """
-        children = self.table.get_children('')
-        data = [(self.table.set(k, col), k) for k in children]
-        try:
-            # Tenta utilizar como float
-            data.sort(key=lambda t: float(str(t[0]).replace(',', '.')),reverse=not self.sorting_order[col])
-        except Exception:
-            # Caso não utiliza str
-            data.sort(key=lambda t: str(t[0]), reverse=not self.sorting_order[col])
-
-        for index, (_, k) in enumerate(data):
-            self.table.move(k, '', index)
+        self.sort_state = (col, self.sorting_order[col])
         self.sorting_order[col] = not self.sorting_order[col]
+        self.apply_filter()
+
+    #------------------------------------------#
+    # ---------------- Filtros --------------- #
+    #------------------------------------------#
+    def current_filter(self) -> tuple[str, dict] | None:
+        """(prefixo, {campo: (mín, máx)}) da barra de filtros, ou None se está vazia."""
+        def number(name, scale=1.0):
+            text = self.filter_vars[name].get().strip().replace(',', '.')
+            try: return float(text) * scale if text else None
+            except ValueError: return None
+
+        prefix = self.filter_vars['ticker'].get()
+        ranges = {
+            'dy': (number('dy_min', 0.01), number('dy_max', 0.01)),
+            'price': (number('price_min'), number('price_max')),
+        }
+        if not prefix.strip() and all(bounds == (None, None) for bounds in ranges.values()):
+            return None
+        return prefix, ranges
+
+    def apply_filter(self, *args):
+        """ Mostra só as linhas que passam no filtro, na ordem atual. As demais são
+            desanexadas (não apagadas) pelo mesmo set_children.
+        """
+        order = self.current_order()
+        spec = self.current_filter()
+        if spec is not None:
+            if self.index is None:
+                # NumPy é carregado só no primeiro filtro
+                from source.filters import ResultIndex
+                self.index = ResultIndex(self.model)
+            keep = self.index.query(*spec)
+            order = [iid for iid in order if iid in keep]
+        self.table.set_children('', *order)
+
+    def current_order(self) -> list[str]:
+        """ iids na ordem atual da tabela. A ordenação só é refeita quando a
+            coluna ou o modelo (`model.version`) mudam, não a cada tecla do filtro.
+        """
+        key = (self.sort_state, self.model.version)
+        if self.order_cache[0] != key:
+            if self.sort_state is None: order = list(self.model.rows)
+            else: order = self.model.sorted_iids(*self.sort_state)
+            self.order_cache = (key, order)
+        return self.order_cache[1]
+
+    def schedule_filter(self):
+        """ Refiltra no máximo a cada FILTER_MS: durante um scan o modelo muda a
+            cada quadro, e refazer índice e ordenação em todos eles travaria a tabela.
+        """
+        if self.filter_pending: return
+        self.filter_pending = True
+        self.after(self.FILTER_MS, self._apply_pending_filter)
+
+    def _apply_pending_filter(self):
+        self.filter_pending = False
+        if self.current_filter() is not None: self.apply_filter()
+
+    def clear_filter(self):
+        for var in self.filter_vars.values(): var.set('')
 
 
     def create_ui(self):
@@ -99,7 +208,14 @@ class App(tk.Tk):
         )
         budget_entry.pack(side='left')
         for ev in ('<FocusOut>', '<Return>'):
-            budget_entry.bind(ev, lambda x: self.budget._set(budget_entry.get()))
+            budget_entry.bind(ev, lambda x: self.on_budget_change(budget_entry.get()))
+
+        # Lista de acompanhamento
+        ttk.Label(interact_frame, text='Lista:').pack(side='left', padx=(10, 2))
+        watchlist_box = ttk.Combobox(interact_frame, textvariable=self.watchlist, state='readonly', width=10)
+        watchlist_box.configure(postcommand=lambda: watchlist_box.configure(values=(self.ALL_TICKERS, *db.load_watchlists())))
+        watchlist_box.pack(side='left')
+        watchlist_box.bind('<<ComboboxSelected>>', lambda x: self.on_watchlist_change())
 
         # Carrega ícones
         self.icon_search = tk.PhotoImage(data=icons.img_lupa)
@@ -112,7 +228,7 @@ class App(tk.Tk):
         #------------------------------------------#
 
         # Botão de Busca
-        bt = ttk.Button(interact_frame, command=self.load_table)
+        bt = ttk.Button(interact_frame, command=partial(self.load_table, clear=False))
         bt.configure(image=self.icon_search) if self.icon_search else bt.configure(text='buscar')
         bt.pack(side='left', padx=5)
 
@@ -121,6 +237,36 @@ class App(tk.Tk):
         bt.configure(image=self.icon_new_ticker) if self.icon_new_ticker else bt.configure(text='Novo ticker')
         bt.pack(side='left', padx=5)
 
+        # Botão de importação em lote
+        ttk.Button(interact_frame, text='Importar', command=partial(ui_frame.import_universe, self)).pack(side='left', padx=5)
+
+        # Botão de alocação do orçamento
+        ttk.Button(interact_frame, text='Alocar', command=partial(ui_frame.pop_up_allocation, self)).pack(side='left', padx=5)
+
+        # Edição das listas de acompanhamento
+        ttk.Button(interact_frame, text='Listas', command=partial(ui_frame.pop_up_watchlist, self)).pack(side='left', padx=5)
+
+        # Atualização automática
+        ttk.Checkbutton(interact_frame, text='Auto', variable=self.auto_refresh).pack(side='left', padx=5)
+
+        #------------------------------------------#
+        # ------------ Barra de filtros ---------- #
+        #------------------------------------------#
+        filter_frame = ttk.Frame(self, padding=(10, 0))
+        filter_frame.pack(side='top', fill='x')
+
+        ttk.Label(filter_frame, text='Ativo:').pack(side='left', padx=(5, 2))
+        ttk.Entry(filter_frame, textvariable=self.filter_vars['ticker'], width=8).pack(side='left')
+        for label, low, high in (('DY %:', 'dy_min', 'dy_max'), ('Preço:', 'price_min', 'price_max')):
+            ttk.Label(filter_frame, text=label).pack(side='left', padx=(10, 2))
+            ttk.Entry(filter_frame, textvariable=self.filter_vars[low], width=6, justify='right').pack(side='left')
+            ttk.Label(filter_frame, text='a').pack(side='left', padx=2)
+            ttk.Entry(filter_frame, textvariable=self.filter_vars[high], width=6, justify='right').pack(side='left')
+        ttk.Button(filter_frame, text='Limpar', command=self.clear_filter).pack(side='left', padx=10)
+
+        # Filtra a cada tecla
+        for var in self.filter_vars.values(): var.trace_add('write', self.apply_filter)
+
         #------------------------------------------#
         # ---------------- Tabela ---------------- #
         #------------------------------------------#
@@ -130,7 +276,7 @@ class App(tk.Tk):
         treeview_frame.pack(expand=True, fill='both', padx=8, pady=(4, 0))
 
         # Colunas
-        columns = ('Ativo', 'Preço', 'Med. Div.', 'N Cotas', 'Proventos')
+        columns = COLUMNS
         self.sorting_order = {col: True for col in columns}
 
         # Tabela
@@ -162,9 +308,15 @@ class App(tk.Tk):
         progress_frame.pack(fill='x', pady=8, padx=8)
 
         # Barra de Progresso
-        self.progress = ttk.Progressbar(progress_frame, orient='horizontal', length=400, mode='determinate')
+        self.progress = ttk.Progressbar(progress_frame, orient='horizontal', length=320, mode='determinate')
         self.progress.pack(side='left', padx=5)
 
+        # Painel de diagnóstico (tempos por etapa e erros)
+        ttk.Button(progress_frame, text='Diagnóstico', command=partial(ui_frame.pop_up_diagnostics, self)).pack(side='right')
+
+        # Exportação da tabela (CSV/XLSX)
+        ttk.Button(progress_frame, text='Exportar', command=partial(ui_frame.export_results, self)).pack(side='right', padx=5)
+
         # Label de Status
         self.status_label = ttk.Label(progress_frame, text='Pronto')
         self.status_label.pack(side='left', padx=5)
@@ -177,26 +329,94 @@ class App(tk.Tk):
 
     # ---------- Finalizar a janela ---------- #
     def on_closing(self):
-        "Finaliza o executor antes de fechar o programa."
-        try: self.executor.shutdown(wait=False)
+        "Cancela o scan e a exportação e finaliza o executor antes de fechar o programa."
+        self.scan_cancel.set()
+        self.export_cancel.set()
+        try: self.executor.shutdown(wait=False, cancel_futures=True)
         except Exception: pass
+        # Termina de gravar o último scan (lotes pequenos) antes de sair
+        self.db_writer.shutdown(wait=True)
         self.destroy()
     
     #------------------------------------------#
     # ----------- Load and search ------------ #
     #------------------------------------------#
-    def load_table(self, event=None):
-        """Limpa a tabela e busca os tickers salvos no DB."""
+    def load_last_scan(self):
+        """ Partida rápida: preenche a tabela com o último scan salvo no DB e
+            agenda uma atualização em segundo plano que só altera as linhas que mudaram.
+        """
+        snapshot = db.load_scan_results()
+        if not snapshot: return
+
+        for row in self.model.load_snapshot(snapshot):
+            self.table.insert('', 'end', iid=row.ticker, values=row.values(), tags=(row.tag,))
+        self.status_label.config(text=f'{len(snapshot)} tickers do último scan. Atualizando...')
+        self.refresh_on_warm = True
+
+    #------------------------------------------#
+    # ------- Imports em segundo plano ------- #
+    #------------------------------------------#
+    def _on_first_paint(self):
+        """Com a janela desenhada, carrega as dependências pesadas em uma thread."""
+        startup.mark('primeiro quadro')
+        threading.Thread(target=self.warm_worker, daemon=True).start()
+
+    def warm_worker(self):
+        """Importa pandas/NumPy (analytics) e a fonte de dados antes da primeira busca."""
+        with startup.phase('aquecimento (thread)'):
+            from source import analytics  # noqa: F401
+            self.provider.warm()
+        self.result_queue.put((None, ('warm', None)))
+
+    def _on_warm(self):
+        """ Imports prontos: recalcula o último scan para o orçamento atual e
+            inicia a atualização em segundo plano.
+        """
+        startup.mark('imports aquecidos')
+        if startup.enabled: startup.print_report()
+        if self.refresh_on_warm:
+            self.refresh_on_warm = False
+            self._update_values()
+            self.load_table(clear=False, quiet=True)
+
+    def load_table(self, event=None, clear: bool = True, quiet: bool = False):
+        """ Busca os tickers salvos no DB.
+            - clear: limpa a tabela antes; sem ela, as linhas são atualizadas no lugar
+              e só os tickers removidos do DB saem da tabela
+            - quiet: não avisa quando não há tickers cadastrados
+        """
+
+        # Cancela o scan anterior; seus resultados pendentes serão descartados
+        self.scan_cancel.set()
+        self.scan_cancel = threading.Event()
+        self.generation += 1
+        self.metrics = Metrics()
 
-        # Limpa a tabela
-        for item in self.table.get_children(): self.table.delete(item)
+        # Carrega os tickers da lista selecionada (ou todos do banco de dados)
+        tickers = self.active_tickers()
 
-        # Carrega os ticker no banco de dados
-        tickers = db.load_tickers()
+        if clear:
+            # Limpa a tabela, inclusive as linhas escondidas pelo filtro
+            if self.model.rows: self.table.delete(*self.model.rows)
+            self.model.clear()
+        else:
+            # Remove as linhas de tickers que não estão mais no DB (ou na lista)
+            keep = set(map(market.display_name, tickers))
+            removed = [iid for iid in self.model.rows if iid not in keep]
+            for iid in removed:
+                self.table.delete(iid)
+                self.model.remove(iid)
+            # O último scan salvo é o de 'Todos'; trocar de lista não o apaga
+            if self.active_watchlist == self.ALL_TICKERS: self.db_writer.submit(db.remove_scan_results, removed)
 
         # Caso não tiver tickers no banco
         if not tickers:
-            messagebox.showinfo('Sem tickers', 'Nenhum ticker cadastrado.')
+            if not quiet:
+                if self.active_watchlist == self.ALL_TICKERS: messagebox.showinfo('Sem tickers', 'Nenhum ticker cadastrado.')
+                else: messagebox.showinfo('Sem tickers', f"A lista '{self.active_watchlist}' está vazia.")
+
+            # O scan cancelado não entrega mais o 'done'; sem isto a atualização automática pararia
+            self.scanning = False
 
             # Atualiza a barra de progresso
             self.progress['value'] = 0
@@ -205,127 +425,246 @@ class App(tk.Tk):
             return
         
         # Caso haja tickers no banco, configura a barra de progresso
+        self.scanning = True
         self.total_tickers = len(tickers)
         self.processed_tickers = 0
         self.progress['value'] = 0
         self.progress['maximum'] = self.total_tickers
         self.status_label.config(text=f'Processando 0/{self.total_tickers} tickers...')
 
-        # Faz o submit task para o executor
-        for ticker in tickers:
-            fut = self.executor.submit(self.search_worker, ticker)
-            fut.add_done_callback(self._on_search_done)
+        # O agendador roda em uma thread própria e usa o executor para as consultas
+        threading.Thread(
+            target=self.scan_worker, args=(tickers, self.generation, self.scan_cancel), daemon=True
+        ).start()
+
+
+    def active_tickers(self) -> list[str]:
+        """Tickers da lista de acompanhamento selecionada, ou todos os do DB."""
+        if self.active_watchlist == self.ALL_TICKERS: return db.load_tickers()
+        return db.load_watchlist_tickers([self.active_watchlist])[self.active_watchlist]
 
+    def on_watchlist_change(self):
+        """ Troca a lista exibida: aplica o orçamento dela e atualiza a tabela no lugar.
+            Tickers já carregados por outra lista só são recalculados; o cache de
+            preços e as consultas em voo evitam buscar de novo os tickers comuns.
+        """
+        name = self.watchlist.get()
+        budgets = db.load_watchlists()
+        if name != self.ALL_TICKERS and name not in budgets: name = self.ALL_TICKERS
+        self.watchlist.set(name)
+        if self.active_watchlist == self.ALL_TICKERS: self.all_budget = self.budget._get()
+        self.active_watchlist = name
+
+        budget = self.all_budget if name == self.ALL_TICKERS else budgets[name]
+        self.budget._set(f'{budget:.2f}'.replace('.', ','))
+        self._update_values()
+        self.load_table(clear=False, quiet=True)
 
     #------------------------------------------#
     # ---------- Busca em threads ------------ #
     #------------------------------------------#
-    def search_worker(self, ticker: str) -> tuple[str, dict | str | None]:
-        """ Executa uma busca em thread worker.
-            Retorna uma tupla com status e dados:
+    def search_worker(self, tickers: list[str], metrics: Metrics | None = None) -> list[tuple[str, dict]]:
+        """ Executa a busca de um lote de tickers em thread worker.
+            Retorna uma lista de tuplas com status e dados:
              - ('ok', {...})
-             - ('error', 'mensagem de erro')
+             - ('error', {...})
         """
-        try:
-            tk_upper = ticker.upper() # Registra o ticker em maiusculo
-            active = yf.Ticker(tk_upper) # Instancia o ticker
-            info = active.info or {} # Arraw de info
+        return market.search(tickers, self.QUOTE_TTL, self.provider, metrics)
 
-            # Tenta obter o preço atual do ativo de forma segura
-            price = (info.get('currentPrice') or info.get('regularMarketPrice') or info.get('previousClose'))
-
-            # Se não houve preço, retorna isso
-            if price is None: raise ValueError('Preço não disponível')
+    def scan_worker(self, tickers: list[str], generation: int, cancel: threading.Event):
+        """ Consulta todos os lotes pelo agendador (concorrência adaptativa,
+            limite de requisições e novas tentativas) até o scan ser cancelado.
+        """
+        scheduler = Scheduler(
+            partial(self.search_worker, metrics=self.metrics), self.executor,
+            max_concurrency=self.MAX_WORKERS, rate=self.REQUEST_RATE,
+            in_flight=self.in_flight, metrics=self.metrics,
+        )
+        report = scheduler.run_sync(
+            market.chunks(tickers, self.BATCH_SIZE),
+            partial(self._on_search_done, generation), cancel,
+        )
+        self.result_queue.put((generation, ('done', report)))
 
-            # Ultimos Dividendos (Início definido pela UI data)
-            start_date = (date.today() - relativedelta(years=1)).replace(day=1)
-            divs = getattr(active, 'dividends', None)
-            divs_year = 0.0
+    def refresh_worker(self, tickers: list[str]):
+        """ Atualização automática de um lote (uma requisição, sem novas tentativas).
+            Os resultados vão para a fila sem geração e só atualizam linhas existentes.
+            Fica fora das métricas do scan, para não misturar os tempos no diagnóstico.
+        """
+        scheduler = Scheduler(
+            self.search_worker, self.executor,
+            concurrency=1, max_concurrency=1, retries=0, in_flight=self.in_flight,
+        )
+        scheduler.run_sync([tickers], partial(self._on_search_done, None))
+        self.result_queue.put((None, ('refreshed', None)))
 
-            # Filtra e soma os dividendos
-            try:
-                if divs is not None and not divs.empty:
-                    s = divs.loc[str(start_date) :]
-                    divs_year = float(s.tail(12).sum())
-            except Exception:
-                divs_year = 0.0
-
-            # Iniciando as variaveis para o calculo
-            budget_value:float = self.budget._get() # Orçamento
-            quotas = 0      # Cotas
-            earnings = 0.0  # Proventos
-
-            # Calcula as cotas com base no orçamento
-            if price and price > 0 and budget_value > 0:
-                # Quantas cotas consegue comprar com o valor de orçãmento
-                quotas = floor(budget_value / price) 
-                # Quantos dividendos recebera com a quantidade de cotas compradas
-                earnings = round(quotas * divs_year, 2)
-            
-            # Tag color categorize
-            if divs_year > price * 0.15: tag = 'verde' # Yield > 15% do preço
-            elif divs_year > price * 0.10: tag = 'amarelo' # Yield > 10% do preço
-            elif divs_year > price * 0.01: tag = '' # Yield > 5% do preço
-            else: tag = ''
-
-            # Compilação das informações em um dict
-            data = {
-                'ticker': tk_upper.rstrip('.SA'),
-                'price': price,
-                'divs_year': round(divs_year, 4),
-                'quotas': quotas,
-                'earnings': earnings,
-                'tag': tag,
-            }
-            return ('ok', data)
-        except Exception as exc:
-            data = {
-                'ticker': tk_upper.rstrip('.SA'),
-                'price': '--',
-                'divs_year': '--',
-                'quotas': '--',
-                'earnings': '--',
-                'tag': '--',
-            }
-            return ('error', data) #f'Erro buscando {ticker}: {exc}'
-
-    def _on_search_done(self, fut):
-        """Callback (executado em thread do executor). Agendamos o tratamento no thread principal."""
-        try: result = fut.result()
-        except Exception as erro: result = ('error', str(erro), None)
-
-        # Schedule na main thread
-        self.after(0, partial(self._process_result_on_main_thread, result))
+    def _on_search_done(self, generation: int, results):
+        """Callback (executado fora da main thread). Enfileira para a main thread."""
+        for result in results:
+            self.result_queue.put((generation, result))
 
 
     #------------------------------------------#
     # ---------- Processo thread ------------- #
     #------------------------------------------#
-    def _process_result_on_main_thread(self, result):
-        """ Insere os resultados na Treeview e atualiza a progressbar."""
-
-        # Caso a consulta seja bem sucedida
-        if result[0] == 'ok':
-            data = result[1]
-            self.table.insert('', 'end', values=(
-                data['ticker'],
-                data['price'],
-                data['divs_year'],
-                data['quotas'],
-                data['earnings'],
-            ),
-            tags=(data['tag'],)
-            )
-        else:
-            # Erro: adiciona uma linha com a mensagem
-            data = result[1]
-            self.table.insert('', 'end',
-                values=(data['ticker'],'Erro', '-', '-', '-'), tags=('vermelho',)
+    def _pump(self):
+        """ Drena a fila de resultados uma vez por quadro: insere até
+            PUMP_CHUNK linhas e atualiza a progressbar e o status uma única vez.
+        """
+        try:
+            batch = []
+            refreshed = []
+            report = None
+            try:
+                while len(batch) + len(refreshed) < self.PUMP_CHUNK:
+                    generation, result = self.result_queue.get_nowait()
+                    # Atualização automática: mantém o último valor bom em caso de erro
+                    if generation is None:
+                        if result[0] == 'refreshed': self.refreshing = False
+                        elif result[0] == 'warm': self._on_warm()
+                        elif result[0] == 'export': self._on_export_progress(*result[1])
+                        elif result[0] == 'exported': self._on_export_done(*result[1])
+                        elif result[0] == 'ok' and market.display_name(result[1]['ticker']) in self.model:
+                            refreshed.append(result)
+                        continue
+                    # Resultado de um scan cancelado
+                    if generation != self.generation: continue
+                    if result[0] == 'done':
+                        report = result[1]
+                        break
+                    batch.append(result)
+            except queue.Empty:
+                pass
+
+            if refreshed:
+                self._insert_results(refreshed)
+
+            # ---------- Progress bar ------------- #
+            if batch:
+                self._insert_results(batch, self.metrics)
+                self.processed_tickers += len(batch)
+                self.progress['value'] = self.processed_tickers
+                self.status_label.config(text=f'Processando {self.processed_tickers}/{self.total_tickers} tickers...')
+            if report is not None:
+                self._on_scan_finished(report)
+        finally:
+            # Reagenda mesmo se um resultado levantar exceção, para a fila não parar de ser drenada
+            self.after(self.FRAME_MS, self._pump)
+
+    def _insert_results(self, results, metrics: Metrics | None = None):
+        """ Registra os resultados no modelo, insere (ou atualiza) só as linhas
+            que mudaram na Treeview e salva o lote como último scan (só em 'Todos').
+        """
+        tickers = [data['ticker'] for _, data in results]
+        with stage(metrics, 'compute', tickers):
+            changed = self.model.set_results(results, self.budget._get())
+        with stage(metrics, 'insert', tickers):
+            for row in changed:
+                # Linha já existente é atualizada no lugar
+                if self.table.exists(row.ticker):
+                    self.table.item(row.ticker, values=row.values(), tags=(row.tag,))
+                else:
+                    self.table.insert('', 'end', iid=row.ticker, values=row.values(), tags=(row.tag,))
+        # Linhas novas ou alteradas podem ter entrado ou saído do filtro
+        if changed and self.current_filter() is not None: self.schedule_filter()
+        # O último scan salvo é o de 'Todos', com o orçamento da tela; as linhas são
+        # copiadas aqui e gravadas pelo `db_writer`, sem travar a interface
+        if self.active_watchlist == self.ALL_TICKERS:
+            rows = self.model.snapshot(market.display_name(data['ticker']) for _, data in results)
+            self.db_writer.submit(db.save_scan_results, rows)
+
+    def _auto_refresh(self):
+        """ Ciclo da atualização automática: sem scan em andamento, envia um lote
+            de tickers vencidos, com prioridade para as linhas visíveis na tabela.
+        """
+        if self.auto_refresh.get() and not self.scanning and not self.refreshing:
+            fetched = {iid: row.fetched for iid, row in self.model.rows.items()}
+            visible = refresh.visible_rows(self.table.get_children(), *self.table.yview())
+            batch = self.refresh.next_batch(fetched, visible)
+            if batch:
+                self.refreshing = True
+                threading.Thread(
+                    target=self.refresh_worker, args=([market.normalize(t) for t in batch],), daemon=True
+                ).start()
+        self.after(self.REFRESH_MS, self._auto_refresh)
+
+    def _refresh_ages(self):
+        """Atualiza periodicamente o texto da coluna 'Atualizado'."""
+        for iid, row in self.model.rows.items():
+            self.table.set(iid, 'Atualizado', row.values()[-1])
+        self.after(self.AGE_MS, self._refresh_ages)
+
+    def _on_scan_finished(self, report):
+        """Exibe o resumo de novas tentativas e falhas definitivas."""
+        self.scanning = False
+        self.status_label.config(text=f'Concluído! {len(report.permanent)} erros, {len(report.retried)} com nova tentativa')
+
+    #------------------------------------------#
+    # -------------- Exportação -------------- #
+    #------------------------------------------#
+    def export_iids(self, filtered: bool) -> list[str]:
+        """Linhas a exportar na ordem da tabela: só as visíveis (filtro) ou todo o modelo."""
+        if filtered: return list(self.table.get_children())
+        return list(self.current_order())
+
+    def start_export(self, path: str, iids: list[str]):
+        """ Exporta as linhas em uma thread. Só as referências às linhas são copiadas
+            aqui; a conversão e a escrita em blocos ficam fora da main thread.
+        """
+        rows = [self.model.rows[iid] for iid in iids if iid in self.model.rows]
+        self.exporting = True
+        self.export_cancel = threading.Event()
+        self.progress['value'] = 0
+        self.progress['maximum'] = len(rows)
+        self.status_label.config(text=f'Exportando 0/{len(rows)} linhas...')
+        threading.Thread(target=self.export_worker, args=(path, rows, self.export_cancel), daemon=True).start()
+
+    def export_worker(self, path: str, rows: list, cancel: threading.Event):
+        """ Escreve o arquivo e envia o progresso de cada bloco para a fila da main thread.
+            O aviso de fim sai sempre, para a interface não ficar presa em 'exportando'.
+        """
+        error = None
+        count = 0
+        try:
+            from source import export
+            count = export.write(
+                path, rows, lambda done, total: self.result_queue.put((None, ('export', (done, total)))), cancel
             )
+        except Exception as ex:
+            error = ex
+        finally:
+            self.result_queue.put((None, ('exported', (path, count, error))))
+
+    def _on_export_progress(self, done: int, total: int):
+        # Um scan iniciado durante a exportação fica com a barra de progresso
+        if self.scanning: return
+        self.progress['value'] = done
+        self.status_label.config(text=f'Exportando {done}/{total} linhas...')
+
+    def _on_export_done(self, path: str, count: int, error: Exception | None):
+        self.exporting = False
+        if error is not None:
+            if not self.scanning: self.status_label.config(text='Pronto')
+            messagebox.showerror('Erro', f'Não foi possível exportar: {error}')
+            return
+        if not self.scanning: self.status_label.config(text=f'{count} linhas exportadas para {path}')
 
-        # ---------- Progress bar ------------- #
-        self.processed_tickers += 1
-        self.progress['value'] = self.processed_tickers
-        self.status_label.config(text=f'Processando {self.processed_tickers}/{self.total_tickers} tickers...')
-        if self.processed_tickers >= self.total_tickers: self.status_label.config(text='Concluído!')
-        
\ No newline at end of file
+    #------------------------------------------#
+    # ---------- Mudança de orçamento -------- #
+    #------------------------------------------#
+    def on_budget_change(self, value):
+        """ Atualiza o orçamento e recalcula 'N Cotas' e 'Proventos'
+            a partir dos preços e dividendos já carregados, sem nova busca.
+        """
+        self.budget._set(value)
+        # O orçamento de uma lista fica salvo com ela
+        if self.active_watchlist != self.ALL_TICKERS:
+            db.save_watchlist(self.active_watchlist, self.budget._get())
+        self._update_values()
+
+    def _update_values(self):
+        """Recalcula o modelo para o orçamento atual e atualiza as células."""
+        self.model.recompute(self.budget._get())
+        for iid, row in self.model.rows.items():
+            if not row.error: self.table.item(iid, values=row.values(), tags=(row.tag,))
+        if self.current_filter() is not None: self.apply_filter()
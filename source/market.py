@@ -0,0 +1,161 @@
+# Imports
+
+# Data manager
+from datetime import date, datetime, timedelta
+# Functions
+from time import time
+# Modulos
+from source import data_base as db
+from source.metrics import Metrics, classify, stage
+from source.providers import Provider, YahooProvider
+
+BATCH_SIZE = 50  # Quantidade de tickers por requisição em lote
+QUOTE_TTL = 15 * 60  # Validade do preço em cache (segundos)
+HISTORY_YEARS = 10  # Anos de histórico de dividendos baixados para um ticker novo
+GROUP_DAYS = 31  # Diferença máxima entre os inícios de tickers consultados na mesma requisição
+
+# Fonte de dados padrão
+default_provider: Provider = YahooProvider()
+
+
+def start_date() -> date:
+    """Início da janela de dividendos: 12 meses atrás, a partir do dia 1."""
+    today = date.today()
+    return date(today.year - 1, today.month, 1)
+
+
+def history_start() -> date:
+    """Início do histórico de dividendos: 1º de janeiro, HISTORY_YEARS anos atrás."""
+    return date(date.today().year - HISTORY_YEARS, 1, 1)
+
+
+def chunks(items: list, size: int):
+    """Divide a lista em blocos de até `size` itens."""
+    size = max(1, int(size))
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def normalize(ticker: str) -> str:
+    """Formata o ticker. Ex: 'petr4' -> 'PETR4.SA'."""
+    ticker = ticker.strip().upper()
+    return ticker if ticker.endswith('.SA') else f'{ticker}.SA'
+
+
+def display_name(ticker: str) -> str:
+    """Nome exibido na tabela. Ex: 'PETR4.SA' -> 'PETR4'."""
+    return ticker.upper().removesuffix('.SA')
+
+
+def error_data(ticker: str, exc: Exception | None = None) -> dict:
+    """Linha de erro para um ticker que não pôde ser consultado."""
+    return {
+        'ticker': display_name(ticker),
+        'price': '--',
+        'divs_year': '--',
+        'quotas': '--',
+        'earnings': '--',
+        'tag': '--',
+        'error': str(exc) if exc else '',
+        'kind': classify(exc) if exc else 'other',
+    }
+
+
+#------------------------------------------#
+# ------------ Consulta em cache --------- #
+#------------------------------------------#
+def _since(ticker: str, quotes: dict, last_divs: dict) -> date:
+    """ Data a partir da qual o histórico de dividendos do ticker precisa ser completado:
+        a mais recente entre o último evento armazenado (reconsultado; o upsert evita
+        duplicatas) e a última consulta do preço, que já trouxe tudo até ali.
+    """
+    known = []
+    if ticker in last_divs: known.append(date.fromisoformat(last_divs[ticker]))
+    if ticker in quotes: known.append(datetime.fromtimestamp(quotes[ticker][1]).date())
+    # Ticker novo: baixa o histórico completo
+    return max(known) if known else history_start()
+
+
+def _groups(since: dict[str, date]) -> list[tuple[date, list[str]]]:
+    """ Agrupa os tickers cujo início difere em até GROUP_DAYS, para um ticker novo
+        ou defasado não alongar a consulta dos demais. Retorna [(início, tickers)].
+    """
+    # Garante ao menos uma semana de pregões para obter o preço
+    latest = date.today() - timedelta(days=7)
+    groups = []
+    for ticker in sorted(since, key=since.get):
+        start = min(since[ticker], latest)
+        if groups and (start - groups[-1][0]).days <= GROUP_DAYS: groups[-1][1].append(ticker)
+        else: groups.append((start, [ticker]))
+    return groups
+
+
+def fetch_cached(tickers: list[str], ttl: float = QUOTE_TTL, provider: Provider | None = None,
+                 metrics: Metrics | None = None) -> dict[str, tuple[float, list[tuple[str, float]], float] | Exception]:
+    """ Consulta um lote usando o cache do SQLite.
+        Preços dentro do `ttl` vêm do disco; só os vencidos vão à rede,
+        e o histórico de dividendos é completado apenas a partir do que já
+        está armazenado (ver `_since`). Fontes sem cache (snapshot, fonte local) são consultadas direto.
+        Retorna {ticker: (preço, [(data, valor), ...] desde `start_date`, timestamp do preço)}
+        ou {ticker: Exception}. Com `metrics`, mede as etapas 'cache' e 'fetch'.
+    """
+    tickers = [t.upper() for t in tickers]
+    provider = provider or default_provider
+    if not provider.cacheable:
+        with stage(metrics, 'fetch', tickers):
+            fetched = provider.fetch(tickers, start_date())
+        return {t: v if isinstance(v, Exception) else (*v, provider.timestamp(t)) for t, v in fetched.items()}
+
+    now = time()
+    with stage(metrics, 'cache', tickers):
+        quotes = db.load_quotes(tickers)
+    stale = [t for t in tickers if t not in quotes or now - quotes[t][1] > ttl]
+
+    results = {}
+    if stale:
+        with stage(metrics, 'cache', stale):
+            last_divs = db.last_dividend_dates(stale)
+        fetched = {}
+        for start, group in _groups({t: _since(t, quotes, last_divs) for t in stale}):
+            with stage(metrics, 'fetch', group):
+                fetched.update(provider.fetch(group, start))
+
+        new_quotes, new_divs = [], []
+        for ticker, value in fetched.items():
+            if isinstance(value, Exception):
+                results[ticker] = value
+                continue
+            price, events = value
+            new_quotes.append((ticker, price, now))
+            new_divs.extend((ticker, day, amount) for day, amount in events)
+            quotes[ticker] = (price, now)
+        with stage(metrics, 'cache', stale):
+            db.save_quotes(new_quotes)
+            db.save_dividends(new_divs)
+
+    # Preço e dividendos da janela, a partir do disco
+    ok = [t for t in tickers if t not in results]
+    with stage(metrics, 'cache', ok):
+        divs = db.load_dividends(ok, str(start_date()))
+    for ticker in ok:
+        price, updated = quotes[ticker]
+        results[ticker] = (price, divs.get(ticker, []), updated)
+    return {t: results[t] for t in tickers}
+
+
+def search(tickers: list[str], ttl: float = QUOTE_TTL, provider: Provider | None = None,
+           metrics: Metrics | None = None) -> list[tuple[str, dict]]:
+    """ Busca um lote de tickers (cache + rede).
+        Retorna uma lista de tuplas com status e dados:
+         - ('ok', {'ticker', 'price', 'dividends', 'updated'})
+         - ('error', {..., 'error': mensagem, 'kind': tipo do erro})
+        Os cálculos (dividendos no ano, cotas, tag) ficam para `analytics.rank`.
+    """
+    results = []
+    for ticker, fetched in fetch_cached(tickers, ttl, provider, metrics).items():
+        if isinstance(fetched, Exception):
+            results.append(('error', error_data(ticker, fetched)))
+            continue
+        price, dividends, updated = fetched
+        results.append(('ok', {'ticker': ticker, 'price': price, 'dividends': dividends, 'updated': updated}))
+    return results
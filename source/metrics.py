@@ -0,0 +1,160 @@
+""" Instrumentação dos scans: tempo de cada etapa por ticker e classificação dos erros.
+
+    Etapas:
+     - queue: espera até a consulta começar (limite de requisições, concorrência, executor)
+     - cache: leituras e gravações no SQLite
+     - fetch: requisição à fonte de dados (preço e dividendos vêm na mesma requisição em lote)
+     - compute: cálculo de dividendos no ano, cotas e tag
+     - insert: inserção na tabela da interface
+
+    Etapas feitas em lote contam, para cada ticker, o tempo do lote inteiro
+    (é o quanto o ticker esperou). Exporta em JSON ou no formato texto do Prometheus.
+"""
+# Imports
+import bisect
+import json
+import threading
+from contextlib import contextmanager, nullcontext
+from time import perf_counter, time
+# Modulos
+from source.providers import TransientError
+
+STAGES = ('queue', 'cache', 'fetch', 'compute', 'insert')
+# Limites superiores (s) dos baldes dos histogramas
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ERROR_KINDS = ('rate_limit', 'timeout', 'network', 'not_found', 'other')
+
+
+def classify(exc: Exception | str | None) -> str:
+    """Tipo do erro de consulta: rate_limit, timeout, network, not_found ou other."""
+    text = str(exc or '').lower()
+    if '429' in text or 'too many requests' in text or 'rate limit' in text: return 'rate_limit'
+    if isinstance(exc, TimeoutError) or 'timed out' in text or 'timeout' in text: return 'timeout'
+    if isinstance(exc, (ConnectionError, TransientError)) or 'connection' in text: return 'network'
+    if 'não disponível' in text or 'não retornado' in text or 'not found' in text or 'delisted' in text:
+        return 'not_found'
+    return 'other'
+
+
+def _key(ticker: str) -> str:
+    """Nome do ticker como na tabela (mesmo formato de `market.display_name`)."""
+    return ticker.upper().removesuffix('.SA')
+
+
+def _percentile(values: list[float], p: float) -> float:
+    if not values: return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+class Metrics:
+    """Coletor thread-safe de tempos por etapa e de erros de um scan."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time()
+        self.samples: dict[str, list[float]] = {stage: [] for stage in STAGES}
+        self.tickers: dict[str, dict[str, float]] = {}  # ticker -> {etapa: segundos}
+        self.errors: dict[str, tuple[str, str]] = {}  # ticker -> (tipo, mensagem)
+
+    def record(self, stage: str, tickers, seconds: float):
+        """Registra `seconds` na etapa para cada ticker do lote."""
+        with self.lock:
+            for ticker in tickers:
+                self.samples[stage].append(seconds)
+                times = self.tickers.setdefault(_key(ticker), {})
+                times[stage] = times.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, stage: str, tickers):
+        """Cronometra um bloco como a etapa `stage` dos `tickers`."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, tickers, perf_counter() - start)
+
+    def error(self, ticker: str, kind: str, message: str = ''):
+        with self.lock:
+            self.errors[_key(ticker)] = (kind, message)
+
+    # ---------- Resumo e exportação ---------- #
+    def summary(self, slowest: int = 10) -> dict:
+        """Estatísticas por etapa, histogramas, erros por tipo e os tickers mais lentos."""
+        with self.lock:
+            samples = {stage: list(values) for stage, values in self.samples.items()}
+            tickers = {ticker: dict(times) for ticker, times in self.tickers.items()}
+            errors = dict(self.errors)
+
+        stages = {}
+        for stage, values in samples.items():
+            counts = [0] * (len(BUCKETS) + 1)
+            for value in values: counts[bisect.bisect_left(BUCKETS, value)] += 1
+            stages[stage] = {
+                'count': len(values),
+                'sum': sum(values),
+                'p50': _percentile(values, 50),
+                'p95': _percentile(values, 95),
+                'max': max(values, default=0.0),
+                'buckets': counts,
+            }
+        totals = sorted(tickers.items(), key=lambda item: sum(item[1].values()), reverse=True)
+        return {
+            'started': self.started,
+            'bucket_bounds': list(BUCKETS) + ['+Inf'],
+            'tickers': len(tickers),
+            'stages': stages,
+            'errors': {kind: sum(1 for k, _ in errors.values() if k == kind) for kind in ERROR_KINDS},
+            'slowest': [{'ticker': t, 'total': sum(times.values()), **times} for t, times in totals[:slowest]],
+            'failed': [{'ticker': t, 'kind': kind, 'error': message} for t, (kind, message) in sorted(errors.items())],
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.summary(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self) -> str:
+        """Histogramas `pointer_stage_seconds` por etapa e `pointer_errors_total` por tipo."""
+        summary = self.summary()
+        lines = [
+            '# HELP pointer_stage_seconds Tempo de cada etapa por ticker.',
+            '# TYPE pointer_stage_seconds histogram',
+        ]
+        for stage, data in summary['stages'].items():
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), data['buckets']):
+                cumulative += count
+                lines.append(f'pointer_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'pointer_stage_seconds_sum{{stage="{stage}"}} {data["sum"]:.6f}')
+            lines.append(f'pointer_stage_seconds_count{{stage="{stage}"}} {data["count"]}')
+        lines += ['# HELP pointer_errors_total Tickers com erro por tipo.', '# TYPE pointer_errors_total counter']
+        lines += [f'pointer_errors_total{{kind="{kind}"}} {count}' for kind, count in summary['errors'].items()]
+        lines += ['# HELP pointer_tickers Tickers medidos no scan.', '# TYPE pointer_tickers gauge',
+                  f'pointer_tickers {summary["tickers"]}']
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str):
+        """Grava em `path`: formato Prometheus para .prom/.txt, JSON nos demais."""
+        text = self.to_prometheus() if path.endswith(('.prom', '.txt')) else self.to_json()
+        with open(path, 'w', encoding='utf-8') as file: file.write(text)
+
+    def report(self) -> str:
+        """Texto legível do resumo, para o painel de diagnóstico."""
+        summary = self.summary()
+        lines = [f'{summary["tickers"]} tickers medidos', '', f'{"etapa":<10}{"n":>7}{"p50 ms":>10}{"p95 ms":>10}{"max ms":>10}']
+        for stage, data in summary['stages'].items():
+            lines.append(f'{stage:<10}{data["count"]:>7}{data["p50"] * 1000:>10.1f}'
+                         f'{data["p95"] * 1000:>10.1f}{data["max"] * 1000:>10.1f}')
+        lines += ['', 'Erros: ' + ', '.join(f'{kind}={count}' for kind, count in summary['errors'].items())]
+        lines += ['', 'Mais lentos (ms):']
+        for item in summary['slowest']:
+            stages = ' '.join(f'{stage}={item[stage] * 1000:.0f}' for stage in STAGES if stage in item)
+            lines.append(f'  {item["ticker"]:<10}{item["total"] * 1000:>8.0f}  {stages}')
+        if summary['failed']:
+            lines += ['', 'Falhas:']
+            lines += [f'  {item["ticker"]:<10}{item["kind"]:<12}{item["error"]}' for item in summary['failed']]
+        return '\n'.join(lines)
+
+
+def stage(metrics: Metrics | None, name: str, tickers):
+    """`metrics.stage(...)`, ou um bloco sem medição quando não há coletor."""
+    return nullcontext() if metrics is None else metrics.stage(name, tickers)
@@ -0,0 +1,150 @@
+""" Modelo em memória dos resultados exibidos na tabela.
+
+    Cada linha guarda os valores numéricos já calculados, então ordenar ou
+    recalcular o orçamento não precisa ler as células de volta da Treeview.
+"""
+# Imports
+from time import time
+# Modulos
+# `analytics` (pandas/NumPy) é importado só na hora do cálculo, para não atrasar a abertura
+from source import market
+
+# Colunas da tabela, na ordem de exibição
+COLUMNS = ('Ativo', 'Preço', 'Med. Div.', 'N Cotas', 'Proventos', 'Atualizado')
+
+
+def format_age(seconds: float | None) -> str:
+    """Idade de um dado para a coluna 'Atualizado'. Ex: 'agora', '5 min', '3 h', '2 d'."""
+    if seconds is None: return '-'
+    if seconds < 60: return 'agora'
+    if seconds < 3600: return f'{int(seconds // 60)} min'
+    if seconds < 86400: return f'{int(seconds // 3600)} h'
+    return f'{int(seconds // 86400)} d'
+
+
+class Row:
+    """Resultado de um ticker. `keys` guarda a chave de ordenação de cada coluna."""
+    __slots__ = ('ticker', 'price', 'divs_year', 'quotas', 'earnings', 'tag', 'error', 'fetched', 'keys')
+
+    def __init__(self, ticker: str, price: float = 0.0, divs_year: float = 0.0,
+                 error: bool = False, fetched: float | None = None):
+        self.ticker = ticker
+        self.price = price
+        self.divs_year = divs_year
+        self.error = error
+        self.fetched = fetched if fetched is not None else time()
+        self.quotas = 0
+        self.earnings = 0.0
+        self.tag = 'vermelho' if error else ''
+        self.keys = (ticker,) * len(COLUMNS)
+
+    def set_values(self, quotas: int, earnings: float, tag: str):
+        """Atualiza cotas, proventos, tag e as chaves de ordenação."""
+        self.quotas, self.earnings, self.tag = quotas, earnings, tag
+        # 'Atualizado' ordena do mais recente para o mais antigo
+        self.keys = (self.ticker, self.price, self.divs_year, self.quotas, self.earnings, -self.fetched)
+
+    def values(self, now: float | None = None) -> tuple:
+        """Valores da linha na Treeview, na ordem de COLUMNS."""
+        age = format_age((now or time()) - self.fetched)
+        if self.error: return (self.ticker, 'Erro', '-', '-', '-', age)
+        return (self.ticker, self.price, round(self.divs_year, 4), self.quotas, self.earnings, age)
+
+    def snapshot(self) -> tuple:
+        """Linha para `db.save_scan_results`."""
+        if self.error: return (self.ticker, None, None, None, None, self.tag, 1, self.fetched)
+        return (self.ticker, self.price, self.divs_year, self.quotas, self.earnings, self.tag, 0, self.fetched)
+
+
+class ResultModel:
+    """ Linhas da tabela indexadas pelo iid da Treeview (o nome do ticker).
+        `version` muda a cada alteração, para os índices saberem quando refazer.
+    """
+
+    def __init__(self):
+        self.rows: dict[str, Row] = {}
+        self.version = 0
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, iid):
+        return iid in self.rows
+
+    def clear(self):
+        self.rows.clear()
+        self.version += 1
+
+    def remove(self, iid: str):
+        self.rows.pop(iid, None)
+        self.version += 1
+
+    def set_results(self, results: list[tuple[str, dict]], budget_value: float) -> list[Row]:
+        """ Registra um lote de resultados de `market.search`, calculados de uma
+            vez por `analytics.rank_results`. Retorna só as linhas novas ou
+            cujos valores mudaram.
+        """
+        from source import analytics
+
+        rows = []
+        if any(status == 'ok' for status, _ in results):
+            frame = analytics.rank_results(results, str(market.start_date()), budget_value)
+            updated = {data['ticker']: data.get('updated') for status, data in results if status == 'ok'}
+            for ticker, price, divs_year, quotas, earnings, tag in zip(
+                frame.index, frame['price'].tolist(), frame['divs_year'].tolist(),
+                frame['quotas'].tolist(), frame['earnings'].tolist(), frame['tag'].tolist(),
+            ):
+                row = Row(market.display_name(ticker), price, divs_year, fetched=updated[ticker])
+                row.set_values(quotas, earnings, tag)
+                rows.append(row)
+
+        for status, data in results:
+            if status != 'ok': rows.append(Row(market.display_name(data['ticker']), error=True))
+
+        now = time()
+        changed = []
+        for row in rows:
+            previous = self.rows.get(row.ticker)
+            if previous is None or previous.tag != row.tag or previous.values(now) != row.values(now):
+                changed.append(row)
+            self.rows[row.ticker] = row
+        self.version += 1
+        return changed
+
+    def load_snapshot(self, snapshot: list[tuple]) -> list[Row]:
+        """ Carrega as linhas de `db.load_scan_results` com os valores salvos.
+            Para outro orçamento, chame `recompute` depois.
+        """
+        for ticker, price, divs_year, quotas, earnings, tag, error, fetched in snapshot:
+            row = Row(ticker, price or 0.0, divs_year or 0.0, error=bool(error), fetched=fetched)
+            if not error: row.set_values(quotas, earnings, tag)
+            self.rows[ticker] = row
+        self.version += 1
+        return list(self.rows.values())
+
+    def snapshot(self, iids=None) -> list[tuple]:
+        """Linhas para `db.save_scan_results` (todas, ou só as de `iids`)."""
+        iids = self.rows if iids is None else iids
+        return [self.rows[iid].snapshot() for iid in iids if iid in self.rows]
+
+    def recompute(self, budget_value: float):
+        """Recalcula todas as linhas para um novo orçamento, em uma operação vetorizada."""
+        from source import analytics
+
+        ok = [row for row in self.rows.values() if not row.error]
+        quotas, earnings, tags = analytics.evaluate(
+            [row.price for row in ok], [row.divs_year for row in ok], budget_value
+        )
+        for row, q, e, t in zip(ok, quotas.tolist(), earnings.tolist(), tags.tolist()):
+            row.set_values(q, e, t)
+        self.version += 1
+
+    def sorted_iids(self, col: str, ascending: bool = True) -> list[str]:
+        """ Ordena pelas chaves pré-calculadas da coluna.
+            Linhas de erro ficam sempre no fim, em ordem alfabética.
+        """
+        index = COLUMNS.index(col)
+        ok = [(row.keys[index], iid) for iid, row in self.rows.items() if not row.error]
+        ok.sort(reverse=not ascending)
+        errors = sorted(iid for iid, row in self.rows.items() if row.error)
+        return [iid for _, iid in ok] + errors
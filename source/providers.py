@@ -0,0 +1,172 @@
+""" Fontes de dados de mercado.
+
+    Toda fonte implementa `Provider.fetch(tickers, start)` e devolve
+    {ticker: (preço, [(data, valor), ...])} ou {ticker: Exception}.
+    Uma falha do lote inteiro que vale nova tentativa levanta `TransientError`;
+    a de um único ticker vem como `TransientError` no lugar do seu resultado.
+"""
+# Imports
+
+# Data manager
+from datetime import date, timedelta
+# Functions
+import random
+import threading
+from time import sleep, time
+
+Quote = tuple[float, list[tuple[str, float]]]
+
+
+class TransientError(Exception):
+    """Falha temporária da fonte de dados (ex: 429, sem resposta). Vale nova tentativa."""
+
+
+class Provider:
+    """ Interface das fontes de dados de mercado.
+        Fontes com `cacheable = False` (ex: snapshot, fonte local) não passam
+        pelo cache do SQLite e informam em `timestamp` a data dos seus preços.
+    """
+    cacheable = True
+
+    def timestamp(self, ticker: str) -> float:
+        """Timestamp do preço de uma fonte sem cache; por padrão, o momento da consulta."""
+        return time()
+
+    def fetch(self, tickers: list[str], start: date) -> dict[str, Quote | Exception]:
+        """Preço atual e dividendos desde `start` de um lote de tickers."""
+        raise NotImplementedError
+
+    def warm(self):
+        """Carrega dependências pesadas antes da primeira consulta (opcional)."""
+
+
+#------------------------------------------#
+# ------------- Yahoo Finance ------------ #
+#------------------------------------------#
+def _events(divs) -> list[tuple[str, float]]:
+    """Converte a série de dividendos do yfinance em [(data, valor), ...]."""
+    if divs is None or divs.empty: return []
+    return [(day.date().isoformat(), float(value)) for day, value in divs.items() if value > 0]
+
+
+def _yfinance():
+    """ O yfinance (e com ele pandas, NumPy e requests) só é importado na
+        primeira consulta, para não atrasar a abertura da janela.
+    """
+    import yfinance
+    return yfinance
+
+
+class YahooProvider(Provider):
+    """Yahoo Finance via yfinance."""
+
+    def warm(self):
+        _yfinance()
+
+    def fetch_one(self, ticker: str) -> Quote:
+        """ Consulta individual (uma instância de yf.Ticker por ativo).
+            Retorna (preço, [(data, valor), ...]).
+        """
+        active = _yfinance().Ticker(ticker.upper()) # Instancia o ticker
+        info = active.info or {} # Arraw de info
+
+        # Tenta obter o preço atual do ativo de forma segura
+        price = (info.get('currentPrice') or info.get('regularMarketPrice') or info.get('previousClose'))
+
+        # Se não houve preço, retorna isso
+        if price is None: raise ValueError('Preço não disponível')
+
+        return price, _events(getattr(active, 'dividends', None))
+
+    def fetch(self, tickers: list[str], start: date) -> dict[str, Quote | Exception]:
+        """ Consulta em lote: uma única requisição multi-ativos (yf.download)
+            traz o histórico de preços e dividendos de todos os tickers desde `start`.
+        """
+        tickers = [t.upper() for t in tickers]
+        frame = _yfinance().download(
+            tickers,
+            start=str(start),
+            actions=True,
+            group_by='ticker',
+            auto_adjust=False,
+            threads=True,
+            progress=False,
+        )
+
+        # O yf.download não levanta exceção em bloqueio (429) ou falha de rede:
+        # devolve um frame vazio para o lote inteiro
+        if frame.empty:
+            raise TransientError('Nenhum dado retornado para o lote')
+
+        # Num lote parcial, os tickers ausentes ou sem nenhum preço costumam ser
+        # downloads que falharam (429, timeout) e voltam como falha temporária
+
+        results = {}
+        for ticker in tickers:
+            try:
+                # Com group_by='ticker' as colunas ficam (ticker, campo)
+                if frame.columns.nlevels > 1:
+                    if ticker not in frame.columns.get_level_values(0):
+                        raise TransientError('Ticker não retornado no lote')
+                    sub = frame[ticker]
+                else:
+                    sub = frame
+
+                closes = sub['Close'].dropna()
+                if closes.empty: raise TransientError('Preço não retornado no lote')
+                price = float(closes.iloc[-1])
+
+                divs = sub['Dividends'].dropna() if 'Dividends' in sub.columns else None
+
+                results[ticker] = (price, _events(divs))
+            except Exception as exc:
+                results[ticker] = exc
+        return results
+
+
+#------------------------------------------#
+# -------------- Fonte local ------------- #
+#------------------------------------------#
+class FakeProvider(Provider):
+    """ Fonte local e determinística para testes e benchmarks.
+        - latency: segundos de espera por lote
+        - failure_rate: probabilidade de um lote falhar com 429
+        - dividends: tamanho do histórico (um evento por mês) de cada ticker
+        Tickers começando com 'ERR' sempre falham.
+        Por padrão não usa o cache do SQLite, para os dados falsos não se
+        misturarem aos reais no banco; os benchmarks do cache passam `cacheable=True`.
+    """
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0,
+                 dividends: int = 24, seed: int = 0, cacheable: bool = False):
+        self.cacheable = cacheable
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.dividends = dividends
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def quote(self, ticker: str, start: date) -> Quote:
+        """Preço e histórico de dividendos fixos para o ticker."""
+        rng = random.Random(f'{self.seed}:{ticker}')
+        price = round(rng.uniform(5, 150), 2)
+        today = date.today()
+        events = []
+        for month in range(self.dividends, 0, -1):
+            day = today - timedelta(days=30 * month)
+            value = round(price * rng.uniform(0.004, 0.014), 4)
+            if day >= start: events.append((day.isoformat(), value))
+        return price, events
+
+    def fetch(self, tickers: list[str], start: date) -> dict[str, Quote | Exception]:
+        with self.lock: failed = self.random.random() < self.failure_rate
+        if self.latency: sleep(self.latency)
+        if failed: raise TransientError('429 Too Many Requests')
+
+        results = {}
+        for ticker in tickers:
+            ticker = ticker.upper()
+            if ticker.startswith('ERR'): results[ticker] = ValueError('Preço não disponível')
+            else: results[ticker] = self.quote(ticker, start)
+        return results
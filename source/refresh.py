@@ -0,0 +1,73 @@
+""" Atualização contínua em segundo plano.
+
+    A cada ciclo escolhe um lote de tickers vencidos, dando prioridade às
+    linhas visíveis na tabela e depois às mais antigas. Fora do pregão da B3
+    o prazo de validade é bem maior, e um orçamento de requisições por
+    minuto limita a carga total na fonte de dados.
+"""
+# Imports
+from collections import deque
+from datetime import datetime, time as day_time
+from time import time
+from zoneinfo import ZoneInfo
+
+# Pregão da B3 (horário de Brasília, segunda a sexta)
+B3_TZ = ZoneInfo('America/Sao_Paulo')
+B3_OPEN = day_time(10, 0)
+B3_CLOSE = day_time(18, 0)
+
+
+def market_open(now: float | None = None) -> bool:
+    """Indica se a B3 está em horário de pregão (feriados não são considerados)."""
+    local = datetime.fromtimestamp(time() if now is None else now, B3_TZ)
+    return local.weekday() < 5 and B3_OPEN <= local.time() < B3_CLOSE
+
+
+def visible_rows(children: tuple[str, ...], first: float, last: float) -> list[str]:
+    """Linhas na área visível da Treeview, a partir das frações de `yview()`."""
+    n = len(children)
+    return list(children[int(first * n):int(last * n + 0.999)])
+
+
+class RefreshPlanner:
+    """ Escolhe quais tickers atualizar a cada ciclo.
+        - ttl: idade máxima de uma linha durante o pregão (segundos)
+        - off_hours_ttl: idade máxima fora do pregão
+        - per_minute: orçamento de requisições por minuto
+        - batch_size: tickers por requisição
+    """
+
+    def __init__(self, ttl: float, off_hours_ttl: float, per_minute: int, batch_size: int):
+        self.ttl = ttl
+        self.off_hours_ttl = off_hours_ttl
+        self.per_minute = per_minute
+        self.batch_size = batch_size
+        self.sent: deque[float] = deque()  # horários das requisições do último minuto
+        self.attempted: dict[str, float] = {}  # ticker -> última tentativa
+
+    def budget_left(self, now: float) -> int:
+        """Requisições ainda disponíveis na janela do último minuto."""
+        while self.sent and now - self.sent[0] >= 60: self.sent.popleft()
+        return max(0, self.per_minute - len(self.sent))
+
+    def next_batch(self, fetched: dict[str, float], visible=(), now: float | None = None) -> list[str]:
+        """ Lote de tickers vencidos ({ticker: timestamp do dado}), com os visíveis
+            primeiro e depois os mais antigos. Retorna [] sem orçamento ou sem vencidos.
+        """
+        now = time() if now is None else now
+        if not self.budget_left(now): return []
+
+        ttl = self.ttl if market_open(now) else self.off_hours_ttl
+        visible = set(visible)
+        stale = []
+        for ticker, updated in fetched.items():
+            # Uma tentativa que falhou também conta, para não repetir o mesmo ticker a cada ciclo
+            updated = max(updated, self.attempted.get(ticker, 0.0))
+            if now - updated >= ttl: stale.append((ticker not in visible, updated, ticker))
+        if not stale: return []
+
+        stale.sort()
+        batch = [ticker for _, _, ticker in stale[:self.batch_size]]
+        self.sent.append(now)
+        for ticker in batch: self.attempted[ticker] = now
+        return batch
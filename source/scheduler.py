@@ -0,0 +1,288 @@
+""" Agendador assíncrono das consultas.
+
+    - Concorrência adaptativa (AIMD): cresce enquanto a latência está boa,
+      cai pela metade quando a fonte de dados começa a falhar.
+    - Token bucket: limita o número de requisições por segundo.
+    - Nova tentativa das falhas temporárias com backoff exponencial e jitter,
+      só dos tickers que falharam quando o lote volta parcial.
+    - Tickers já em consulta são compartilhados entre scans sobrepostos.
+"""
+# Imports
+import asyncio
+import random
+import threading
+from time import monotonic
+from concurrent.futures import Executor, Future
+from typing import Callable, Iterable
+# Modulos
+from source import market
+from source.metrics import Metrics
+from source.providers import TransientError
+
+Results = list[tuple[str, dict]]
+
+# Tipos de erro (`metrics.classify`) de um ticker que valem nova tentativa
+TRANSIENT_KINDS = frozenset({'rate_limit', 'timeout', 'network'})
+CANCEL_POLL = 0.1  # Intervalo (s) em que o backoff confere o cancelamento
+
+
+def is_transient(exc: Exception) -> bool:
+    """Indica se a falha é temporária (limite de requisições, timeout, rede)."""
+    if isinstance(exc, (TransientError, TimeoutError, ConnectionError)):
+        return True
+    text = str(exc).lower()
+    return any(key in text for key in ('429', 'too many requests', 'rate limit', 'timed out'))
+
+
+#------------------------------------------#
+# ------------- Limitadores -------------- #
+#------------------------------------------#
+class TokenBucket:
+    """Permite `rate` requisições por segundo, com rajadas de até `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0: raise ValueError(f'rate deve ser maior que zero: {rate}')
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = monotonic()
+
+    async def acquire(self):
+        while True:
+            now = monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AdaptiveLimit:
+    """ Semáforo com limite variável (AIMD).
+        +1 a cada sucesso com latência média abaixo do alvo, -1 quando a
+        latência passa do alvo e metade a cada falha temporária.
+    """
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: int = 16, target_latency: float = 3.0):
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.limit = min(max(initial, minimum), self.maximum)
+        self.target_latency = target_latency
+        self.latency = 0.0  # média móvel exponencial (s)
+        self.active = 0
+        self._cond = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+
+    async def __aexit__(self, *exc):
+        async with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    def record(self, latency: float, ok: bool):
+        """Registra uma requisição e ajusta o limite."""
+        self.latency = latency if not self.latency else 0.8 * self.latency + 0.2 * latency
+        if not ok:
+            self.limit = max(self.minimum, self.limit // 2)
+        elif self.latency > self.target_latency:
+            self.limit = max(self.minimum, self.limit - 1)
+        else:
+            self.limit = min(self.maximum, self.limit + 1)
+
+
+#------------------------------------------#
+# ------------ Consultas em voo ---------- #
+#------------------------------------------#
+class InFlight:
+    """ Registro thread-safe dos tickers sendo consultados.
+        Um scan que pede um ticker já em consulta recebe o mesmo resultado
+        em vez de buscá-lo de novo.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.futures: dict[str, Future] = {}
+
+    def claim(self, tickers: list[str]) -> tuple[list[str], dict[str, Future]]:
+        """Retorna (tickers a consultar, {ticker: Future} dos já em consulta)."""
+        mine, shared = [], {}
+        with self.lock:
+            for ticker in tickers:
+                key = market.display_name(ticker)
+                if key in self.futures:
+                    shared[key] = self.futures[key]
+                else:
+                    self.futures[key] = Future()
+                    mine.append(ticker)
+        return mine, shared
+
+    def resolve(self, tickers: list[str], results: Results):
+        """Entrega os resultados aos scans que aguardam e libera os tickers."""
+        by_key = {market.display_name(data['ticker']): (status, data) for status, data in results}
+        with self.lock:
+            futures = [(key, self.futures.pop(key, None)) for key in map(market.display_name, tickers)]
+        for key, fut in futures:
+            if fut is not None:
+                fut.set_result(by_key.get(key, ('error', market.error_data(key))))
+
+
+#------------------------------------------#
+# --------------- Relatório -------------- #
+#------------------------------------------#
+class Report:
+    """Resumo de um scan: tickers que precisaram de nova tentativa e falhas definitivas."""
+
+    def __init__(self):
+        self.retried: dict[str, int] = {}   # ticker -> tentativas extras
+        self.permanent: dict[str, str] = {} # ticker -> motivo
+        self.requests = 0
+
+    def summary(self) -> str:
+        return (f'{self.requests} requisições, {len(self.retried)} tickers com nova tentativa, '
+                f'{len(self.permanent)} falhas definitivas')
+
+
+#------------------------------------------#
+# --------------- Agendador -------------- #
+#------------------------------------------#
+class Scheduler:
+    """ Executa `fetch(lote)` para cada lote de tickers.
+        `fetch` é síncrona (yfinance) e roda no `executor`; deve devolver a
+        lista de resultados no formato de `market.search`.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[list[str]], Results],
+        executor: Executor | None = None,
+        concurrency: int = 2,
+        max_concurrency: int = 6,
+        rate: float = 2.0,
+        burst: float = 4.0,
+        retries: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        in_flight: InFlight | None = None,
+        metrics: Metrics | None = None,
+    ):
+        self.fetch = fetch
+        self.executor = executor
+        self.concurrency = concurrency
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.in_flight = in_flight
+        self.metrics = metrics
+
+    def _timed_fetch(self, chunk: list[str], queued: float) -> Results:
+        """Roda no executor: registra a espera na fila ('queue') antes de consultar."""
+        if self.metrics is not None: self.metrics.record('queue', chunk, monotonic() - queued)
+        return self.fetch(chunk)
+
+    def backoff(self, attempt: int) -> float:
+        """Backoff exponencial com jitter completo."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    @staticmethod
+    async def _wait(delay: float, cancel: threading.Event | None) -> bool:
+        """Espera `delay` segundos; retorna False assim que `cancel` for setado."""
+        end = monotonic() + delay
+        while cancel is None or not cancel.is_set():
+            left = end - monotonic()
+            if left <= 0: return True
+            await asyncio.sleep(left if cancel is None else min(left, CANCEL_POLL))
+        return False
+
+    async def _fetch_chunk(self, chunk: list[str], limit: AdaptiveLimit, bucket: TokenBucket,
+                           report: Report, cancel: threading.Event | None = None) -> Results:
+        if self.in_flight is None:
+            return await self._fetch_own(chunk, limit, bucket, report, cancel)
+
+        mine, shared = self.in_flight.claim(chunk)
+        results = []
+        try:
+            if mine: results = await self._fetch_own(mine, limit, bucket, report, cancel)
+        finally:
+            # Sempre libera os tickers, mesmo em falha, para não travar outros scans
+            self.in_flight.resolve(mine, results)
+        for fut in shared.values():
+            results.append(await asyncio.wrap_future(fut))
+        return results
+
+    async def _fetch_own(self, chunk: list[str], limit: AdaptiveLimit, bucket: TokenBucket,
+                         report: Report, cancel: threading.Event | None = None) -> Results:
+        """ Consulta o lote e repete, com backoff, só os tickers com falha temporária:
+            o lote inteiro quando a requisição falha, ou os que faltaram num lote parcial.
+            Com `cancel` setado, não faz novas tentativas e interrompe o backoff:
+            os tickers pendentes ficam com o erro da última tentativa.
+        """
+        loop = asyncio.get_running_loop()
+        pending = chunk
+        done = []
+        attempt = 0
+        while True:
+            queued = monotonic()
+            await bucket.acquire()
+            async with limit:
+                start = monotonic()
+                report.requests += 1
+                try:
+                    results = await loop.run_in_executor(self.executor, self._timed_fetch, pending, queued)
+                except Exception as exc:
+                    results = [('error', market.error_data(t, exc)) for t in pending]
+                    retry = {market.display_name(t) for t in pending} if is_transient(exc) else set()
+                else:
+                    retry = {market.display_name(data['ticker']) for status, data in results
+                             if status != 'ok' and data.get('kind') in TRANSIENT_KINDS}
+                limit.record(monotonic() - start, ok=not retry)
+
+            if not retry or attempt >= self.retries or (cancel is not None and cancel.is_set()):
+                done.extend(results)
+                break
+            done.extend(r for r in results if market.display_name(r[1]['ticker']) not in retry)
+            if not await self._wait(self.backoff(attempt + 1), cancel):
+                done.extend(r for r in results if market.display_name(r[1]['ticker']) in retry)
+                break
+            pending = [t for t in pending if market.display_name(t) in retry]
+            attempt += 1
+            for ticker in pending:
+                report.retried[market.display_name(ticker)] = attempt
+
+        results = done
+        for status, data in results:
+            if status != 'ok':
+                report.permanent[data['ticker']] = data.get('error', '')
+                if self.metrics is not None:
+                    self.metrics.error(data['ticker'], data.get('kind', 'other'), data.get('error', ''))
+        return results
+
+    async def run(self, chunks: Iterable[list[str]], on_result: Callable[[Results], None],
+                  cancel: threading.Event | None = None) -> Report:
+        """ Consulta todos os lotes e chama `on_result` a cada lote concluído.
+            Os lotes são lidos sob demanda, então `chunks` pode ser um gerador.
+            Com `cancel` setado, nenhum lote novo nem nova tentativa é iniciado.
+        """
+        report = Report()
+        limit = AdaptiveLimit(self.concurrency, maximum=self.max_concurrency)
+        bucket = TokenBucket(self.rate, self.burst)
+        chunks = iter(chunks)
+
+        async def worker():
+            for chunk in chunks:
+                if cancel is not None and cancel.is_set(): return
+                on_result(await self._fetch_chunk(chunk, limit, bucket, report, cancel))
+
+        await asyncio.gather(*(worker() for _ in range(self.max_concurrency)))
+        return report
+
+    def run_sync(self, chunks: Iterable[list[str]], on_result: Callable[[Results], None],
+                 cancel: threading.Event | None = None) -> Report:
+        """Versão bloqueante de `run`, para ser chamada de uma thread."""
+        return asyncio.run(self.run(chunks, on_result, cancel))
@@ -0,0 +1,128 @@
+""" Snapshot de mercado em arquivos colunares NumPy, para scans offline e reproduzíveis.
+
+    Uma pasta com:
+     - index.json: versão, data de criação e a lista de tickers
+     - price.npy, updated.npy: preço e timestamp do preço (um por ticker)
+     - offsets.npy: início dos dividendos de cada ticker (n + 1 posições)
+     - div_dates.npy (datetime64[D]), div_values.npy: eventos de todos os tickers, em sequência
+
+    A `SnapshotProvider` abre os arrays com `np.load(mmap_mode='r')`: só as
+    páginas dos tickers consultados são lidas do disco. Preços, datas e as
+    métricas de histórico (`dividend_years`) saem todos do snapshot.
+"""
+# Imports
+import json
+import os
+from datetime import date, datetime
+from time import time
+import numpy as np
+# Modulos
+from source.providers import Provider, Quote
+
+VERSION = 1
+ARRAYS = ('price', 'updated', 'offsets', 'div_dates', 'div_values')
+
+
+def _replace(target: str, data: bytes | np.ndarray):
+    """ Grava em um arquivo temporário ao lado de `target` e o move para o lugar
+        (os.replace é atômico): quem já abriu o arquivo antigo continua lendo o antigo.
+    """
+    temp = f'{target}.tmp'
+    try:
+        with open(temp, 'wb') as file:
+            if isinstance(data, bytes): file.write(data)
+            else: np.save(file, data)
+        os.replace(temp, target)
+    except BaseException:
+        if os.path.exists(temp): os.remove(temp)
+        raise
+
+
+def export(path: str, quotes: dict[str, tuple[float, float]], dividends: dict[str, list[tuple[str, float]]]) -> int:
+    """ Grava o snapshot em `path` a partir de {ticker: (preço, timestamp)} e
+        {ticker: [(data, valor), ...]}. Retorna o número de tickers.
+    """
+    os.makedirs(path, exist_ok=True)
+    tickers = sorted(quotes)
+    sizes = np.array([len(dividends.get(t, ())) for t in tickers], dtype=np.int64)
+    events = [event for t in tickers for event in dividends.get(t, ())]
+    arrays = {
+        'price': np.array([quotes[t][0] for t in tickers], dtype=float),
+        'updated': np.array([quotes[t][1] for t in tickers], dtype=float),
+        'offsets': np.concatenate(([0], np.cumsum(sizes))).astype(np.int64),
+        'div_dates': np.array([day for day, _ in events], dtype='datetime64[D]'),
+        'div_values': np.array([value for _, value in events], dtype=float),
+    }
+    # Uma pasta sem index.json é um snapshot incompleto: o índice antigo sai antes
+    # dos arrays serem trocados e o novo só entra depois de todos gravados, então
+    # uma exportação interrompida nunca deixa um índice apontando para arrays de outra
+    index = os.path.join(path, 'index.json')
+    if os.path.exists(index): os.remove(index)
+    for name, array in arrays.items():
+        _replace(os.path.join(path, f'{name}.npy'), array)
+    _replace(index, json.dumps({'version': VERSION, 'created': time(), 'tickers': tickers}).encode('utf-8'))
+    return len(tickers)
+
+
+class SnapshotProvider(Provider):
+    """ Fonte de dados lida de um snapshot (`export`), sem rede.
+        Não passa pelo cache do SQLite (`cacheable = False`): o scan vê
+        exatamente os dados do snapshot.
+    """
+    cacheable = False
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, 'index.json'), encoding='utf-8') as file: index = json.load(file)
+        if index.get('version') != VERSION:
+            raise ValueError(f'Versão de snapshot não suportada: {index.get("version")}')
+        self.created = index['created']
+        # Ano corrente das métricas de horizonte: o da criação, não o de hoje
+        self.year = datetime.fromtimestamp(self.created).year
+        self.tickers = index['tickers']
+        self.position = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in ARRAYS}
+
+    def quote(self, ticker: str, start: date) -> Quote:
+        """Preço e dividendos desde `start` de um ticker do snapshot."""
+        i = self.position[ticker]
+        lo, hi = int(self.arrays['offsets'][i]), int(self.arrays['offsets'][i + 1])
+        dates = self.arrays['div_dates'][lo:hi]
+        first = int(np.searchsorted(dates, np.datetime64(start, 'D')))
+        days = dates[first:].astype(str).tolist()
+        values = self.arrays['div_values'][lo + first:hi].tolist()
+        return float(self.arrays['price'][i]), list(zip(days, values))
+
+    def timestamp(self, ticker: str) -> float:
+        """Timestamp do preço gravado para o ticker (o da criação, se não estiver no snapshot)."""
+        i = self.position.get(ticker.upper())
+        return self.created if i is None else float(self.arrays['updated'][i])
+
+    def dividend_years(self, ids: list[str]) -> list[tuple[str, int, float, int]]:
+        """ Agregado anual dos dividendos, no formato de `db.load_dividend_years`:
+            [(id, ano, total, bitmask dos meses com pagamento), ...].
+        """
+        data = []
+        offsets = self.arrays['offsets']
+        for ticker in ids:
+            i = self.position.get(ticker.upper())
+            if i is None: continue
+            lo, hi = int(offsets[i]), int(offsets[i + 1])
+            if lo == hi: continue
+            dates = np.asarray(self.arrays['div_dates'][lo:hi])
+            years = dates.astype('datetime64[Y]').astype(np.int64) + 1970
+            bits = np.left_shift(1, dates.astype('datetime64[M]').astype(np.int64) % 12)
+            unique, inverse = np.unique(years, return_inverse=True)
+            totals = np.zeros(len(unique))
+            np.add.at(totals, inverse, self.arrays['div_values'][lo:hi])
+            months = np.zeros(len(unique), dtype=np.int64)
+            np.bitwise_or.at(months, inverse, bits)
+            data.extend(zip([ticker] * len(unique), unique.tolist(), totals.tolist(), months.tolist()))
+        return data
+
+    def fetch(self, tickers: list[str], start: date) -> dict[str, Quote | Exception]:
+        results = {}
+        for ticker in tickers:
+            ticker = ticker.upper()
+            if ticker in self.position: results[ticker] = self.quote(ticker, start)
+            else: results[ticker] = ValueError('Ticker não disponível no snapshot')
+        return results
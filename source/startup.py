@@ -0,0 +1,89 @@
+""" Perfil de inicialização do programa (`python pointer.py --profile-startup`).
+
+    Mede o tempo de cada import feito pela primeira vez e das fases do
+    `App.__init__` até o primeiro quadro. Desligado, `phase` não custa nada
+    além de um `if`.
+"""
+# Imports
+import builtins
+import sys
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+
+enabled = False
+started = perf_counter()
+phases: list[tuple[str, float]] = []  # (fase, segundos)
+imports: dict[str, list[float]] = {}  # módulo -> [acumulado, próprio]
+
+_import = builtins.__import__
+# Pilha de imports aninhados de cada thread (a main thread e o pré-carregamento
+# do yfinance importam ao mesmo tempo); os totais são somados sob o lock
+_local = threading.local()
+_lock = threading.Lock()
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    # Só mede imports absolutos de módulos ainda não carregados
+    if level or name in sys.modules:
+        return _import(name, globals, locals, fromlist, level)
+    stack = getattr(_local, 'stack', None)
+    if stack is None: stack = _local.stack = []
+    children = [0.0]
+    stack.append(children)
+    start = perf_counter()
+    try:
+        return _import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = perf_counter() - start
+        stack.pop()
+        if stack: stack[-1][0] += elapsed
+        with _lock:
+            total = imports.setdefault(name, [0.0, 0.0])
+            total[0] += elapsed
+            total[1] += elapsed - children[0]
+
+
+def enable():
+    """Liga o perfil. Deve ser chamada antes dos imports do programa."""
+    global enabled, started
+    enabled = True
+    started = perf_counter()
+    builtins.__import__ = _timed_import
+
+
+@contextmanager
+def phase(name: str):
+    """Cronometra uma fase da inicialização."""
+    if not enabled:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        phases.append((name, perf_counter() - start))
+
+
+def mark(name: str):
+    """Registra um instante (segundos desde `enable`), ex: primeiro quadro."""
+    if enabled: phases.append((name, perf_counter() - started))
+
+
+def report(top: int = 15) -> str:
+    """Resumo das fases e dos imports mais lentos (acumulado e próprio, em ms)."""
+    lines = ['# Fases']
+    lines += [f'{name:>28}: {seconds * 1000:9.1f} ms' for name, seconds in phases]
+    lines.append(f'\n# Imports (top {top}, acumulado / próprio)')
+    slowest = sorted(imports.items(), key=lambda item: item[1][0], reverse=True)[:top]
+    lines += [f'{name:>28}: {total * 1000:9.1f} / {own * 1000:7.1f} ms' for name, (total, own) in slowest]
+    return '\n'.join(lines)
+
+
+def print_report():
+    """Escreve o relatório no stderr ou, no executável sem console, em startup_profile.txt."""
+    text = report()
+    if sys.stderr is not None:
+        print(text, file=sys.stderr)
+    else:
+        with open('startup_profile.txt', 'w', encoding='utf-8') as file: file.write(text + '\n')
@@ -2,9 +2,9 @@
 
 # Tkinter UI
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 # Modulos 
-from source import (data_base as db)
+from source import (data_base as db, market)
 
 
 class Center_pop_up(tk.Toplevel):
@@ -53,11 +53,8 @@ def pop_up_edit_ticker(master:tk.Tk, item):
         # Formata o ticker. Ex: 'PETR4.SA'
         ticker = (ticker if ticker.upper().endswith('.SA') else f'{ticker.upper()}.SA')
 
-        # Carrega os ticker no banco de dados
-        tickers = db.load_tickers()
-
         # Verifica se o ticket ja esta no banco de dados
-        if ticker in tickers:
+        if db.ticker_exists(ticker):
             messagebox.showinfo('Ativo já cadastrado', f"'{ticker}' já está cadastrado.")
             return
         
@@ -75,11 +72,8 @@ def pop_up_edit_ticker(master:tk.Tk, item):
         # Formata o ticker. Ex: 'PETR4.SA'
         ticker = (ticker if ticker.upper().endswith('.SA') else f'{ticker.upper()}.SA')
 
-        # Carrega os ticker no banco de dados
-        tickers = db.load_tickers()
-
         # Verifica se o ticket ja esta no banco de dados
-        if not ticker in tickers:
+        if not db.ticker_exists(ticker):
             messagebox.showinfo('Ativo não cadastrado', f"'{ticker}' não está cadastrado.")
             return
         
@@ -137,11 +131,8 @@ def pop_up_new_ticker(master:tk.Tk):
         # Formata o ticker. Ex: 'PETR4.SA'
         ticker = (ticker if ticker.upper().endswith('.SA') else f'{ticker.upper()}.SA')
 
-        # Carrega os ticker no banco de dados
-        tickers = db.load_tickers()
-
         # Verifica se o ticket ja esta no banco de dados
-        if ticker in tickers:
+        if db.ticker_exists(ticker):
             messagebox.showinfo('Ativo já cadastrado', f"'{ticker}' já está cadastrado.")
             return
         
@@ -155,4 +146,229 @@ def pop_up_new_ticker(master:tk.Tk):
     ttk.Button(pop_up_win, text='Salvar', command=save).pack(pady=2)
 
     # Binds
-    ticker_entry.bind('<Return>', save)
\ No newline at end of file
+    ticker_entry.bind('<Return>', save)
+
+
+
+
+
+def import_universe(master:tk.Tk):
+    "Cadastra os tickers de um arquivo CSV/JSON (ticker, tipo, setor) em uma transação."
+    path = filedialog.askopenfilename(
+        parent=master, title='Importar tickers',
+        filetypes=[('CSV ou JSON', '*.csv *.json'), ('Todos os arquivos', '*.*')],
+    )
+    if not path:
+        return
+
+    # pandas é carregado só aqui
+    from source import universe
+    try:
+        count = universe.import_file(path)
+    except (OSError, ValueError, TypeError) as ex:
+        messagebox.showerror('Erro', f'Não foi possível importar o arquivo: {ex}')
+        return
+
+    messagebox.showinfo('Sucesso', f'{count} tickers importados ou atualizados.')
+    master.load_table(clear=False)
+
+
+
+
+
+def export_results(master:tk.Tk):
+    "Exporta a tabela (ou só as linhas filtradas) para CSV ou XLSX em segundo plano."
+    if master.exporting:
+        messagebox.showinfo('Exportando', 'Aguarde o fim da exportação atual.')
+        return
+    if not master.model.rows:
+        messagebox.showinfo('Sem resultados', 'Faça uma busca antes de exportar.')
+        return
+
+    # Com filtro ativo, pergunta se exporta só as linhas visíveis
+    filtered = False
+    if master.current_filter() is not None:
+        answer = messagebox.askyesnocancel('Exportar', 'Exportar só as linhas filtradas?\n(Não: todas as linhas)')
+        if answer is None: return
+        filtered = answer
+
+    path = filedialog.asksaveasfilename(
+        parent=master, title='Exportar resultados', defaultextension='.csv',
+        filetypes=[('CSV', '*.csv'), ('Excel', '*.xlsx')],
+    )
+    if not path:
+        return
+    master.start_export(path, master.export_iids(filtered))
+
+
+
+
+
+def pop_up_allocation(master:tk.Tk):
+    "Divide o orçamento entre os ativos da tabela para maximizar os proventos anuais."
+    rows = [row for row in master.model.rows.values() if not row.error and row.price > 0]
+    if not rows:
+        messagebox.showinfo('Sem resultados', 'Faça uma busca antes de alocar o orçamento.')
+        return
+
+    # Janela Top Level
+    pop_up_win = tk.Toplevel(master)
+    pop_up_win.title('Alocação do orçamento')
+    pop_up_win.geometry('460x420')
+    pop_up_win.transient(master)
+
+    # Limites de concentração
+    limits_frame = ttk.Frame(pop_up_win, padding=8)
+    limits_frame.pack(fill='x')
+    max_asset, max_sector = tk.StringVar(pop_up_win), tk.StringVar(pop_up_win)
+    for label, var in (('Máx. por ativo %:', max_asset), ('Máx. por setor %:', max_sector)):
+        ttk.Label(limits_frame, text=label).pack(side='left', padx=(0, 2))
+        ttk.Entry(limits_frame, textvariable=var, width=5, justify='right').pack(side='left', padx=(0, 8))
+
+    # Tabela da carteira
+    columns = ('Ativo', 'Cotas', 'Custo', 'Proventos')
+    table = ttk.Treeview(pop_up_win, columns=columns, show='headings', height=14)
+    for col in columns:
+        table.heading(col, text=col)
+        table.column(col, width=100, anchor='center')
+    table.pack(expand=True, fill='both', padx=8)
+
+    total_label = ttk.Label(pop_up_win, text='')
+    total_label.pack(pady=6)
+
+    sectors = db.load_sectors([market.normalize(row.ticker) for row in rows])
+
+    def percent(var):
+        text = var.get().strip().replace(',', '.')
+        try: return float(text) / 100 if text else None
+        except ValueError: return None
+
+    def calculate():
+        # NumPy é carregado só aqui
+        from source import allocation
+        budget = master.budget._get()
+        result = allocation.solve_dp(
+            [row.price for row in rows], [row.divs_year for row in rows], budget,
+            percent(max_asset), percent(max_sector),
+            [sectors.get(market.normalize(row.ticker)) for row in rows],
+        )
+        table.delete(*table.get_children())
+        for row, quotas in zip(rows, result.quotas.tolist()):
+            if quotas:
+                table.insert('', 'end', values=(row.ticker, quotas, round(quotas * row.price, 2), round(quotas * row.divs_year, 2)))
+        note = '' if result.exact else ' (aproximado)'
+        total_label.config(text=f'Custo: {result.cost:.2f} de {budget:.2f}   Proventos: {result.income:.2f}/ano{note}')
+
+    # Botão de cálculo
+    ttk.Button(limits_frame, text='Calcular', command=calculate).pack(side='left')
+    calculate()
+
+
+
+
+
+def pop_up_diagnostics(master:tk.Tk):
+    "Tempos por etapa, tickers mais lentos e erros classificados do scan atual."
+    pop_up_win = tk.Toplevel(master)
+    pop_up_win.title('Diagnóstico do scan')
+    pop_up_win.geometry('520x420')
+    pop_up_win.transient(master)
+
+    text = tk.Text(pop_up_win, font=('Courier', 9), wrap='none')
+    text.pack(expand=True, fill='both', padx=8, pady=(8, 0))
+
+    def refresh():
+        text.configure(state='normal')
+        text.delete('1.0', 'end')
+        text.insert('end', master.metrics.report())
+        text.configure(state='disabled')
+
+    def export():
+        path = filedialog.asksaveasfilename(
+            parent=pop_up_win, title='Exportar métricas', defaultextension='.json',
+            filetypes=[('JSON', '*.json'), ('Prometheus', '*.prom'), ('Texto Prometheus', '*.txt')],
+        )
+        if path: master.metrics.write(path)
+
+    buttons = ttk.Frame(pop_up_win, padding=8)
+    buttons.pack(fill='x')
+    ttk.Button(buttons, text='Atualizar', command=refresh).pack(side='left')
+    ttk.Button(buttons, text='Exportar', command=export).pack(side='right')
+    refresh()
+
+
+
+
+
+def pop_up_watchlist(master:tk.Tk):
+    "Cria, edita ou apaga uma lista de acompanhamento (nome, orçamento e tickers)."
+    from source import watchlists
+
+    # Janela Top Level
+    pop_up_win = tk.Toplevel(master)
+    pop_up_win.title('Listas de acompanhamento')
+    pop_up_win.geometry('320x360')
+    pop_up_win.transient(master)
+    pop_up_win.grab_set()
+
+    form = ttk.Frame(pop_up_win, padding=8)
+    form.pack(fill='x')
+    name_var, budget_var = tk.StringVar(pop_up_win), tk.StringVar(pop_up_win)
+    ttk.Label(form, text='Nome:').grid(row=0, column=0, sticky='w')
+    name_box = ttk.Combobox(form, textvariable=name_var, values=tuple(db.load_watchlists()), width=20)
+    name_box.grid(row=0, column=1, pady=2)
+    ttk.Label(form, text='Orçamento:').grid(row=1, column=0, sticky='w')
+    ttk.Entry(form, textvariable=budget_var, width=22, justify='right').grid(row=1, column=1, pady=2)
+
+    # Tickers, um por linha (ou separados por vírgula)
+    ttk.Label(pop_up_win, text='Tickers:').pack(anchor='w', padx=8)
+    text = tk.Text(pop_up_win, height=12, width=36)
+    text.pack(expand=True, fill='both', padx=8)
+
+    def fill(event=None):
+        "Preenche o formulário com a lista escolhida."
+        name = name_var.get().strip()
+        budgets = db.load_watchlists()
+        if name not in budgets: return
+        budget_var.set(f'{budgets[name]:.2f}'.replace('.', ','))
+        text.delete('1.0', 'end')
+        text.insert('end', '\n'.join(map(market.display_name, db.load_watchlist_tickers([name])[name])))
+
+    def save():
+        name = name_var.get().strip()
+        if not name or name == master.ALL_TICKERS:
+            messagebox.showwarning('Aviso', 'Digite um nome para a lista.', parent=pop_up_win)
+            return
+        try: budget = float(budget_var.get().strip().replace('.', '').replace(',', '.') or 0)
+        except ValueError:
+            messagebox.showwarning('Aviso', 'Orçamento inválido.', parent=pop_up_win)
+            return
+
+        db.save_watchlist(name, budget, watchlists.parse_tickers(text.get('1.0', 'end')))
+        pop_up_win.destroy()
+        master.watchlist.set(name)
+        master.on_watchlist_change()
+
+    def delete():
+        name = name_var.get().strip()
+        if name not in db.load_watchlists(): return
+        if not messagebox.askyesno('Apagar lista', f"Apagar a lista '{name}'?", parent=pop_up_win): return
+        db.remove_watchlist(name)
+        pop_up_win.destroy()
+        if master.active_watchlist == name:
+            master.watchlist.set(master.ALL_TICKERS)
+            master.on_watchlist_change()
+
+    # Botões
+    buttons = ttk.Frame(pop_up_win, padding=8)
+    buttons.pack(fill='x')
+    ttk.Button(buttons, text='Salvar', command=save).pack(side='left')
+    ttk.Button(buttons, text='Apagar', command=delete).pack(side='right')
+
+    # Abre com a lista exibida na janela principal
+    name_box.bind('<<ComboboxSelected>>', fill)
+    if master.active_watchlist != master.ALL_TICKERS:
+        name_var.set(master.active_watchlist)
+        fill()
+    else:
+        budget_var.set(master.budget.get())
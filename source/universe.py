@@ -0,0 +1,94 @@
+""" Importação em lote do universo de ativos (CSV ou JSON).
+
+    Formatos aceitos:
+     - CSV com cabeçalho (separador ',' ou ';'): ticker[, tipo][, setor]
+     - CSV sem cabeçalho: ticker[, tipo][, setor] por linha
+     - JSON: lista de tickers, lista de objetos ou objeto de colunas
+
+    Os tickers são normalizados ('petr4' -> 'PETR4.SA') de uma vez, sobre a
+    coluna inteira, e gravados em uma única transação.
+"""
+# Imports
+import json
+import os
+import numpy as np
+import pandas as pd
+# Modulos
+from source import data_base as db
+
+# Nomes aceitos para cada coluna
+TICKER_COLUMNS = ('ticker', 'id', 'symbol', 'codigo', 'código', 'ativo')
+TYPE_COLUMNS = ('asset_type', 'type', 'tipo')
+SECTOR_COLUMNS = ('sector', 'setor', 'segmento')
+
+# Tipos de ativo gravados no banco
+ASSET_TYPES = ('fii', 'acao')
+TYPE_ALIASES = {
+    'fii': 'fii', 'fiis': 'fii', 'fundo imobiliário': 'fii', 'fundo imobiliario': 'fii',
+    'acao': 'acao', 'ação': 'acao', 'acoes': 'acao', 'ações': 'acao', 'stock': 'acao',
+}
+
+
+def _column(frame: pd.DataFrame, names: tuple) -> pd.Series | None:
+    """Primeira coluna do frame com um dos `names` (sem diferenciar maiúsculas)."""
+    lower = {str(col).strip().lower(): col for col in frame.columns}
+    for name in names:
+        if name in lower: return frame[lower[name]]
+    return None
+
+
+def read_file(path: str) -> pd.DataFrame:
+    """Lê o arquivo como um frame de texto, com as colunas originais."""
+    if os.path.splitext(path)[1].lower() == '.json':
+        with open(path, encoding='utf-8') as file: data = json.load(file)
+        if isinstance(data, list) and all(isinstance(item, str) for item in data):
+            return pd.DataFrame({'ticker': data}, dtype=object)
+        return pd.DataFrame(data, dtype=object)
+
+    with open(path, encoding='utf-8') as file: first = file.readline()
+    sep = ';' if ';' in first else ','
+    # Sem um nome de coluna de ticker na primeira linha, o arquivo não tem cabeçalho
+    header = {cell.strip().lower() for cell in first.split(sep)} & set(TICKER_COLUMNS)
+    if header:
+        return pd.read_csv(path, dtype=str, sep=sep, comment='#')
+    frame = pd.read_csv(path, dtype=str, sep=sep, header=None, comment='#')
+    return frame.rename(columns={0: 'ticker', 1: 'asset_type', 2: 'sector'})
+
+
+def normalize(frame: pd.DataFrame, known: set[str] = frozenset()) -> pd.DataFrame:
+    """ Frame (id, asset_type, sector) pronto para `db.import_tickers`.
+        - id: maiúsculo e com sufixo '.SA'; linhas vazias e repetidas são descartadas
+        - asset_type: 'fii' ou 'acao'. Sem tipo, um ticker novo terminado em '11'
+          vira 'fii' e os demais 'acao'; um já cadastrado (`known`) mantém o seu
+        - sector: texto livre; vazio vira None
+    """
+    tickers = _column(frame, TICKER_COLUMNS)
+    if tickers is None: raise ValueError("Coluna de tickers não encontrada (ex: 'ticker').")
+
+    ids = tickers.astype('string').str.strip().str.upper()
+    # Linhas sem ticker saem antes de derivar código e tipo (NA nas máscaras não é booleano)
+    filled = ids.fillna('') != ''
+    frame, ids = frame[filled], ids[filled]
+    ids = ids.where(ids.str.endswith('.SA'), ids + '.SA')
+    code = ids.str.removesuffix('.SA')
+
+    types = _column(frame, TYPE_COLUMNS)
+    if types is None: types = pd.Series(pd.NA, index=frame.index, dtype='string')
+    types = types.astype('string').str.strip().str.lower().map(TYPE_ALIASES, na_action='ignore')
+    guess = pd.Series(np.where(code.str.endswith('11'), 'fii', 'acao'), index=frame.index, dtype='string')
+    types = types.fillna(guess.where(~ids.isin(known)))
+
+    sectors = _column(frame, SECTOR_COLUMNS)
+    if sectors is None: sectors = pd.Series(pd.NA, index=frame.index, dtype='string')
+    sectors = sectors.astype('string').str.strip()
+    sectors = sectors.where(sectors != '')
+
+    result = pd.DataFrame({'id': ids, 'asset_type': types, 'sector': sectors})
+    result = result[code != ''].drop_duplicates('id', keep='last')
+    return result.astype(object).where(result.notna(), None)
+
+
+def import_file(path: str) -> int:
+    """Lê, normaliza e grava o arquivo em uma transação; retorna quantos tickers entraram ou mudaram."""
+    frame = normalize(read_file(path), set(db.load_tickers()))
+    return db.import_tickers(list(frame.itertuples(index=False, name=None)))
@@ -0,0 +1,50 @@
+""" Listas de acompanhamento (watchlists), cada uma com o seu orçamento.
+
+    Um scan de várias listas consulta cada ticker uma única vez, mesmo que
+    ele esteja em mais de uma lista, e depois distribui os resultados entre
+    as listas. O custo de rede cresce com os tickers distintos, não com a
+    soma das listas.
+"""
+# Modulos
+from source import data_base as db, market
+
+
+class Watchlist:
+    """Lista salva: nome, orçamento e tickers (já no formato 'PETR4.SA')."""
+    __slots__ = ('name', 'budget', 'tickers', 'members')
+
+    def __init__(self, name: str, budget: float, tickers: list[str]):
+        self.name = name
+        self.budget = budget
+        self.tickers = tickers
+        self.members = frozenset(tickers)
+
+
+def parse_tickers(text: str) -> list[str]:
+    """Tickers separados por espaço, vírgula, ponto e vírgula ou linha, sem repetição."""
+    tokens = text.replace(',', ' ').replace(';', ' ').split()
+    return list(dict.fromkeys(market.normalize(token) for token in tokens))
+
+
+def load(names: list[str]) -> list[Watchlist]:
+    """Carrega as listas pedidas, na ordem dada. Nome desconhecido levanta ValueError."""
+    budgets = db.load_watchlists()
+    missing = [name for name in names if name not in budgets]
+    if missing: raise ValueError(f'Lista não encontrada: {", ".join(missing)}')
+    tickers = db.load_watchlist_tickers(names)
+    return [Watchlist(name, budgets[name], tickers[name]) for name in names]
+
+
+def unique_tickers(lists: list[Watchlist]) -> list[str]:
+    """Tickers distintos de todas as listas, na ordem em que aparecem."""
+    return list(dict.fromkeys(ticker for wl in lists for ticker in wl.tickers))
+
+
+def fan_out(results: list[tuple[str, dict]], lists: list[Watchlist]) -> dict[str, list[tuple[str, dict]]]:
+    """Distribui um lote de resultados de `market.search` entre as listas que contêm cada ticker."""
+    shared = {name: [] for name in (wl.name for wl in lists)}
+    for result in results:
+        ticker = market.normalize(result[1]['ticker'])
+        for wl in lists:
+            if ticker in wl.members: shared[wl.name].append(result)
+    return shared
@@ -0,0 +1,5 @@
+# Permite `import source...` rodando o pytest da raiz do repositório
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
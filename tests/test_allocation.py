@@ -0,0 +1,125 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from source import allocation
+
+
+def brute_force(prices, dividends, budget, max_asset=None, max_sector=None, sectors=None) -> float:
+    """ Maior provento anual entre todas as carteiras viáveis, em centavos inteiros.
+        Enumera as cotas de todos os ativos menos o último, que recebe o máximo que cabe.
+    """
+    cents = [round(p * 100) for p in prices]
+    budget_c = math.floor(budget * 100 + 1e-6)
+    asset_c = budget_c if max_asset is None else math.floor(budget * max_asset * 100 + 1e-6)
+    sector_c = None if max_sector is None else math.floor(budget * max_sector * 100 + 1e-6)
+    sectors = sectors if max_sector is not None and sectors is not None else [None] * len(prices)
+    best = 0.0
+
+    def visit(i, left, spent, income):
+        nonlocal best
+        sector = sectors[i]
+        room = left if sector is None else min(left, sector_c - spent.get(sector, 0))
+        most = min(room, asset_c) // cents[i]
+        if i == len(prices) - 1:
+            best = max(best, income + most * dividends[i])
+            return
+        for q in range(most + 1):
+            cost = q * cents[i]
+            if sector is not None: spent[sector] = spent.get(sector, 0) + cost
+            visit(i + 1, left - cost, spent, income + q * dividends[i])
+            if sector is not None: spent[sector] -= cost
+
+    visit(0, budget_c, {}, 0.0)
+    return best
+
+
+def feasible(quotas, prices, budget, max_asset=None, max_sector=None, sectors=None) -> bool:
+    spent = [q * p for q, p in zip(quotas, prices)]
+    if sum(spent) > budget + 1e-6: return False
+    if max_asset is not None and any(s > budget * max_asset + 1e-6 for s in spent): return False
+    if max_sector is not None:
+        totals = {}
+        for sector, s in zip(sectors, spent):
+            if sector is not None: totals[sector] = totals.get(sector, 0.0) + s
+        if any(total > budget * max_sector + 1e-6 for total in totals.values()): return False
+    return True
+
+
+def cases(n: int, seed: int, budgets: tuple[float, float], sectors: bool):
+    rng = random.Random(seed)
+    for _ in range(n):
+        size = rng.randint(2, 4)
+        prices = [round(rng.uniform(15, 150), 2) for _ in range(size)]
+        dividends = [round(price * rng.uniform(0.0, 0.15), 4) for price in prices]
+        budget = round(rng.uniform(*budgets), 2)
+        max_asset = rng.choice([None, 0.3, 0.5])
+        if sectors:
+            yield prices, dividends, budget, max_asset, rng.choice([0.4, 0.7]), [rng.choice(['a', 'b', None]) for _ in prices]
+        else:
+            yield prices, dividends, budget, max_asset, None, None
+
+
+# Orçamentos acima de 150: abaixo disso a grade de 0,01 da versão aproximada já era exata
+WITHOUT_SECTORS = list(cases(60, seed=0, budgets=(150, 900), sectors=False))
+WITH_SECTORS = list(cases(12, seed=1, budgets=(150, 260), sectors=True))
+
+
+@pytest.mark.parametrize('prices, dividends, budget, max_asset, max_sector, sectors', WITHOUT_SECTORS)
+def test_dp_is_exact_and_optimal(prices, dividends, budget, max_asset, max_sector, sectors):
+    result = allocation.solve_dp(prices, dividends, budget, max_asset, max_sector, sectors)
+    assert result.exact
+    assert feasible(result.quotas.tolist(), prices, budget, max_asset, max_sector, sectors)
+    assert result.income == pytest.approx(brute_force(prices, dividends, budget, max_asset), abs=1e-6)
+
+
+@pytest.mark.parametrize('prices, dividends, budget, max_asset, max_sector, sectors', WITH_SECTORS)
+def test_exact_with_sector_limits(prices, dividends, budget, max_asset, max_sector, sectors):
+    result = allocation.solve_exact(prices, dividends, budget, max_asset, max_sector, sectors)
+    assert result.exact
+    assert feasible(result.quotas.tolist(), prices, budget, max_asset, max_sector, sectors)
+    assert result.income == pytest.approx(brute_force(prices, dividends, budget, max_asset, max_sector, sectors), abs=1e-6)
+
+
+@pytest.mark.parametrize('prices, dividends, budget, max_asset, max_sector, sectors', WITHOUT_SECTORS[:20] + WITH_SECTORS)
+def test_approximation_is_feasible_and_not_worse_than_greedy(prices, dividends, budget, max_asset, max_sector, sectors):
+    result = allocation.solve_dp(prices, dividends, budget, max_asset, max_sector, sectors, resolution=budget / 500)
+    greedy = allocation.solve_greedy(prices, dividends, budget, max_asset, max_sector, sectors)
+    assert not result.exact
+    assert feasible(result.quotas.tolist(), prices, budget, max_asset, max_sector, sectors)
+    assert feasible(greedy.quotas.tolist(), prices, budget, max_asset, max_sector, sectors)
+    assert greedy.income <= result.income + 1e-9
+
+
+def test_dp_beats_greedy_on_leftover():
+    # Guloso compra 1 cota de 60 (yield 10%) e a sobra de 40 não compra nada
+    result = allocation.solve_dp([60.0, 50.0], [6.0, 4.9], 100)
+    assert result.exact
+    assert result.quotas.tolist() == [0, 2]
+    assert result.income == pytest.approx(9.8)
+
+
+def test_float_limits_are_not_lost_to_rounding():
+    # 100 * 0.29 = 28.999999999999996: ainda cabem 10 cotas de 2,90
+    result = allocation.solve_dp([2.9, 1000.0], [1.0, 0.0], 100, max_asset=0.29)
+    assert result.quotas.tolist() == [10, 0]
+
+
+def test_large_budget_is_approximate_and_within_limits():
+    rng = np.random.default_rng(0)
+    prices = rng.uniform(5, 150, 200).round(2)
+    dividends = (prices * rng.uniform(0.004, 0.14, 200)).round(4)
+    sectors = [f'setor{i % 7}' for i in range(200)]
+    assert allocation.exact_work(prices, dividends, 100_000, 0.1, 0.3, sectors) > allocation.EXACT_WORK
+    result = allocation.solve_dp(prices, dividends, 100_000, 0.1, 0.3, sectors)
+    greedy = allocation.solve_greedy(prices, dividends, 100_000, 0.1, 0.3, sectors)
+    assert not result.exact
+    assert feasible(result.quotas.tolist(), prices.tolist(), 100_000, 0.1, 0.3, sectors)
+    assert result.income >= greedy.income
+
+
+def test_empty_and_zero_budget():
+    assert allocation.solve_dp([], [], 1000).quotas.tolist() == []
+    assert allocation.solve_dp([10.0], [1.0], 0).quotas.tolist() == [0]
@@ -0,0 +1,121 @@
+import math
+import random
+from math import floor
+
+import numpy as np
+import pytest
+
+from source import analytics, data_base as db
+from source.benchmark import temp_db
+
+YEAR = 2025
+SINCE = '2024-01-01'
+
+
+def year_rows(ticker: str, totals: dict[int, float], months: int = 0b111111111111) -> list[tuple]:
+    return [(ticker, year, total, months) for year, total in totals.items()]
+
+
+#------------------------------------------#
+# --------------- Ranking ---------------- #
+#------------------------------------------#
+def per_ticker(price: float, divs: list[tuple[str, float]], since: str, budget_value: float) -> tuple:
+    """Regra antiga, um ticker por vez: (dividendos no ano, cotas, proventos, tag)."""
+    divs_year = float(sum([value for day, value in divs if day >= since][-12:]))
+    quotas, earnings = 0, 0.0
+    if price and price > 0 and budget_value > 0:
+        quotas = floor(budget_value / price)
+        earnings = round(quotas * divs_year, 2)
+    if divs_year > price * 0.15: tag = 'verde'
+    elif divs_year > price * 0.10: tag = 'amarelo'
+    else: tag = ''
+    return divs_year, quotas, earnings, tag
+
+
+def fixture_quotes() -> dict[str, tuple[float, list[tuple[str, float]]]]:
+    rng = random.Random(0)
+    quotes = {
+        # Mais de 12 eventos na janela e eventos antes dela
+        'MANY': (10.0, [(f'{year}-{month:02d}-10', 0.1 * month) for year in (2023, 2024, 2025) for month in range(1, 13)]),
+        'NONE': (25.0, []),
+        'OLD': (25.0, [('2023-05-10', 1.0)]),
+        'ZERO': (0.0, [('2024-05-10', 1.0)]),
+        # Exatamente no limite das tags: não sobe de cor
+        'EDGE15': (10.0, [('2024-03-01', 1.0), ('2024-06-01', 0.5)]),
+        'EDGE10': (10.0, [('2024-03-01', 1.0)]),
+    }
+    for i in range(40):
+        price = round(rng.uniform(5, 150), 2)
+        days = sorted(f'{rng.choice((2023, 2024, 2025))}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}'
+                      for _ in range(rng.randint(0, 30)))
+        events = [(day, round(price * rng.uniform(0.002, 0.02), 4)) for day in dict.fromkeys(days)]
+        quotes[f'T{i}'] = (price, events)
+    return quotes
+
+
+@pytest.mark.parametrize('budget_value', [0.0, 999.99, 10_000.0])
+def test_rank_matches_per_ticker_rule(budget_value):
+    quotes = fixture_quotes()
+    frame = analytics.rank(quotes, SINCE, budget_value)
+    assert list(frame.index) == list(quotes)
+    for ticker, (price, divs) in quotes.items():
+        divs_year, quotas, earnings, tag = per_ticker(price, divs, SINCE, budget_value)
+        row = frame.loc[ticker]
+        assert row['price'] == price
+        assert row['divs_year'] == pytest.approx(divs_year, abs=1e-9)
+        assert (row['quotas'], row['earnings'], row['tag']) == (quotas, earnings, tag), ticker
+
+
+#------------------------------------------#
+# ----------- Agregado anual ------------- #
+#------------------------------------------#
+def test_dividend_years_follow_inserts_and_corrections():
+    with temp_db():
+        db.save_dividends([('A.SA', '2023-01-15', 1.0), ('A.SA', '2023-01-30', 0.5), ('A.SA', '2023-03-10', 2.0),
+                           ('A.SA', '2024-12-01', 4.0), ('B.SA', '2024-06-01', 1.0)])
+        assert sorted(db.load_dividend_years(['A.SA', 'B.SA'])) == [
+            ('A.SA', 2023, 3.5, 0b101), ('A.SA', 2024, 4.0, 1 << 11), ('B.SA', 2024, 1.0, 1 << 5),
+        ]
+        # Reconsulta: mesmo valor não muda nada, valor corrigido troca só a diferença
+        db.save_dividends([('A.SA', '2023-01-15', 1.0), ('A.SA', '2023-03-10', 2.5), ('A.SA', '2023-07-01', 1.0)])
+        years = {(t, y): (total, months) for t, y, total, months in db.load_dividend_years(['A.SA'])}
+        assert years[('A.SA', 2023)] == (pytest.approx(5.0), 0b1000101)
+        assert years[('A.SA', 2024)] == (4.0, 1 << 11)
+
+
+#------------------------------------------#
+# ------------- Horizontes --------------- #
+#------------------------------------------#
+def test_horizon_metrics_full_history():
+    totals = {year: float(year - 2014) for year in range(2015, YEAR)}  # 1, 2, ..., 10
+    metrics = analytics.horizon_metrics(year_rows('A', totals, months=0b1111), {'A': 20.0}, YEAR).loc['A']
+    assert metrics['avg_3y'] == pytest.approx(9.0)
+    assert metrics['avg_10y'] == pytest.approx(5.5)
+    assert metrics['cagr_3y'] == pytest.approx(math.sqrt(10 / 8) - 1)
+    assert metrics['cagr_10y'] == pytest.approx((10 / 1) ** (1 / 9) - 1)
+    assert metrics['consistency_5y'] == pytest.approx(4 / 12)
+    assert metrics['yoc_5y'] == pytest.approx(8.0 / 20.0)
+
+
+def test_years_before_history_are_missing_not_zero():
+    rows = (year_rows('NEW', {2021: 2.0, 2022: 2.0, 2023: 2.0, 2024: 2.0})
+            + year_rows('GAP', {2020: 1.0, 2021: 1.0, 2023: 1.0, 2024: 2.0}))
+    metrics = analytics.horizon_metrics(rows, {'NEW': 10.0, 'GAP': 10.0, 'NONE': 10.0}, YEAR)
+
+    # 4 anos de histórico: só o horizonte de 3 anos é calculado
+    assert metrics.loc['NEW', 'avg_3y'] == pytest.approx(2.0)
+    assert metrics.loc['NEW', 'cagr_3y'] == pytest.approx(0.0)
+    assert np.isnan(metrics.loc['NEW', ['avg_5y', 'cagr_5y', 'consistency_5y', 'yoc_5y', 'avg_10y']].astype(float)).all()
+
+    # Ano sem pagamento dentro do histórico conta como zero
+    assert metrics.loc['GAP', 'avg_5y'] == pytest.approx(5.0 / 5)
+    assert metrics.loc['GAP', 'consistency_5y'] == pytest.approx(4 / 5)
+    assert np.isnan(metrics.loc['GAP', 'avg_10y'])
+
+    assert metrics.loc['NONE'].isna().all()
+
+
+def test_horizon_metrics_without_years():
+    metrics = analytics.horizon_metrics([], {'A': 10.0}, YEAR)
+    assert list(metrics.columns) == list(analytics.HORIZON_FIELDS)
+    assert metrics.loc['A'].isna().all()
@@ -0,0 +1,93 @@
+import csv
+import sys
+import threading
+from datetime import datetime
+
+import pytest
+
+from source import export
+from source.model import COLUMNS, Row
+
+FETCHED = 1_700_000_000.0
+
+
+def rows(n: int) -> list[Row]:
+    result = []
+    for i in range(n):
+        if i % 7 == 3:
+            result.append(Row(f'ERR{i}', error=True, fetched=FETCHED))
+            continue
+        row = Row(f'T{i}', price=10.0 + i, divs_year=1.23456, fetched=FETCHED)
+        row.set_values(i, round(i * 1.23456, 2), 'verde')
+        result.append(row)
+    return result
+
+
+def read_csv(path) -> list[list[str]]:
+    with open(path, newline='', encoding='utf-8') as stream:
+        return list(csv.reader(stream))
+
+
+def test_record_uses_numbers_and_date():
+    row = rows(1)[0]
+    updated = datetime.fromtimestamp(FETCHED).isoformat(sep=' ', timespec='seconds')
+    assert export.record(row) == ('T0', 10.0, 1.2346, 0, 0.0, updated)
+    assert export.record(Row('ERR', error=True, fetched=FETCHED)) == ('ERR', None, None, None, None, updated)
+
+
+def test_file_format():
+    assert export.file_format('a.XLSX') == 'xlsx'
+    assert export.file_format('a.csv') == export.file_format('a.txt') == 'csv'
+
+
+def test_csv_is_written_in_chunks(tmp_path):
+    path = tmp_path / 'out.csv'
+    data = rows(23)
+    progress = []
+    assert export.write(str(path), data, lambda done, total: progress.append((done, total)), chunk=5) == 23
+    assert progress == [(5, 23), (10, 23), (15, 23), (20, 23), (23, 23)]
+
+    lines = read_csv(path)
+    assert lines[0] == list(COLUMNS)
+    assert len(lines) == 24
+    assert lines[1:] == [['' if value is None else str(value) for value in export.record(row)] for row in data]
+
+
+def test_cancel_stops_at_next_chunk(tmp_path):
+    path = tmp_path / 'out.csv'
+    cancel = threading.Event()
+
+    def on_progress(done, total):
+        if done >= 10: cancel.set()
+
+    assert export.write(str(path), rows(50), on_progress, cancel, chunk=5) == 10
+    assert len(read_csv(path)) == 11
+
+
+def test_empty_export_has_only_header(tmp_path):
+    path = tmp_path / 'out.csv'
+    progress = []
+    assert export.write(str(path), [], lambda *args: progress.append(args)) == 0
+    assert progress == []
+    assert read_csv(path) == [list(COLUMNS)]
+
+
+def test_xlsx_is_written_in_chunks(tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+    path = tmp_path / 'out.xlsx'
+    data = rows(12)
+    progress = []
+    assert export.write(str(path), data, lambda done, total: progress.append(done), chunk=5) == 12
+    assert progress == [5, 10, 12]
+
+    sheet = openpyxl.load_workbook(path, read_only=True).active
+    values = list(sheet.iter_rows(values_only=True))
+    assert values[0] == COLUMNS
+    assert values[1:] == [export.record(row) for row in data]
+
+
+def test_missing_openpyxl_is_reported(tmp_path, monkeypatch):
+    # None em sys.modules faz o import levantar ImportError
+    monkeypatch.setitem(sys.modules, 'openpyxl', None)
+    with pytest.raises(RuntimeError, match='openpyxl'):
+        export.write(str(tmp_path / 'out.xlsx'), rows(3))
@@ -0,0 +1,111 @@
+import random
+
+import pytest
+
+from source.filters import FIELDS, ResultIndex
+from source.model import ResultModel
+
+
+def snapshot_row(ticker, price, divs_year, quotas, earnings, error=False):
+    if error: return (ticker, None, None, None, None, 'vermelho', 1, 0.0)
+    return (ticker, price, divs_year, quotas, earnings, '', 0, 0.0)
+
+
+@pytest.fixture
+def model():
+    model = ResultModel()
+    model.load_snapshot([
+        snapshot_row('PETR4', 30.0, 3.0, 33, 99.0),
+        snapshot_row('PETR3', 32.0, 3.2, 31, 99.2),
+        snapshot_row('VALE3', 60.0, 6.0, 16, 96.0),
+        snapshot_row('MXRF11', 10.0, 1.2, 100, 120.0),
+        snapshot_row('ZERO11', 0.0, 0.0, 0, 0.0),
+        snapshot_row('ERRO3', 0, 0, 0, 0, error=True),
+    ])
+    return model
+
+
+def values(row) -> dict[str, float]:
+    return {
+        'price': row.price, 'divs_year': row.divs_year, 'quotas': row.quotas, 'earnings': row.earnings,
+        'dy': row.divs_year / row.price if row.price > 0 else None,
+    }
+
+
+def brute_force(model, prefix='', ranges=None) -> set[str]:
+    """Mesma regra de `ResultIndex.query`, linha a linha."""
+    found = set()
+    for iid, row in model.rows.items():
+        if not iid.startswith(prefix.strip().upper()): continue
+        inside = True
+        for field, (low, high) in (ranges or {}).items():
+            if low is None and high is None: continue
+            value = None if row.error else values(row)[field]
+            if value is None or (low is not None and value < low) or (high is not None and value > high):
+                inside = False
+        if inside: found.add(iid)
+    return found
+
+
+def test_bounds_are_inclusive(model):
+    index = ResultIndex(model)
+    assert index.query(ranges={'price': (30.0, 60.0)}) == {'PETR4', 'PETR3', 'VALE3'}
+    assert index.query(ranges={'price': (30.01, 59.99)}) == {'PETR3'}
+    assert index.query(ranges={'quotas': (None, 16)}) == {'VALE3', 'ZERO11'}
+    assert index.query(ranges={'earnings': (120.0, None)}) == {'MXRF11'}
+    assert index.query(ranges={'dy': (0.12, 0.12)}) == {'MXRF11'}
+
+
+def test_empty_ranges(model):
+    index = ResultIndex(model)
+    assert index.query(ranges={'price': (60.0, 30.0)}) == set()
+    assert index.query(ranges={'price': (1000.0, None)}) == set()
+    assert index.query(prefix='XYZ') == set()
+    assert ResultIndex(ResultModel()).query(ranges={'price': (0, 10)}) == set()
+
+
+def test_no_filter_returns_all_rows(model):
+    index = ResultIndex(model)
+    assert index.query() == set(model.rows)
+    assert index.query(ranges={'price': (None, None)}) == set(model.rows)
+
+
+def test_errors_and_zero_price_stay_out_of_ranges(model):
+    index = ResultIndex(model)
+    assert 'ERRO3' not in index.query(ranges={'price': (None, 100.0)})
+    assert 'ZERO11' not in index.query(ranges={'dy': (None, 1.0)})
+    assert 'ERRO3' in index.query(prefix='err')
+
+
+def test_prefix(model):
+    index = ResultIndex(model)
+    assert index.query(prefix=' petr') == {'PETR4', 'PETR3'}
+    assert index.query(prefix='PETR4') == {'PETR4'}
+
+
+def test_rebuilds_when_model_changes(model):
+    index = ResultIndex(model)
+    assert index.query(prefix='VALE') == {'VALE3'}
+    model.remove('VALE3')
+    assert index.query(prefix='VALE') == set()
+
+
+def test_combined_filters_match_brute_force():
+    rng = random.Random(0)
+    model = ResultModel()
+    model.load_snapshot([
+        snapshot_row(f'{rng.choice("ABC")}{i:03d}', round(rng.uniform(0, 100), 1), round(rng.uniform(0, 10), 1),
+                     rng.randint(0, 50), round(rng.uniform(0, 200), 1), error=rng.random() < 0.05)
+        for i in range(300)
+    ])
+    # Valores repetidos nos limites exercitam a inclusão dos extremos
+    grid = {'price': [10.0, 25.5, 50.0, 75.0], 'divs_year': [1.0, 2.5, 5.0], 'quotas': [0, 10, 25, 40],
+            'earnings': [20.0, 100.0, 150.0], 'dy': [0.01, 0.05, 0.2]}
+    index = ResultIndex(model)
+    for _ in range(300):
+        ranges = {}
+        for field in rng.sample(FIELDS, rng.randint(1, 3)):
+            low, high = rng.choice(grid[field] + [None]), rng.choice(grid[field] + [None])
+            ranges[field] = (low, high)
+        prefix = rng.choice(['', 'A', 'b0', 'C01'])
+        assert index.query(prefix, ranges) == brute_force(model, prefix, ranges), (prefix, ranges)
@@ -0,0 +1,89 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from source import data_base as db, market
+from source.benchmark import fake_tickers, temp_db
+from source.providers import FakeProvider
+
+
+class Recording(FakeProvider):
+    """FakeProvider com cache que registra (início, tickers) de cada requisição."""
+
+    def __init__(self, **kwargs):
+        super().__init__(cacheable=True, **kwargs)
+        self.calls = []
+
+    def fetch(self, tickers, start):
+        self.calls.append((start, sorted(tickers)))
+        return super().fetch(tickers, start)
+
+
+@pytest.fixture
+def cache():
+    with temp_db():
+        yield
+
+
+def window(provider: FakeProvider, ticker: str) -> list[tuple[str, float]]:
+    return provider.quote(ticker, market.start_date())[1]
+
+
+def test_new_tickers_fetch_full_history_once(cache):
+    provider = Recording(dividends=130)
+    tickers = fake_tickers(3)
+    first = market.fetch_cached(tickers, provider=provider)
+    assert provider.calls == [(market.history_start(), tickers)]
+    assert all(first[t][1] == window(provider, t) for t in tickers)
+
+    # Dentro do TTL nada vai à rede
+    second = market.fetch_cached(tickers, provider=provider)
+    assert len(provider.calls) == 1
+    assert [value[:2] for value in second.values()] == [value[:2] for value in first.values()]
+
+
+def test_stale_tickers_fetch_only_since_last_quote(cache):
+    provider = Recording()
+    tickers = fake_tickers(3)
+    market.fetch_cached(tickers, provider=provider)
+    results = market.fetch_cached(tickers, ttl=0, provider=provider)
+    # A última consulta foi hoje: basta a semana mínima de pregões
+    assert provider.calls[1] == (date.today() - timedelta(days=7), tickers)
+    # O upsert não duplica os eventos reconsultados
+    assert all(results[t][1] == window(provider, t) for t in tickers)
+
+
+def test_outdated_ticker_is_fetched_separately(cache):
+    provider = Recording()
+    tickers = fake_tickers(3)
+    market.fetch_cached(tickers, provider=provider)
+    # Um ticker consultado há 200 dias, com o último dividendo na mesma época
+    old = date.today() - timedelta(days=200)
+    db.save_quotes([('OLD1.SA', 10.0, datetime.combine(old, datetime.min.time()).timestamp())])
+    db.save_dividends([('OLD1.SA', old.isoformat(), 0.1)])
+
+    results = market.fetch_cached(tickers + ['OLD1.SA', 'NEW1.SA'], ttl=0, provider=provider)
+    assert sorted(provider.calls[1:]) == [
+        (market.history_start(), ['NEW1.SA']),
+        (old, ['OLD1.SA']),
+        (date.today() - timedelta(days=7), tickers),
+    ]
+    # Completa a partir do evento armazenado, sem baixar de novo o que já havia
+    assert results['OLD1.SA'][1] == [(old.isoformat(), 0.1)] + provider.quote('OLD1.SA', old)[1]
+    assert results['NEW1.SA'][1] == window(provider, 'NEW1.SA')
+
+
+def test_since_uses_latest_of_dividend_and_quote():
+    today = datetime.now().timestamp()
+    last_divs = {'A.SA': '2020-01-10', 'B.SA': '2099-01-01'}
+    quotes = {'A.SA': (1.0, today), 'B.SA': (1.0, today)}
+    assert market._since('A.SA', quotes, last_divs) == date.today()
+    assert market._since('B.SA', quotes, last_divs) == date(2099, 1, 1)
+    assert market._since('C.SA', quotes, last_divs) == market.history_start()
+
+
+def test_groups_split_distant_starts():
+    today = date.today()
+    since = {'A': today, 'B': today - timedelta(days=20), 'C': today - timedelta(days=400), 'D': today - timedelta(days=390)}
+    groups = market._groups(since)
+    assert groups == [(today - timedelta(days=400), ['C', 'D']), (today - timedelta(days=20), ['B', 'A'])]
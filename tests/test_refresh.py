@@ -0,0 +1,69 @@
+from datetime import datetime
+
+import pytest
+
+from source import refresh
+from source.refresh import RefreshPlanner
+
+# Quarta-feira às 14h (pregão) e sábado às 14h (fora do pregão), horário de Brasília
+OPEN = datetime(2025, 1, 15, 14, 0, tzinfo=refresh.B3_TZ).timestamp()
+CLOSED = datetime(2025, 1, 18, 14, 0, tzinfo=refresh.B3_TZ).timestamp()
+
+
+def planner(**kwargs) -> RefreshPlanner:
+    return RefreshPlanner(**{'ttl': 60, 'off_hours_ttl': 3600, 'per_minute': 100, 'batch_size': 3, **kwargs})
+
+
+@pytest.mark.parametrize('hour, minute, day, expected', [
+    (9, 59, 15, False), (10, 0, 15, True), (17, 59, 15, True), (18, 0, 15, False), (14, 0, 18, False),
+])
+def test_market_open(hour, minute, day, expected):
+    assert refresh.market_open(datetime(2025, 1, day, hour, minute, tzinfo=refresh.B3_TZ).timestamp()) is expected
+
+
+def test_visible_rows():
+    children = tuple(f'T{i}' for i in range(10))
+    assert refresh.visible_rows(children, 0.2, 0.5) == ['T2', 'T3', 'T4']
+    assert refresh.visible_rows((), 0.0, 1.0) == []
+
+
+def test_visible_first_then_oldest():
+    fetched = {'A': OPEN - 500, 'B': OPEN - 100, 'C': OPEN - 900, 'D': OPEN - 300, 'E': OPEN - 200}
+    assert planner().next_batch(fetched, visible=['B', 'E'], now=OPEN) == ['E', 'B', 'C']
+
+
+def test_batch_size_limit():
+    fetched = {f'T{i}': OPEN - 1000 - i for i in range(10)}
+    assert planner(batch_size=4).next_batch(fetched, now=OPEN) == ['T9', 'T8', 'T7', 'T6']
+
+
+def test_fresh_tickers_are_skipped():
+    fetched = {'FRESH': OPEN - 59, 'STALE': OPEN - 60}
+    assert planner().next_batch(fetched, visible=['FRESH'], now=OPEN) == ['STALE']
+    assert planner().next_batch({'FRESH': OPEN - 10}, now=OPEN) == []
+
+
+def test_off_hours_ttl():
+    fetched = {'A': CLOSED - 600, 'B': CLOSED - 4000}
+    assert planner().next_batch(fetched, now=CLOSED) == ['B']
+
+
+def test_attempted_tickers_wait_a_full_ttl():
+    plan = planner(batch_size=2)
+    fetched = {'A': OPEN - 1000, 'B': OPEN - 900, 'C': OPEN - 800}
+    assert plan.next_batch(fetched, now=OPEN) == ['A', 'B']
+    # A e B falharam (o dado não mudou): a vez é do C
+    assert plan.next_batch(fetched, now=OPEN + 1) == ['C']
+    assert plan.next_batch(fetched, now=OPEN + 2) == []
+    assert plan.next_batch(fetched, now=OPEN + 61) == ['A', 'B']
+
+
+def test_requests_per_minute_budget():
+    plan = planner(per_minute=2, batch_size=1)
+    fetched = {f'T{i}': OPEN - 1000 for i in range(5)}
+    assert len(plan.next_batch(fetched, now=OPEN)) == 1
+    assert len(plan.next_batch(fetched, now=OPEN + 1)) == 1
+    assert plan.next_batch(fetched, now=OPEN + 2) == []
+    assert plan.budget_left(OPEN + 59) == 0
+    assert plan.budget_left(OPEN + 60) == 1
+    assert len(plan.next_batch(fetched, now=OPEN + 60)) == 1
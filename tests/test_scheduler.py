@@ -0,0 +1,252 @@
+import random
+import threading
+from time import monotonic, sleep
+
+import pandas as pd
+import pytest
+
+from source import cli, market, providers
+from source.providers import FakeProvider, TransientError, YahooProvider
+from source.benchmark import temp_db
+from source.scheduler import TRANSIENT_KINDS, AdaptiveLimit, InFlight, Scheduler, TokenBucket, is_transient
+
+
+def ok(tickers):
+    return [('ok', {'ticker': t, 'price': 10.0, 'dividends': [], 'updated': 0.0}) for t in tickers]
+
+
+def fast_scheduler(fetch, **kwargs):
+    kwargs = {'rate': 1e6, 'burst': 1e6, 'base_delay': 0.001, 'max_delay': 0.001, **kwargs}
+    return Scheduler(fetch, **kwargs)
+
+
+class Flaky:
+    """Levanta `exc` nas `failures` primeiras chamadas e depois responde."""
+
+    def __init__(self, failures: int, exc: Exception):
+        self.failures = failures
+        self.exc = exc
+        self.calls = 0
+
+    def __call__(self, tickers):
+        self.calls += 1
+        if self.calls <= self.failures: raise self.exc
+        return ok(tickers)
+
+
+#------------------------------------------#
+# ------------- Classificação ------------ #
+#------------------------------------------#
+@pytest.mark.parametrize('exc', [
+    TransientError('sem resposta'), TimeoutError(), ConnectionError(),
+    Exception('HTTP Error 429'), Exception('Too Many Requests'), Exception('Read timed out'),
+])
+def test_transient_errors(exc):
+    assert is_transient(exc)
+
+
+@pytest.mark.parametrize('exc', [ValueError('Preço não disponível'), KeyError('Close'), Exception('404')])
+def test_permanent_errors(exc):
+    assert not is_transient(exc)
+
+
+#------------------------------------------#
+# ------------ Novas tentativas ---------- #
+#------------------------------------------#
+def test_transient_failure_is_retried():
+    fetch = Flaky(2, TransientError('429'))
+    results = []
+    report = fast_scheduler(fetch).run_sync([['PETR4.SA', 'VALE3.SA']], results.extend)
+    assert [status for status, _ in results] == ['ok', 'ok']
+    assert fetch.calls == 3
+    assert report.requests == 3
+    assert report.retried == {'PETR4': 2, 'VALE3': 2}
+    assert report.permanent == {}
+
+
+def test_permanent_failure_is_not_retried():
+    fetch = Flaky(1, ValueError('Ticker inválido'))
+    results = []
+    report = fast_scheduler(fetch).run_sync([['XXXX3.SA']], results.extend)
+    assert fetch.calls == 1
+    assert report.retried == {}
+    assert report.permanent == {'XXXX3': 'Ticker inválido'}
+    assert results[0][0] == 'error' and results[0][1]['kind'] == 'other'
+
+
+def test_retries_exhausted_become_permanent():
+    fetch = Flaky(10, TransientError('429 Too Many Requests'))
+    results = []
+    report = fast_scheduler(fetch, retries=2).run_sync([['PETR4.SA']], results.extend)
+    assert fetch.calls == 3
+    assert report.permanent == {'PETR4': '429 Too Many Requests'}
+    assert results[0][1]['kind'] == 'rate_limit'
+
+
+def test_error_rows_from_provider_are_permanent():
+    provider = FakeProvider()
+    results = []
+    report = fast_scheduler(lambda chunk: market.search(chunk, 0, provider)).run_sync(
+        [['ERRX11.SA', 'MXRF11.SA']], results.extend
+    )
+    assert report.requests == 1
+    assert set(report.permanent) == {'ERRX11'}
+    assert sorted(status for status, _ in results) == ['error', 'ok']
+
+
+class Partial:
+    """Responde o lote, mas `missing` ficam de fora nas `failures` primeiras chamadas."""
+
+    def __init__(self, missing: set[str], failures: int):
+        self.missing = missing
+        self.failures = failures
+        self.calls = []
+
+    def __call__(self, tickers):
+        self.calls.append(list(tickers))
+        lost = self.missing if len(self.calls) <= self.failures else set()
+        return [('error', market.error_data(t, TransientError('Ticker não retornado no lote'))) if t in lost
+                else ok([t])[0] for t in tickers]
+
+
+def test_partial_batch_retries_only_missing_tickers():
+    fetch = Partial({'VALE3.SA'}, failures=2)
+    results = []
+    report = fast_scheduler(fetch).run_sync([['PETR4.SA', 'VALE3.SA', 'ITUB4.SA']], results.extend)
+    assert fetch.calls == [['PETR4.SA', 'VALE3.SA', 'ITUB4.SA'], ['VALE3.SA'], ['VALE3.SA']]
+    assert sorted(data['ticker'] for status, data in results if status == 'ok') == ['ITUB4.SA', 'PETR4.SA', 'VALE3.SA']
+    assert report.retried == {'VALE3': 2}
+    assert report.permanent == {}
+
+
+def test_partial_batch_missing_after_retries_is_permanent():
+    fetch = Partial({'VALE3.SA'}, failures=10)
+    results = []
+    report = fast_scheduler(fetch, retries=1).run_sync([['PETR4.SA', 'VALE3.SA']], results.extend)
+    assert len(fetch.calls) == 2
+    assert sorted(status for status, _ in results) == ['error', 'ok']
+    assert report.permanent == {'VALE3': 'Ticker não retornado no lote'}
+
+
+def test_yahoo_partial_batch_is_transient_per_ticker(monkeypatch):
+    index = pd.to_datetime(['2024-01-02', '2024-01-03'])
+    columns = pd.MultiIndex.from_product([['PETR4.SA', 'VALE3.SA'], ['Close', 'Dividends']])
+    frame = pd.DataFrame([[30.0, 0.0, None, 0.0], [31.0, 0.5, None, 0.0]], index=index, columns=columns)
+
+    class Download:
+        @staticmethod
+        def download(tickers, **kwargs): return frame
+
+    monkeypatch.setattr(providers, '_yfinance', lambda: Download)
+    fetched = YahooProvider().fetch(['petr4.sa', 'VALE3.SA', 'ITUB4.SA'], start=None)
+    assert fetched['PETR4.SA'] == (31.0, [('2024-01-03', 0.5)])
+    assert isinstance(fetched['VALE3.SA'], TransientError)
+    assert isinstance(fetched['ITUB4.SA'], TransientError)
+
+    with temp_db():
+        status, data = market.search(['ITUB4.SA'], 0, YahooProvider())[0]
+    assert status == 'error' and data['kind'] in TRANSIENT_KINDS
+
+
+def test_cancel_interrupts_backoff():
+    fetch = Flaky(10, TransientError('429'))
+    cancel = threading.Event()
+    threading.Timer(0.1, cancel.set).start()
+    results = []
+    started = monotonic()
+    report = Scheduler(fetch, rate=1e6, burst=1e6, base_delay=30.0, max_delay=30.0).run_sync(
+        [['PETR4.SA']], results.extend, cancel
+    )
+    assert monotonic() - started < 2
+    assert fetch.calls == 1
+    assert report.retried == {}
+    assert results[0][0] == 'error'
+
+
+def test_cancel_skips_retries():
+    cancel = threading.Event()
+
+    def fetch(tickers):
+        cancel.set()
+        raise TransientError('429')
+
+    report = fast_scheduler(fetch, concurrency=1, max_concurrency=1).run_sync(
+        [['PETR4.SA'], ['VALE3.SA']], lambda results: None, cancel
+    )
+    assert report.requests == 1
+
+
+def test_backoff_is_bounded_full_jitter():
+    random.seed(0)
+    scheduler = Scheduler(ok, base_delay=0.5, max_delay=4.0)
+    for attempt in range(8):
+        cap = min(4.0, 0.5 * 2 ** attempt)
+        delays = [scheduler.backoff(attempt) for _ in range(200)]
+        assert all(0 <= delay <= cap for delay in delays)
+        assert max(delays) > cap / 2
+
+
+def test_adaptive_limit_aimd():
+    limit = AdaptiveLimit(4, maximum=8, target_latency=1.0)
+    limit.record(0.1, ok=True)
+    assert limit.limit == 5
+    limit.record(0.1, ok=False)
+    assert limit.limit == 2
+    limit.record(10.0, ok=True)
+    assert limit.limit == 1
+
+
+def test_token_bucket_rejects_zero_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0, 1)
+
+
+@pytest.mark.parametrize('argv', [
+    ['scan', '--rate', '0'], ['scan', '--rate', '-1'], ['scan', '--workers', '0'], ['allocate', '--batch-size', '0'],
+])
+def test_cli_rejects_non_positive_limits(argv):
+    with pytest.raises(SystemExit):
+        cli.main(argv)
+
+
+#------------------------------------------#
+# ------------ Consultas em voo ---------- #
+#------------------------------------------#
+def test_in_flight_claim_and_resolve():
+    in_flight = InFlight()
+    mine, shared = in_flight.claim(['PETR4.SA', 'VALE3.SA'])
+    assert mine == ['PETR4.SA', 'VALE3.SA'] and shared == {}
+
+    again, waiting = in_flight.claim(['petr4.sa', 'ITUB4.SA'])
+    assert again == ['ITUB4.SA'] and set(waiting) == {'PETR4'}
+
+    in_flight.resolve(mine, ok(['PETR4.SA']))
+    assert waiting['PETR4'].result(timeout=1)[0] == 'ok'
+    # Ticker sem resultado é entregue como erro, e todos são liberados
+    assert in_flight.claim(['VALE3.SA']) == (['VALE3.SA'], {})
+
+
+def test_overlapping_scans_share_in_flight_tickers():
+    in_flight = InFlight()
+    lock = threading.Lock()
+    fetched = []
+    started = threading.Event()
+
+    def slow(chunk):
+        with lock: fetched.extend(chunk)
+        started.set()
+        sleep(0.2)
+        return ok(chunk)
+
+    first, second = [], []
+    scan = threading.Thread(
+        target=fast_scheduler(slow, in_flight=in_flight).run_sync, args=([['PETR4.SA', 'VALE3.SA']], first.extend)
+    )
+    scan.start()
+    assert started.wait(1)
+    fast_scheduler(slow, in_flight=in_flight).run_sync([['VALE3.SA', 'ITUB4.SA']], second.extend)
+    scan.join()
+
+    assert sorted(fetched) == ['ITUB4.SA', 'PETR4.SA', 'VALE3.SA']
+    assert sorted(data['ticker'] for _, data in second) == ['ITUB4.SA', 'VALE3.SA']
+    assert all(status == 'ok' for status, _ in first + second)
@@ -0,0 +1,83 @@
+import io
+import os
+from datetime import date
+
+import pytest
+
+from source import cli, data_base as db, market, snapshot
+from source.benchmark import fake_tickers, temp_db
+from source.providers import FakeProvider
+
+
+@pytest.fixture
+def stored(tmp_path):
+    """Banco temporário com 10 anos de histórico falso e um snapshot exportado dele."""
+    with temp_db():
+        tickers = fake_tickers(5) + ['MXRF11.SA']
+        market.search(tickers, 0, FakeProvider(dividends=130, cacheable=True))
+        quotes = db.load_quotes(tickers)
+        # Timestamps diferentes por ticker
+        quotes = {t: (price, 1_600_000_000.0 + i) for i, (t, (price, _)) in enumerate(sorted(quotes.items()))}
+        snapshot.export(str(tmp_path), quotes, db.load_dividends(tickers, ''))
+        yield tickers, quotes
+
+
+def test_timestamp_per_ticker(stored, tmp_path):
+    _, quotes = stored
+    provider = snapshot.SnapshotProvider(str(tmp_path))
+    for ticker, (_, updated) in quotes.items():
+        assert provider.timestamp(ticker) == updated
+    result = market.fetch_cached(['MXRF11.SA'], provider=provider)
+    assert result['MXRF11.SA'][2] == quotes['MXRF11.SA'][1]
+
+
+def test_dividend_years_match_database(stored, tmp_path):
+    tickers, _ = stored
+    provider = snapshot.SnapshotProvider(str(tmp_path))
+    expected = sorted(db.load_dividend_years(tickers))
+    got = sorted(provider.dividend_years(tickers + ['NOPE3.SA']))
+    assert [row[:2] + row[3:] for row in got] == [row[:2] + row[3:] for row in expected]
+    assert [row[2] for row in got] == pytest.approx([row[2] for row in expected])
+
+
+def test_snapshot_horizons_ignore_live_database(stored, tmp_path, monkeypatch):
+    tickers, _ = stored
+
+    def run():
+        out = io.StringIO()
+        monkeypatch.setattr('sys.stdout', out)
+        cli.main(['scan', '--snapshot', str(tmp_path), '--horizons', '--format', 'jsonl'])
+        return out.getvalue()
+
+    before = run()
+    assert '"avg_3y"' in before
+    # Histórico novo no banco não muda um scan do snapshot
+    db.save_dividends([(t, '2020-06-15', 99.0) for t in tickers])
+    assert run() == before
+
+
+def test_interrupted_export_leaves_no_index(stored, tmp_path, monkeypatch):
+    tickers, quotes = stored
+    opened = snapshot.SnapshotProvider(str(tmp_path))
+    before = opened.fetch(tickers, market.start_date())
+
+    def fail(file, array):
+        raise OSError('disco cheio')
+
+    monkeypatch.setattr(snapshot.np, 'save', fail)
+    with pytest.raises(OSError):
+        snapshot.export(str(tmp_path), {'MXRF11.SA': (1.0, 0.0)}, {})
+    # Sem índice, o snapshot pela metade não é aberto
+    with pytest.raises(FileNotFoundError):
+        snapshot.SnapshotProvider(str(tmp_path))
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+    # Quem já estava aberto continua vendo os arrays antigos
+    assert opened.fetch(tickers, market.start_date()) == before
+
+
+def test_export_replaces_previous_snapshot(stored, tmp_path):
+    snapshot.export(str(tmp_path), {'MXRF11.SA': (1.5, 7.0)}, {'MXRF11.SA': [('2024-01-10', 0.1)]})
+    provider = snapshot.SnapshotProvider(str(tmp_path))
+    assert provider.tickers == ['MXRF11.SA']
+    assert provider.fetch(['MXRF11.SA'], date(2024, 1, 1)) == {'MXRF11.SA': (1.5, [('2024-01-10', 0.1)])}
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
@@ -0,0 +1,64 @@
+import json
+
+import pandas as pd
+import pytest
+
+from source import universe
+
+
+def normalize_csv(tmp_path, text: str, known=frozenset()):
+    path = tmp_path / 'universe.csv'
+    path.write_text(text, encoding='utf-8')
+    return universe.normalize(universe.read_file(str(path)), set(known))
+
+
+def rows(frame: pd.DataFrame) -> list[tuple]:
+    return list(frame.itertuples(index=False, name=None))
+
+
+def test_normalize_ids_types_and_sectors(tmp_path):
+    frame = normalize_csv(tmp_path, 'ticker;tipo;setor\npetr4;;Petróleo\nmxrf11.sa;;\nhglg11;ação; Logística \n')
+    assert rows(frame) == [
+        ('PETR4.SA', 'acao', 'Petróleo'),
+        ('MXRF11.SA', 'fii', None),
+        ('HGLG11.SA', 'acao', 'Logística'),
+    ]
+
+
+def test_normalize_keeps_type_of_known_tickers(tmp_path):
+    frame = normalize_csv(tmp_path, 'ticker\nBBAS3\nXPLG11\n', known={'XPLG11.SA'})
+    assert rows(frame) == [('BBAS3.SA', 'acao', None), ('XPLG11.SA', None, None)]
+
+
+def test_normalize_drops_duplicates_keeping_last(tmp_path):
+    frame = normalize_csv(tmp_path, 'ticker,setor\npetr4,A\nPETR4.SA,B\n')
+    assert rows(frame) == [('PETR4.SA', 'acao', 'B')]
+
+
+def test_normalize_without_header(tmp_path):
+    frame = normalize_csv(tmp_path, 'petr4,acao,Energia\nmxrf11\n')
+    assert rows(frame) == [('PETR4.SA', 'acao', 'Energia'), ('MXRF11.SA', 'fii', None)]
+
+
+def test_normalize_drops_empty_tickers_csv(tmp_path):
+    # Regressão: célula de ticker vazia derrubava a importação (boolean value of NA is ambiguous)
+    frame = normalize_csv(tmp_path, 'ticker,tipo\nPETR4,\n,fii\n  ,\n')
+    assert rows(frame) == [('PETR4.SA', 'acao', None)]
+
+
+def test_normalize_drops_empty_tickers_json(tmp_path):
+    path = tmp_path / 'universe.json'
+    path.write_text(json.dumps([{'ticker': None}, {'ticker': 'mxrf11', 'setor': 'Papel'}]), encoding='utf-8')
+    frame = universe.normalize(universe.read_file(str(path)))
+    assert rows(frame) == [('MXRF11.SA', 'fii', 'Papel')]
+
+
+def test_normalize_only_empty_tickers(tmp_path):
+    path = tmp_path / 'universe.json'
+    path.write_text(json.dumps([{'ticker': None}]), encoding='utf-8')
+    assert universe.normalize(universe.read_file(str(path))).empty
+
+
+def test_normalize_requires_ticker_column():
+    with pytest.raises(ValueError):
+        universe.normalize(pd.DataFrame({'preco': ['1']}))